@@ -0,0 +1,63 @@
+import contextlib
+import io
+import os
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+def default_jobs():
+    return os.cpu_count() or 1
+
+def _run_task(func, args, kwargs):
+    # Runs one conversion with its console output captured, so the parent
+    # can print every task's log as one block, in submission order. stderr
+    # goes to the same buffer: the converters print their own tracebacks.
+    buffer = io.StringIO()
+    try:
+        with contextlib.redirect_stdout(buffer), contextlib.redirect_stderr(buffer):
+            result = func(*args, **kwargs)
+        success = result is not False
+        error = None
+    except Exception as e:
+        success = False
+        error = f"{type(e).__name__}: {e}"
+        buffer.write(traceback.format_exc())
+    return success, buffer.getvalue(), error
+
+def _first_error_line(output):
+    for line in output.splitlines():
+        if 'error' in line.lower() or 'failed' in line.lower():
+            return line.strip()
+    return "conversion reported failure"
+
+def run_batch(func, tasks, jobs=1, **kwargs):
+    # tasks is a list of (label, args) pairs; kwargs are passed to every
+    # call. Returns the list of (label, error) pairs that failed.
+    total = len(tasks)
+    failures = []
+
+    def report(index, label, success, output, error):
+        print(f"[{index + 1}/{total}] {label}")
+        if output:
+            print(output, end='' if output.endswith("\n") else "\n")
+        if not success:
+            failures.append((label, error or _first_error_line(output)))
+
+    if jobs <= 1 or total <= 1:
+        for index, (label, args) in enumerate(tasks):
+            report(index, label, *_run_task(func, args, kwargs))
+    else:
+        with ProcessPoolExecutor(max_workers=min(jobs, total)) as pool:
+            futures = [pool.submit(_run_task, func, args, kwargs) for _, args in tasks]
+            for index, ((label, _), future) in enumerate(zip(tasks, futures)):
+                try:
+                    result = future.result()
+                except Exception as e:
+                    result = (False, "", f"{type(e).__name__}: {e}")
+                report(index, label, *result)
+
+    print(f"\nBatch processing completed! Successfully processed {total - len(failures)}/{total} files")
+    if failures:
+        print(f"{len(failures)} file(s) failed:")
+        for label, error in failures:
+            print(f"  - {label}: {error}")
+    return failures
@@ -0,0 +1,101 @@
+import argparse
+import io
+import time
+import numpy as np
+import pnm
+
+def legacy_p2(image):
+    f = io.StringIO()
+    height, width = image.shape
+    f.write("P2\n")
+    f.write(f"{width} {height}\n")
+    f.write("255\n")
+    line_buffer = ""
+    for row in image:
+        for pixel in row:
+            pixel_str = str(pixel)
+            if len(line_buffer) + len(pixel_str) + 1 > 70:
+                f.write(line_buffer.rstrip() + "\n")
+                line_buffer = ""
+            if line_buffer:
+                line_buffer += " " + pixel_str
+            else:
+                line_buffer = pixel_str
+    if line_buffer:
+        f.write(line_buffer + "\n")
+    return f.getvalue().encode('ascii')
+
+def legacy_p3(image):
+    f = io.StringIO()
+    height, width, channels = image.shape
+    f.write("P3\n")
+    f.write(f"{width} {height}\n")
+    f.write("255\n")
+    for row in image:
+        for pixel in row:
+            f.write(f"{pixel[0]} {pixel[1]} {pixel[2]} ")
+        f.write("\n")
+    return f.getvalue().encode('ascii')
+
+def legacy_parse(data):
+    return np.array(list(map(int, data.decode('ascii').split())), dtype=np.uint8)
+
+def time_call(func, *args, repeat=1):
+    best = None
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+def run_benchmark(width, height, repeat=3, skip_legacy=False, seed=0):
+    rng = np.random.default_rng(seed)
+    gray = rng.integers(0, 256, size=(height, width), dtype=np.uint8)
+    rgb = rng.integers(0, 256, size=(height, width, 3), dtype=np.uint8)
+
+    cases = [
+        ('P2', gray, legacy_p2, lambda img: pnm.encode_pgm(img, 255, 'P2')),
+        ('P3', rgb, legacy_p3, lambda img: pnm.encode_ppm(img, 255, 'P3')),
+        ('P5', gray, None, lambda img: pnm.encode_pgm(img, 255, 'P5')),
+        ('P6', rgb, None, lambda img: pnm.encode_ppm(img, 255, 'P6')),
+    ]
+
+    print(f"Image size: {width} x {height}")
+    for magic, image, legacy, vectorized in cases:
+        new_time, new_bytes = time_call(vectorized, image, repeat=repeat)
+        line = f"  {magic}: vectorized {new_time * 1000:9.2f} ms ({len(new_bytes)} bytes)"
+        if legacy is not None and not skip_legacy:
+            old_time, old_bytes = time_call(legacy, image)
+            if old_bytes != new_bytes:
+                raise AssertionError(f"{magic} output differs from legacy writer")
+            line += f", legacy {old_time * 1000:9.2f} ms, speedup {old_time / new_time:6.1f}x, identical"
+        print(line)
+
+    for magic, image, encode in (('P2', gray, pnm.format_ascii),
+                                 ('P3', rgb, pnm.format_ascii_rows)):
+        body = encode(image)
+        new_time, values = time_call(pnm.parse_ascii, body, image.size, repeat=repeat)
+        if not np.array_equal(values, image.ravel()):
+            raise AssertionError(f"{magic} parse does not round-trip")
+        line = f"  {magic} parse: vectorized {new_time * 1000:9.2f} ms"
+        if not skip_legacy:
+            old_time, _ = time_call(legacy_parse, body)
+            line += f", legacy {old_time * 1000:9.2f} ms, speedup {old_time / new_time:6.1f}x"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the vectorized PNM encoder and parser against the legacy loops')
+    parser.add_argument('--sizes', nargs='+', default=['320x240', '640x480', '1920x1080'],
+                        help='Frame sizes as WxH (default: 320x240 640x480 1920x1080)')
+    parser.add_argument('-r', '--repeat', type=int, default=3, help='Repetitions for the vectorized code paths (default: 3)')
+    parser.add_argument('--skip-legacy', action='store_true', help='Only time the vectorized code paths')
+    args = parser.parse_args()
+
+    for size in args.sizes:
+        width, height = map(int, size.lower().split('x'))
+        run_benchmark(width, height, args.repeat, args.skip_legacy)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,274 @@
+import argparse
+import ast
+import hashlib
+import inspect
+import json
+import os
+import shutil
+import tempfile
+
+CACHE_ENV = 'FPGA_IMAGE_CACHE'
+DEFAULT_MAX_BYTES = 2 * 1024 ** 3
+# Imports resolving under this directory count as part of a converter.
+LOCAL_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+_source_hashes = {}
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        while True:
+            block = f.read(block_size)
+            if not block:
+                break
+            digest.update(block)
+    return digest.hexdigest()
+
+def _module_path(base, name):
+    path = os.path.join(base, *name.split('.'))
+    for candidate in (path + '.py', os.path.join(path, '__init__.py')):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+def local_sources(path):
+    # The script plus every module under LOCAL_ROOT it imports, directly or
+    # through other local modules, including imports made inside functions.
+    found = set()
+    pending = [os.path.abspath(path)]
+    while pending:
+        path = pending.pop()
+        if path in found:
+            continue
+        found.add(path)
+        with open(path, 'rb') as f:
+            tree = ast.parse(f.read(), path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                base = LOCAL_ROOT
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                base = LOCAL_ROOT
+                if node.level:
+                    base = os.path.dirname(path)
+                    for _ in range(node.level - 1):
+                        base = os.path.dirname(base)
+                module = node.module or ''
+                # "from golden import pipeline" may name a submodule.
+                names = [module] if module else []
+                names += [f"{module}.{alias.name}" if module else alias.name for alias in node.names]
+            else:
+                continue
+            for name in names:
+                parts = name.split('.')
+                # "import golden.pipeline" also runs golden/__init__.py.
+                for depth in range(1, len(parts) + 1):
+                    module_path = _module_path(base, '.'.join(parts[:depth]))
+                    if module_path:
+                        pending.append(module_path)
+    return sorted(found)
+
+def _converter_digest(func):
+    # Editing a converter script, or any local module it pulls in (pnm, yuv,
+    # the golden models, ...), changes this hash, which invalidates every
+    # entry it produced without any manual cache clearing.
+    path = inspect.getsourcefile(func)
+    if path not in _source_hashes:
+        digest = hashlib.sha256()
+        for source in local_sources(path):
+            digest.update(os.path.relpath(source, LOCAL_ROOT).encode('utf-8'))
+            digest.update(file_digest(source).encode('ascii'))
+        _source_hashes[path] = digest.hexdigest()
+    return _source_hashes[path]
+
+class ConversionCache:
+    def __init__(self, cache_dir, max_bytes=DEFAULT_MAX_BYTES, link=False):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.link = link
+
+    def key(self, func, src_path, dst_path, params):
+        module = os.path.splitext(os.path.basename(inspect.getsourcefile(func)))[0]
+        record = {
+            'converter': f"{module}.{func.__qualname__}",
+            'converter_source': _converter_digest(func),
+            'source': file_digest(src_path),
+            # Converters pick the output format from the destination name.
+            'output': os.path.splitext(dst_path)[1].lower(),
+            'params': params,
+        }
+        return hashlib.sha256(json.dumps(record, sort_keys=True, default=str).encode('utf-8')).hexdigest()
+
+    def _entry_path(self, key):
+        return os.path.join(self.cache_dir, 'objects', key[:2], key)
+
+    def fetch(self, key, dst_path):
+        entry = self._entry_path(key)
+        try:
+            with open(entry + '.json') as f:
+                meta = json.load(f)
+            # Linked outputs share the entry's inode; a write through one of
+            # them changes its size or modification time, and the entry is
+            # then treated as missing and replaced.
+            stat = os.stat(entry)
+            if stat.st_size != meta['size'] or stat.st_mtime_ns != meta['mtime_ns']:
+                raise ValueError("entry modified")
+        except (OSError, ValueError, KeyError):
+            return False
+
+        # Touching the metadata records the use for least-recently-used
+        # eviction; the entry's own time stays as stored.
+        os.utime(entry + '.json')
+        if os.path.exists(dst_path) and self.link and os.path.samefile(entry, dst_path):
+            return True
+        if os.path.lexists(dst_path):
+            os.remove(dst_path)
+        if self.link:
+            try:
+                os.link(entry, dst_path)
+                return True
+            except OSError:
+                pass
+        shutil.copyfile(entry, dst_path)
+        return True
+
+    def store(self, key, dst_path, src_path, params):
+        entry = self._entry_path(key)
+        os.makedirs(os.path.dirname(entry), exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(entry))
+        os.close(fd)
+        shutil.copyfile(dst_path, tmp_path)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, entry)
+        stat = os.stat(entry)
+        meta = {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns, 'source': os.path.abspath(src_path),
+                'params': params}
+        with open(entry + '.json', 'w') as f:
+            json.dump(meta, f, default=str)
+        if self.link:
+            os.remove(dst_path)
+            self.fetch(key, dst_path)
+        self.evict()
+
+    def entries(self):
+        objects = os.path.join(self.cache_dir, 'objects')
+        if not os.path.isdir(objects):
+            return []
+        found = []
+        for shard in os.scandir(objects):
+            if not shard.is_dir():
+                continue
+            for item in os.scandir(shard.path):
+                if item.name.endswith('.json') or not item.is_file():
+                    continue
+                try:
+                    used = os.stat(item.path + '.json').st_mtime
+                except OSError:
+                    used = item.stat().st_mtime
+                found.append((used, item.stat().st_size, item.path))
+        return found
+
+    def evict(self, max_bytes=None):
+        max_bytes = self.max_bytes if max_bytes is None else max_bytes
+        entries = sorted(self.entries())
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, path in entries:
+            if total <= max_bytes:
+                break
+            for stale in (path, path + '.json'):
+                try:
+                    os.remove(stale)
+                except OSError:
+                    pass
+            total -= size
+            removed += 1
+        return removed
+
+    def run(self, func, src_path, dst_path, params, *args):
+        if not os.path.isfile(src_path):
+            # Let the converter report the missing input in its usual way.
+            return func(src_path, dst_path, *args)
+        key = self.key(func, src_path, dst_path, params)
+        if self.fetch(key, dst_path):
+            print(f"Cache hit: {src_path} -> {dst_path}")
+            return True
+        if os.path.lexists(dst_path):
+            # Never write through a hard link into a cache entry.
+            os.remove(dst_path)
+        result = func(src_path, dst_path, *args)
+        if result is not False and os.path.exists(dst_path):
+            self.store(key, dst_path, src_path, params)
+        return result
+
+    def run_many(self, func, src_path, outputs, convert):
+        # outputs maps each destination to its params. Entries are keyed as
+        # if func had produced each destination alone, so they are shared
+        # with single-output runs; convert(missing) writes every destination
+        # that missed in one call.
+        if not os.path.isfile(src_path):
+            return convert(outputs)
+        keys = {dst_path: self.key(func, src_path, dst_path, params) for dst_path, params in outputs.items()}
+        missing = {}
+        for dst_path, params in outputs.items():
+            if self.fetch(keys[dst_path], dst_path):
+                print(f"Cache hit: {src_path} -> {dst_path}")
+            else:
+                missing[dst_path] = params
+        if not missing:
+            return True
+        for dst_path in missing:
+            if os.path.lexists(dst_path):
+                os.remove(dst_path)
+        result = convert(missing)
+        if result is not False:
+            for dst_path, params in missing.items():
+                if os.path.exists(dst_path):
+                    self.store(keys[dst_path], dst_path, src_path, params)
+        return result
+
+def default_cache():
+    cache_dir = os.environ.get(CACHE_ENV)
+    if not cache_dir:
+        return None
+    max_bytes = int(os.environ.get(CACHE_ENV + '_MAX_BYTES', DEFAULT_MAX_BYTES))
+    link = os.environ.get(CACHE_ENV + '_LINK', '') not in ('', '0')
+    return ConversionCache(cache_dir, max_bytes, link)
+
+def cached_convert(func, src_path, dst_path, params, *args, cache=None):
+    # Runs func(src_path, dst_path, *args) through the cache when one is
+    # given or configured via FPGA_IMAGE_CACHE, and directly otherwise.
+    cache = cache or default_cache()
+    if cache is None:
+        return func(src_path, dst_path, *args)
+    return cache.run(func, src_path, dst_path, params, *args)
+
+def cached_convert_many(func, src_path, outputs, convert, cache=None):
+    # cached_convert for a converter that writes several outputs from one
+    # read of src_path; see ConversionCache.run_many.
+    cache = cache or default_cache()
+    if cache is None:
+        return convert(outputs)
+    return cache.run_many(func, src_path, outputs, convert)
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or trim the conversion cache')
+    parser.add_argument('cache_dir', nargs='?', default=os.environ.get(CACHE_ENV),
+                        help=f'Cache directory (default: ${CACHE_ENV})')
+    parser.add_argument('--evict-to', type=int, help='Evict least recently used entries down to this many bytes')
+    parser.add_argument('--clear', action='store_true', help='Remove every cache entry')
+    args = parser.parse_args()
+
+    if not args.cache_dir:
+        parser.error(f"no cache directory given and {CACHE_ENV} is not set")
+
+    cache = ConversionCache(args.cache_dir)
+    if args.clear:
+        print(f"Removed {cache.evict(0)} entries")
+    elif args.evict_to is not None:
+        print(f"Removed {cache.evict(args.evict_to)} entries")
+    entries = cache.entries()
+    print(f"{len(entries)} entries, {sum(size for _, size, _ in entries)} bytes in {args.cache_dir}")
+
+if __name__ == "__main__":
+    main()
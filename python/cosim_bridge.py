@@ -0,0 +1,263 @@
+import argparse
+import asyncio
+import errno
+import json
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import pnm
+from fpga_image import BAYER_PATTERNS, RAW_LAYOUTS, iter_frames, parse_size
+from golden import STAGES, WINDOW_MODELS, parse_stages, run_pipeline
+from image_compare import compare, format_result, passes
+from tb_regression import (DEFAULT_CACHE, DEFAULT_FAIL_PATTERN, ROOT, SIMULATORS, build_testbench, discover,
+                           expand)
+
+# File I/O of a bench: $fopen("path", "r") for stimulus, "w" for results.
+_fopen = re.compile(r'\$fopen\s*\(\s*"([^"]+)"\s*,\s*"([rwa])b?\+?"\s*\)')
+_comment = re.compile(r'//[^\n]*|/\*.*?\*/', re.S)
+
+# vvp -none keeps iverilog from writing the benches' $dumpfile VCDs.
+RUN_COMMANDS = {'iverilog': 'vvp -n {output} -none', 'verilator': '{output}'}
+
+PIPE_CHUNK = 1 << 16
+POLL_SECONDS = 0.01
+
+def bench_files(tb_path):
+    # (inputs, outputs) the bench opens, relative to its working directory.
+    with open(tb_path, errors='replace') as f:
+        text = _comment.sub('', f.read())
+    inputs, outputs = [], []
+    for path, mode in _fopen.findall(text):
+        files = inputs if mode == 'r' else outputs
+        if path not in files:
+            files.append(path)
+    both = set(inputs) & set(outputs)
+    if both:
+        raise ValueError(f"{os.path.basename(tb_path)} reads back {', '.join(sorted(both))}, "
+                         "which a pipe cannot replay")
+    return inputs, outputs, text
+
+def stimulus_encoder(path, text):
+    # The PNM flavour the bench parses: binary when its reader checks for
+    # P5/P6, ASCII otherwise.
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.ppm':
+        magic = 'P6' if '"P6"' in text else 'P3'
+        return 'rgb', lambda image: pnm.encode_ppm(image, 255, magic)
+    if ext == '.pgm':
+        magic = 'P5' if '"P5"' in text and '"P2"' not in text else 'P2'
+        return 'gray', lambda image: pnm.encode_pgm(image, 255, magic)
+    raise ValueError(f"Only PGM/PPM stimulus can be streamed, the bench reads {path}")
+
+def _write_fifo(path, payload):
+    # Blocks until the bench opens its input; returns the bytes it took
+    # before closing the file (or exiting).
+    written = 0
+    try:
+        with open(path, 'wb', buffering=0) as f:
+            view = memoryview(payload)
+            while written < len(view):
+                written += f.write(view[written:written + PIPE_CHUNK])
+    except BrokenPipeError:
+        pass
+    return written
+
+def _read_fifo(path):
+    # Blocks until the bench opens its output and returns all of it.
+    data = bytearray()
+    with open(path, 'rb', buffering=0) as f:
+        while True:
+            chunk = f.read(PIPE_CHUNK)
+            if not chunk:
+                return bytes(data)
+            data += chunk
+
+async def _release(path, task, reading):
+    # A bench that exits without opening one of its files leaves our end
+    # blocked in open(); opening the other end once lets it through.
+    while not task.done():
+        try:
+            fd = os.open(path, (os.O_WRONLY if reading else os.O_RDONLY) | os.O_NONBLOCK)
+        except OSError as e:
+            if e.errno != errno.ENXIO:
+                raise
+        else:
+            os.close(fd)
+        await asyncio.sleep(POLL_SECONDS)
+
+async def run_frame(index, name, image, args, inputs, outputs, encode, stages, schedule, timeout, fail_pattern,
+                    tolerance=0):
+    # One simulation with every bench file replaced by a FIFO in a scratch
+    # directory: the stimulus is fed and the results drained while the
+    # simulator runs, and checked as soon as they arrive.
+    result = {'frame': index, 'source': name}
+    work = tempfile.mkdtemp(prefix='cosim_')
+    try:
+        for path in inputs + outputs:
+            fifo = os.path.join(work, path)
+            os.makedirs(os.path.dirname(fifo), exist_ok=True)
+            os.mkfifo(fifo)
+        start = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(*args, cwd=work, stdout=asyncio.subprocess.PIPE,
+                                                       stderr=asyncio.subprocess.STDOUT)
+        feeds = {path: asyncio.create_task(asyncio.to_thread(_write_fifo, os.path.join(work, path), encode(image)))
+                 for path in inputs}
+        drains = {path: asyncio.create_task(asyncio.to_thread(_read_fifo, os.path.join(work, path)))
+                  for path in outputs}
+        try:
+            log, _ = await asyncio.wait_for(process.communicate(), timeout)
+        except asyncio.TimeoutError:
+            process.kill()
+            log, _ = await process.communicate()
+            result['status'] = 'timeout'
+        result['run_time'] = time.perf_counter() - start
+        result['returncode'] = process.returncode
+        await asyncio.gather(*(_release(os.path.join(work, path), task, False) for path, task in feeds.items()),
+                             *(_release(os.path.join(work, path), task, True) for path, task in drains.items()))
+        result['bytes_in'] = sum(task.result() for task in feeds.values())
+        data = {path: task.result() for path, task in drains.items()}
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+    log = log.decode('utf-8', 'replace')
+    result['bytes_out'] = sum(len(chunk) for chunk in data.values())
+    if 'status' not in result and (process.returncode != 0 or re.search(fail_pattern, log, re.M)):
+        result['status'] = 'fail'
+        result['log_tail'] = '\n'.join(log.splitlines()[-10:])
+    primary = next((path for path in outputs if data[path]), None)
+    if 'status' in result or primary is None:
+        result.setdefault('status', 'no_output')
+        return result
+    result['output'] = primary
+    if stages is None:
+        result['status'] = 'pass'
+        return result
+    result.update(await asyncio.to_thread(_check, data[primary], image, stages, schedule, tolerance))
+    return result
+
+def _check(data, image, stages, schedule, tolerance):
+    magic, width, height, max_val, samples = pnm.parse_pnm(data)
+    channels = 3 if magic in ('P3', 'P6') else 1
+    count = width * height * channels
+    if samples.size < count:
+        return {'status': 'fail', 'error': f"output holds {samples.size} of {count} samples"}
+    output = samples[:count].reshape((height, width, 3) if channels == 3 else (height, width))
+    reference = run_pipeline(image, stages, schedule)
+    if output.shape != reference.shape:
+        return {'status': 'fail', 'error': f"output is {width}x{height}, reference "
+                                           f"{reference.shape[1]}x{reference.shape[0]}"}
+    metrics = compare(output, reference, max_val, tolerance)
+    metrics.pop('rows')
+    metrics.pop('cols')
+    status = 'pass' if passes(metrics) else 'fail'
+    return dict(metrics, status=status, summary=format_result(metrics))
+
+async def run_frames(frames, jobs, *run_args):
+    # Keeps `jobs` simulations in flight; frames are read only as slots free
+    # up, and each result is printed when its check finishes.
+    slots = asyncio.Semaphore(jobs)
+    tasks = []
+
+    async def one(index, name, image):
+        try:
+            result = await run_frame(index, name, image, *run_args)
+        finally:
+            slots.release()
+        detail = result.get('summary') or result.get('error') or result.get('log_tail', '')
+        print(f"Frame {index} ({name}): {result['status']}, {result['run_time']:.2f} s"
+              f"{', ' + detail if detail else ''}")
+        return result
+
+    for index, (name, image) in enumerate(frames):
+        await slots.acquire()
+        tasks.append(asyncio.create_task(one(index, name, image)))
+    return await asyncio.gather(*tasks)
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream frames through a testbench over named pipes and check '
+                                                 'its output while it runs')
+    parser.add_argument('testbench', help='Testbench name, e.g. tb_mean3x3')
+    parser.add_argument('sources', nargs='*', help='Frames to stream: images, raw streams, directories or videos '
+                                                   "(default: the bench's own input)")
+    parser.add_argument('-S', '--stages', help=f"Reference stage chain (default: the bench's module when it "
+                                               f"has a model; {', '.join(STAGES)})")
+    parser.add_argument('--no-check', action='store_true', help='Only run the frames, do not check the output')
+    parser.add_argument('--tolerance', type=int, default=0, help='Allowed absolute error per sample (default: 0)')
+    parser.add_argument('-j', '--jobs', type=int, default=1, help='Simulations in flight at once (default: 1)')
+    parser.add_argument('--simulator', default='iverilog', choices=sorted(SIMULATORS),
+                        help='Command preset and event ordering to model (default: iverilog)')
+    parser.add_argument('--compile-cmd', help='Compile command template, overriding the preset')
+    parser.add_argument('--run-cmd', help='Run command template, overriding the preset')
+    parser.add_argument('--timeout', type=float, default=600, help='Seconds allowed per compile and per frame')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE, help='Compiled simulation cache (default: .sim_cache)')
+    parser.add_argument('--fail-pattern', default=DEFAULT_FAIL_PATTERN,
+                        help='Regex marking a failed run when it matches a line of the simulation output')
+    parser.add_argument('--report', help='JSON report, the only file written')
+    parser.add_argument('-s', '--size', type=parse_size, help='WIDTHxHEIGHT of raw frames')
+    parser.add_argument('--layout', choices=RAW_LAYOUTS, help='Raw frame layout (default: from file name)')
+    parser.add_argument('-p', '--pattern', choices=BAYER_PATTERNS, help='Bayer pattern (default: from file name)')
+    args = parser.parse_args()
+
+    found = dict(discover(ROOT, [args.testbench]))
+    if args.testbench not in found:
+        print(f"Error: no testbench named {args.testbench}")
+        sys.exit(1)
+    sources = found[args.testbench]
+    try:
+        inputs, outputs, text = bench_files(sources[0])
+        if len(inputs) != 1 or not outputs:
+            raise ValueError(f"{args.testbench} opens {len(inputs)} input(s) and {len(outputs)} output(s); "
+                             "the bridge needs one input and at least one output")
+        mode, encode = stimulus_encoder(inputs[0], text)
+        module = args.testbench[len('tb_'):]
+        stages = None
+        if args.stages:
+            stages = parse_stages(args.stages)
+        elif not args.no_check and module in WINDOW_MODELS:
+            stages = parse_stages(module)
+        if stages is None and not args.no_check:
+            print(f"Warning: no reference model for {module}, output is not checked (use --stages)")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+
+    default_compile, default_run = SIMULATORS[args.simulator]
+    fields, built, log = build_testbench(args.testbench, sources, ROOT, os.path.abspath(args.cache_dir),
+                                         args.compile_cmd or default_compile, args.timeout)
+    if 'status' in built:
+        print(f"Error: {args.testbench} did not build ({built['status']})")
+        print('\n'.join(log.splitlines()[-10:]))
+        sys.exit(1)
+    run_args = expand(args.run_cmd or RUN_COMMANDS[args.simulator], sources, **fields)
+
+    frame_sources = args.sources or [os.path.join(ROOT, inputs[0])]
+    frames = iter_frames(frame_sources, mode, args.size, args.layout, args.pattern)
+    start = time.perf_counter()
+    try:
+        results = asyncio.run(run_frames(frames, max(1, args.jobs), run_args, inputs, outputs, encode, stages,
+                                         args.simulator, args.timeout, args.fail_pattern, args.tolerance))
+    except (OSError, ValueError, IndexError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    wall_time = time.perf_counter() - start
+
+    failed = [result for result in results if result['status'] != 'pass']
+    if args.report:
+        for result in results:
+            if result.get('psnr') == float('inf'):
+                result['psnr'] = None
+        with open(args.report, 'w') as f:
+            json.dump({'testbench': args.testbench, 'simulator': args.simulator, 'inputs': inputs,
+                       'outputs': outputs, 'stages': args.stages or (module if stages else None),
+                       'wall_time': wall_time, 'built': built, 'frames': results}, f, indent=1)
+        print(f"Report saved to {args.report}")
+    print(f"{'PASS' if results and not failed else 'FAIL'}: {len(results) - len(failed)}/{len(results)} frames "
+          f"passed in {wall_time:.1f} s")
+    if failed or not results:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,293 @@
+import argparse
+import os
+import re
+import sys
+
+# NumPy, OpenCV and the converter modules are imported by the commands that
+# use them: `--help` loads neither, and PNM and raw Bayer conversions never
+# load OpenCV. YUV encoding and decoding and JPEG/PNG input and output keep
+# using it, since the YUV models are defined by OpenCV's color conversions.
+
+PNM_EXTENSIONS = ('.pgm', '.ppm', '.pnm')
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff')
+INTERPOLATIONS = ['nearest', 'linear', 'cubic', 'area', 'lanczos']
+
+# Kept in step with raw_frame.RAW_LAYOUTS, jpg2bayer and yuv so that
+# building the parser needs none of them.
+RAW_LAYOUTS = ['bayer', 'i420', 'i422', 'nv12', 'nv21', 'uyvy', 'yuv422p', 'yuyv', 'yv12']
+YUV_LAYOUTS = [layout for layout in RAW_LAYOUTS if layout != 'bayer']
+BAYER_PATTERNS = ['BGGR', 'GRBG', 'GBRG', 'RGGB']
+BAYER_BIT_DEPTHS = [8, 10, 12, 16]
+MIPI_PACKINGS = ['raw10', 'raw12']
+YUV_MATRICES = ['bt601', 'yuv', 'ycbcr']
+
+# cv2.COLOR_RGB2GRAY weights in 15-bit fixed point, bit-exact with OpenCV
+# for 8- and 16-bit samples.
+GRAY_WEIGHTS = (9798, 19235, 3735)
+GRAY_SHIFT = 15
+
+def parse_size(text):
+    match = re.fullmatch(r'(\d+)x(\d+)', text)
+    if match is None:
+        raise argparse.ArgumentTypeError(f"Invalid size '{text}', expected WIDTHxHEIGHT")
+    return int(match.group(1)), int(match.group(2))
+
+def rgb_to_gray(rgb):
+    import numpy as np
+    total = np.full(rgb.shape[:2], 1 << (GRAY_SHIFT - 1), dtype=np.uint32)
+    for channel, weight in enumerate(GRAY_WEIGHTS):
+        total += rgb[..., channel].astype(np.uint32) * weight
+    total >>= GRAY_SHIFT
+    return total.astype(rgb.dtype)
+
+def load_image(path, mode='any', raw_size=None, layout=None, pattern=None, bit_depth=8):
+    # Returns (image, max_val) with image as (H, W) gray or (H, W, 3) RGB.
+    # mode 'gray' or 'rgb' converts to that, 'any' keeps what the file holds.
+    # Raw Bayer frames give their mosaic as gray and the golden demosaic as
+    # RGB; raw YUV frames give their luma plane and the RTL decode.
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"Input file does not exist: {path}")
+    ext = os.path.splitext(path)[1].lower()
+    if ext in PNM_EXTENSIONS:
+        import pnm
+        magic, width, height, max_val, samples = pnm.load_pnm(path)
+        channels = 3 if magic in ('P3', 'P6') else 1
+        count = width * height * channels
+        if samples.size < count:
+            raise ValueError(f"{path} holds {samples.size} of {count} samples")
+        image = samples[:count].reshape((height, width, 3) if channels == 3 else (height, width))
+    elif ext in IMAGE_EXTENSIONS and not layout:
+        import cv2
+        img = cv2.imread(path)
+        if img is None:
+            raise ValueError(f"Cannot read image {path}")
+        code = cv2.COLOR_BGR2GRAY if mode == 'gray' else cv2.COLOR_BGR2RGB
+        return cv2.cvtColor(img, code), 255
+    else:
+        import numpy as np
+        from raw_frame import RawFrame
+        width, height = raw_size or (None, None)
+        frame = RawFrame(path, layout, width, height, pattern, bit_depth)
+        return np.array(raw_image(frame, mode)), (1 << bit_depth) - 1
+
+    if mode == 'gray' and image.ndim == 3:
+        image = rgb_to_gray(image)
+    elif mode == 'rgb' and image.ndim == 2:
+        import numpy as np
+        image = np.repeat(image[..., None], 3, axis=2)
+    return image, max_val
+
+def raw_image(frame, mode='any'):
+    # One RawFrame as load_image returns it: the Bayer mosaic or YUV luma
+    # plane as gray, the golden demosaic or RTL decode as RGB.
+    if frame.layout == 'bayer':
+        if mode == 'gray':
+            return frame['raw']
+        from golden.demosaic import demosaic
+        return demosaic(frame['raw'], frame.pattern)
+    if frame.bit_depth != 8:
+        raise ValueError(f"{frame.layout.upper()} frames are 8-bit, got --bit-depth {frame.bit_depth}")
+    if mode == 'gray':
+        return frame['y']
+    import yuv
+    return yuv.decode_yuv(frame.data, frame.layout, frame.width, frame.height)
+
+def iter_frames(sources, mode='any', raw_size=None, layout=None, pattern=None, bit_depth=8):
+    # Yields (name, image) one frame at a time, converted as load_image
+    # does: PNM and image files give one frame, raw Bayer/YUV files every
+    # frame they hold (through a memory map), and directories or videos
+    # every image they decode.
+    from raw_frame import RawFrame, detect_layout
+    for source in sources:
+        ext = os.path.splitext(source)[1].lower()
+        if ext in PNM_EXTENSIONS + IMAGE_EXTENSIONS and not layout:
+            yield source, load_image(source, mode, raw_size, layout, pattern, bit_depth)[0]
+        elif os.path.isdir(source) or not (layout or detect_layout(source)[0]):
+            import cv2
+            from stimulus_stream import iter_source_frames
+            code = cv2.COLOR_BGR2GRAY if mode == 'gray' else cv2.COLOR_BGR2RGB
+            for name, img in iter_source_frames(source):
+                yield name, cv2.cvtColor(img, code)
+        else:
+            width, height = raw_size or (None, None)
+            for frame in RawFrame(source, layout, width, height, pattern, bit_depth).frames():
+                yield f"{os.path.basename(source)}#{frame.frame}", raw_image(frame, mode)
+
+def convert_pnm(input_path, output_path, magic, raw_options=None):
+    import pnm
+    gray = magic in ('P2', 'P5')
+    try:
+        image, max_val = load_image(input_path, 'gray' if gray else 'rgb', **(raw_options or {}))
+        write = pnm.write_pgm if gray else pnm.write_ppm
+        write(output_path, image, max_val, magic)
+    except (OSError, ValueError, IndexError) as e:
+        print(f"Error: {e}")
+        return False
+    print(f"Conversion successful! {'PGM' if gray else 'PPM'} {magic} file saved to {output_path}")
+    print(f"Output file dimensions: {image.shape[1]} x {image.shape[0]}")
+    return True
+
+def convert_bayer(input_path, outputs, bit_depth=8, packing=None):
+    # outputs maps each pattern to its output path; the input is read once.
+    from jpg2bayer import encode_bayer, rgb_to_bayer_patterns
+    try:
+        rgb, max_val = load_image(input_path, 'rgb')
+        if max_val != 255:
+            raise ValueError(f"Bayer mosaics are built from 8-bit images, {input_path} has max value {max_val}")
+        mosaics = rgb_to_bayer_patterns(rgb, list(outputs))
+        for pattern, bayer_path in outputs.items():
+            with open(bayer_path, 'wb') as f:
+                f.write(encode_bayer(mosaics[pattern.upper()], bit_depth, packing))
+            print(f"Conversion successful! Bayer file saved to {bayer_path}")
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return False
+    return True
+
+def convert_bayer_pattern(input_path, output_path, pattern, bit_depth=8, packing=None):
+    return convert_bayer(input_path, {pattern: output_path}, bit_depth, packing)
+
+def convert_yuv(input_path, output_path, layout, matrix=None):
+    import numpy as np
+    import yuv
+    try:
+        rgb, max_val = load_image(input_path, 'rgb')
+        if max_val != 255:
+            raise ValueError(f"YUV frames are built from 8-bit images, {input_path} has max value {max_val}")
+        frame = yuv.encode_yuv(np.ascontiguousarray(rgb[..., ::-1]), layout, matrix)
+        frame.tofile(output_path)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return False
+    print(f"Conversion successful! {layout.upper()} file saved to {output_path}")
+    return True
+
+def convert_jpg(input_path, output_path, quality=95, raw_options=None):
+    import cv2
+    import numpy as np
+    try:
+        image, max_val = load_image(input_path, 'any', **(raw_options or {}))
+        if max_val != 255:
+            # Rescale deeper samples to the full 8-bit range.
+            image = ((image.astype(np.uint32) * 255 + max_val // 2) // max_val).astype(np.uint8)
+        if image.ndim == 3:
+            image = cv2.cvtColor(image, cv2.COLOR_RGB2BGR)
+        if not cv2.imwrite(output_path, image, [cv2.IMWRITE_JPEG_QUALITY, quality]):
+            raise ValueError(f"Cannot write image {output_path}")
+    except (OSError, ValueError, IndexError) as e:
+        print(f"Error: {e}")
+        return False
+    print(f"Conversion successful! Image saved to {output_path}")
+    return True
+
+def _raw_options(args):
+    return {'raw_size': args.raw_size, 'layout': args.layout, 'pattern': args.pattern,
+            'bit_depth': args.bit_depth}
+
+def run_resize(args):
+    import cv2
+    import conversion_cache
+    from image_resize import resize_image, resize_params
+    interpolation = {
+        'nearest': cv2.INTER_NEAREST,
+        'linear': cv2.INTER_LINEAR,
+        'cubic': cv2.INTER_CUBIC,
+        'area': cv2.INTER_AREA,
+        'lanczos': cv2.INTER_LANCZOS4,
+    }[args.interpolation]
+    return conversion_cache.cached_convert(resize_image, args.input, args.output,
+                                           resize_params(args.width, args.height, args.scale, interpolation,
+                                                         args.raw_size, args.bit_depth, args.strips),
+                                           args.width, args.height, args.scale, interpolation, args.strips,
+                                           args.raw_size, args.bit_depth)
+
+def run_pnm(args):
+    import conversion_cache
+    raw_options = _raw_options(args)
+    return conversion_cache.cached_convert(convert_pnm, args.input, args.output,
+                                           {'format': args.format, **raw_options}, args.format, raw_options)
+
+def run_bayer(args):
+    from jpg2bayer import cached_bayer_patterns, pattern_outputs
+    outputs = pattern_outputs(args.output, args.patterns)
+    return cached_bayer_patterns(convert_bayer_pattern, convert_bayer, args.input, outputs, args.bit_depth,
+                                 args.packing)
+
+def run_yuv(args):
+    import conversion_cache
+    from raw_frame import detect_layout
+    layout = args.layout or detect_layout(args.output)[0]
+    if layout not in YUV_LAYOUTS:
+        print(f"Error: Cannot determine YUV layout for {args.output}, please specify one")
+        return False
+    return conversion_cache.cached_convert(convert_yuv, args.input, args.output,
+                                           {'layout': layout, 'matrix': args.matrix}, layout, args.matrix)
+
+def run_jpg(args):
+    import conversion_cache
+    raw_options = _raw_options(args)
+    return conversion_cache.cached_convert(convert_jpg, args.input, args.output,
+                                           {'quality': args.quality, **raw_options}, args.quality, raw_options)
+
+def build_parser():
+    parser = argparse.ArgumentParser(prog='fpga-image',
+                                     description='Convert and resize images for the FPGA testbenches')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    raw = argparse.ArgumentParser(add_help=False)
+    group = raw.add_argument_group('raw input')
+    group.add_argument('--raw-size', type=parse_size, help='WIDTHxHEIGHT of a raw input (default: from the file name)')
+    group.add_argument('--layout', choices=RAW_LAYOUTS, help='Raw layout (default: from the file name)')
+    group.add_argument('--pattern', choices=BAYER_PATTERNS, help='Bayer pattern (default: from the file name)')
+    group.add_argument('--bit-depth', type=int, default=8, help='Bits per raw sample (default: 8)')
+
+    resize = subparsers.add_parser('resize', help='Resize an image, PNM or raw frame')
+    resize.add_argument('-W', '--width', type=int, help='Target width')
+    resize.add_argument('-H', '--height', type=int, help='Target height')
+    resize.add_argument('-s', '--scale', type=float, default=1.0, help='Scale factor (default: 1.0)')
+    resize.add_argument('-i', '--interpolation', default='linear', choices=INTERPOLATIONS,
+                        help='Interpolation method (default: linear)')
+    resize.add_argument('--strips', nargs='?', type=int, const=256, metavar='ROWS',
+                        help='Stream binary PGM/PPM or raw input in bands of ROWS output rows (default ROWS: 256)')
+    resize.add_argument('--raw-size', type=parse_size, help='WIDTHxHEIGHT of a raw input (default: from the file name)')
+    resize.add_argument('--bit-depth', type=int, default=8, help='Bits per sample of a raw input (default: 8)')
+    resize.set_defaults(run=run_resize)
+
+    to_pgm = subparsers.add_parser('to-pgm', parents=[raw], help='Write a grayscale PGM')
+    to_pgm.add_argument('-f', '--format', default='P2', choices=['P2', 'P5'], help='PGM format (default: P2)')
+    to_pgm.set_defaults(run=run_pnm)
+
+    to_ppm = subparsers.add_parser('to-ppm', parents=[raw], help='Write an RGB PPM')
+    to_ppm.add_argument('-f', '--format', default='P3', choices=['P3', 'P6'], help='PPM format (default: P3)')
+    to_ppm.set_defaults(run=run_pnm)
+
+    to_bayer = subparsers.add_parser('to-bayer', help='Write raw Bayer mosaics')
+    to_bayer.add_argument('-p', '--patterns', nargs='+', default=['BGGR'], choices=BAYER_PATTERNS,
+                          help="Bayer pattern(s); several write '<stem>_<pattern>.raw' (default: BGGR)")
+    to_bayer.add_argument('-b', '--bit-depth', type=int, default=8, choices=BAYER_BIT_DEPTHS,
+                          help='Sample depth; above 8 bits samples are little-endian 16-bit words (default: 8)')
+    to_bayer.add_argument('--packing', choices=MIPI_PACKINGS, help='Write MIPI CSI-2 packed RAW10/RAW12 instead')
+    to_bayer.set_defaults(run=run_bayer)
+
+    to_yuv = subparsers.add_parser('to-yuv', help='Write a raw YUV frame')
+    to_yuv.add_argument('-l', '--layout', choices=YUV_LAYOUTS, help='YUV layout (default: from the output name)')
+    to_yuv.add_argument('-m', '--matrix', choices=YUV_MATRICES,
+                        help='Color matrix (default: yuv for yuv422p, bt601 otherwise)')
+    to_yuv.set_defaults(run=run_yuv)
+
+    to_jpg = subparsers.add_parser('to-jpg', parents=[raw], help='Write a JPEG (or any format OpenCV writes)')
+    to_jpg.add_argument('-q', '--quality', type=int, default=95, help='JPEG quality (default: 95)')
+    to_jpg.set_defaults(run=run_jpg)
+
+    for command in subparsers.choices.values():
+        command.add_argument('input', help='Input image, PNM or raw file')
+        command.add_argument('output', help='Output file')
+    return parser
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    if args.run(args) is False:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,13 @@
+from .demosaic import BAYER_MODELS, PATTERN_SELECT, bayer2rgb, demosaic
+from .histogram import HIST_BINS, HIST_WIDTH, cdf, equalization_lut, histogram, histogram_stream
+from .homography import homography_basic, homography_enhanced, interpolation_weights, warp
+from .linear import (LINEAR_MODELS, emboss, gauss5x5, gauss9x9, laplacian3x3, mean3x3, mean7x7,
+                     mean9x9, mean9x9_linebuffer, sobel, sobel_basic, sobel_basic_stream)
+from .nonlinear import (NONLINEAR_MODELS, bilateral3x3, bilateral5x5, bilateral9x9, dilation,
+                        erosion, median3x3, median7x7, median9x9, window_rank)
+from .pipeline import (POINT_LUTS, STAGES, WINDOW_MODELS, fuse, parse_stages, rgb2gray, rgb2gray_sobel,
+                       run_pipeline)
+from .remap import remap
+from .stream import (WINDOW_ENGINES, clocked, engine_stream, stream_kernel, stream_timing,
+                     window_stream)
+from .window import SCHEDULES, testbench_frame
@@ -0,0 +1,42 @@
+import argparse
+import numpy as np
+import pnm
+from raw_frame import BAYER_PATTERNS, RawFrame
+from . import BAYER_MODELS, LINEAR_MODELS, NONLINEAR_MODELS, SCHEDULES
+
+MODELS = dict(LINEAR_MODELS, **NONLINEAR_MODELS)
+
+def main():
+    parser = argparse.ArgumentParser(description='Compute the expected testbench output of an RTL module')
+    parser.add_argument('model', choices=sorted(MODELS) + sorted(BAYER_MODELS), help='RTL module to model')
+    parser.add_argument('input', help='Input PGM file, or raw Bayer frame for bayer2rgb/demosaic')
+    parser.add_argument('output', help='Output PGM file (written as P2, like the testbenches), or PPM for Bayer models')
+    parser.add_argument('-s', '--schedule', default='iverilog', choices=SCHEDULES,
+                        help='Simulator whose event ordering to reproduce (default: iverilog)')
+    parser.add_argument('-p', '--pattern', choices=BAYER_PATTERNS, help='Bayer pattern (default: from file name)')
+    parser.add_argument('-W', '--width', type=int, help='Raw Bayer frame width')
+    parser.add_argument('-H', '--height', type=int, help='Raw Bayer frame height')
+    args = parser.parse_args()
+
+    if args.model in BAYER_MODELS:
+        try:
+            frame = RawFrame(args.input, 'bayer', args.width, args.height, args.pattern)
+        except (ValueError, IndexError) as e:
+            print(f"Error: {e}")
+            return
+        result = BAYER_MODELS[args.model](np.asarray(frame['raw']), frame.pattern)
+        pnm.write_ppm(args.output, result, 255, 'P6')
+        print(f"Expected {args.model} ({frame.pattern}) output saved to {args.output}")
+        return
+
+    image, max_val, _ = pnm.read_pgm(args.input)
+    if max_val != 255:
+        # Same rescaling the benches apply while reading the input
+        image = np.clip(image.astype(np.int64) * 255 // max_val, 0, 255).astype(np.uint8)
+
+    result = MODELS[args.model](image, args.schedule)
+    pnm.write_pgm(args.output, result, 255, 'P2')
+    print(f"Expected {args.model} output saved to {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+import numpy as np
+from raw_frame import check_pattern
+
+# pattern_select input of bayer2rgb.v
+PATTERN_SELECT = {'RGGB': 0, 'BGGR': 1, 'GRBG': 2, 'GBRG': 3}
+
+# x_cnt/y_cnt in bayer2rgb.v are 10 bits wide.
+COUNTER_LIMIT = 1 << 10
+
+def _mean(taps, dtype):
+    # (sum + n/2) >> log2(n) for two or four taps, accumulated in place.
+    total = np.add(taps[0], taps[1], dtype=dtype)
+    for tap in taps[2:]:
+        total += tap
+    total += len(taps) // 2
+    total >>= len(taps) // 2
+    return total
+
+def _interpolate(tap, pattern, height, width, dtype, wide):
+    # Bilinear demosaic as bayer2rgb.v computes it. tap(row, col, i, j) is
+    # window[i][j] for every pixel of the (row, col) phase, as a
+    # ((height+1)//2, (width+1)//2) plane; each phase reads only the taps its
+    # color needs and the results are interleaved through a 2x2 view.
+    half_height, half_width = (height + 1) // 2, (width + 1) // 2
+    out = np.empty((half_height, 2, half_width, 2, 3), dtype=dtype)
+    for index, color in enumerate(pattern):
+        row, col = divmod(index, 2)
+
+        def t(i, j):
+            return tap(row, col, i, j)
+
+        center = t(1, 1)
+        if color == 'G':
+            horiz = _mean([t(1, 0), t(1, 2)], wide)
+            vert = _mean([t(0, 1), t(2, 1)], wide)
+            # Green takes red from along its row when it sits on a red row.
+            red, blue = (horiz, vert) if pattern[row * 2 + 1 - col] == 'R' else (vert, horiz)
+            green = center
+        else:
+            green = _mean([t(1, 0), t(1, 2), t(0, 1), t(2, 1)], wide)
+            diagonal = _mean([t(0, 0), t(0, 2), t(2, 0), t(2, 2)], wide)
+            red, blue = (center, diagonal) if color == 'R' else (diagonal, center)
+        out[:, row, :, col, 0] = red
+        out[:, row, :, col, 1] = green
+        out[:, row, :, col, 2] = blue
+    return out.reshape(2 * half_height, 2 * half_width, 3)[:height, :width]
+
+def _wide_dtype(samples):
+    # Four samples plus rounding stay below 2**16 up to 14-bit data.
+    if samples.dtype.itemsize == 1 or samples.max(initial=0) < (1 << 14):
+        return np.uint16
+    return np.uint32
+
+def demosaic(bayer, pattern='RGGB'):
+    # The demosaic without the RTL pipeline: a 3x3 window over the mosaic
+    # with replicated borders, as tb_bayer2rgb_python.v computed for RGGB.
+    # Works on any sample depth; returns RGB in the input dtype.
+    pattern = check_pattern(pattern)
+    height, width = bayer.shape
+    padded = np.pad(bayer, ((1, 1 + height % 2), (1, 1 + width % 2)), mode='edge')
+    # The four phase planes of the padded mosaic; every tap of every phase
+    # is a shifted slice of one of them.
+    phases = [[np.ascontiguousarray(padded[a::2, b::2]) for b in range(2)] for a in range(2)]
+    half_height, half_width = (height + 1) // 2, (width + 1) // 2
+
+    def tap(row, col, i, j):
+        a, b = row + i, col + j
+        return phases[a % 2][b % 2][a // 2:a // 2 + half_height, b // 2:b // 2 + half_width]
+
+    return _interpolate(tap, pattern, height, width, bayer.dtype, _wide_dtype(bayer))
+
+def _rtl_taps(bayer):
+    # window[i][j] as bayer2rgb.v registers it for each pixel. line_buffer[2]
+    # still holds the previous row to the right of x_cnt, and line_buffer[1]
+    # is that row copied on the last pixel of the row, before its own last
+    # sample lands, so its last column lags one more row. Both the top and
+    # bottom window rows read line_buffer[1]; the first row has no top row
+    # and uses its own middle row instead.
+    height, width = bayer.shape
+    pixels = bayer.astype(np.uint8)
+    previous = np.zeros_like(pixels)
+    previous[1:] = pixels[:-1]
+    above = previous.copy()
+    above[:, -1] = 0
+    above[2:, -1] = pixels[:-2, -1]
+
+    left = np.concatenate([pixels[:, :1], pixels[:, :-1]], axis=1)
+    right = np.concatenate([previous[:, 1:], pixels[:, -1:]], axis=1)
+    above_left = np.concatenate([above[:, :1], above[:, :-1]], axis=1)
+    above_right = np.concatenate([above[:, 1:], above[:, -1:]], axis=1)
+
+    first = (np.arange(height) % COUNTER_LIMIT == 0)[:, None]
+    top = [np.where(first, middle, upper) for middle, upper in
+           ((left, above_left), (pixels, above), (right, above_right))]
+    return [top, [left, pixels, right], [above_left, above, above_right]]
+
+def bayer2rgb(bayer, pattern='RGGB'):
+    # Frame that tb_bayer2rgb.v writes for an 8-bit mosaic streamed one
+    # pixel per clock. The output stage pairs data_valid from two edges back
+    # with the window and x_sync/y_sync of the pixel after it, so every
+    # output pixel is its successor's result; the last one reuses the final
+    # window with the wrapped counters (x 0, y IMAGE_HEIGHT).
+    pattern = check_pattern(pattern)
+    height, width = bayer.shape
+    if width > COUNTER_LIMIT:
+        raise ValueError(f"bayer2rgb.v counts columns in 10 bits, so frames wider than {COUNTER_LIMIT} are not supported")
+    taps = [[np.pad(plane, ((0, height % 2), (0, width % 2))) for plane in row] for row in _rtl_taps(bayer)]
+    result = _interpolate(lambda row, col, i, j: taps[i][j][row::2, col::2], pattern, height, width,
+                          np.uint8, np.uint16).reshape(-1, 3)
+
+    out = np.empty_like(result)
+    out[:-1] = result[1:]
+    # Evaluate the last window on a 2x2 grid so it lands on the phase of the
+    # wrapped counters.
+    last_row = (height % COUNTER_LIMIT) % 2
+    last = [[taps[i][j][height - 1, width - 1] for j in range(3)] for i in range(3)]
+    out[-1] = _interpolate(lambda row, col, i, j: np.full((1, 1), last[i][j]), pattern, 2, 2,
+                           np.uint8, np.uint16)[last_row, 0]
+    return out.reshape(height, width, 3)
+
+BAYER_MODELS = {
+    'bayer2rgb': bayer2rgb,
+    'demosaic': demosaic,
+}
@@ -0,0 +1,61 @@
+import numpy as np
+
+# histogram.v / histogram_rgb.v defaults: one bin per 8-bit value, 18-bit
+# counters that wrap.
+HIST_BINS = 256
+HIST_WIDTH = 18
+
+def histogram(frame, bins=HIST_BINS, hist_width=HIST_WIDTH):
+    # Counts of one frame: (bins,) for a gray frame, (3, bins) for RGB.
+    # histogram.v ignores samples of bins and above; the counters keep
+    # hist_width bits.
+    frame = np.asarray(frame)
+    planes = [frame] if frame.ndim == 2 else [frame[..., channel] for channel in range(frame.shape[2])]
+    counts = []
+    for plane in planes:
+        samples = plane.ravel()
+        if samples.size and int(samples.max()) >= bins:
+            samples = samples[samples < bins]
+        counts.append(np.bincount(samples, minlength=bins)[:bins])
+    counts = np.stack(counts) & ((1 << hist_width) - 1)
+    return counts[0] if frame.ndim == 2 else counts
+
+def histogram_stream(frames, bins=HIST_BINS, hist_width=HIST_WIDTH, clear_every=None):
+    # Yields (frame_counts, accumulated_counts) for every frame, keeping only
+    # the running counters: the RTL accumulates until clear_hist, so the
+    # totals wrap at hist_width bits like its memories. clear_every clears
+    # them before every Nth frame.
+    mask = (1 << hist_width) - 1
+    accumulated = None
+    for index, frame in enumerate(frames):
+        counts = histogram(frame, bins, hist_width)
+        if accumulated is None or (clear_every and index % clear_every == 0):
+            accumulated = np.zeros_like(counts)
+        accumulated = (accumulated + counts) & mask
+        yield counts, accumulated
+
+def cdf(counts):
+    return np.cumsum(np.asarray(counts, dtype=np.int64), axis=-1)
+
+def equalization_lut(counts):
+    # cv2.equalizeHist's table for every channel: the cumulative count past
+    # the first occupied bin, scaled by (bins - 1) / (total - first) in
+    # float32 and rounded half to even. Bins below the first occupied one
+    # map to 0; a single-valued histogram maps everything to that value.
+    counts = np.asarray(counts, dtype=np.int64)
+    flat = counts.reshape(-1, counts.shape[-1])
+    bins = flat.shape[-1]
+    luts = np.zeros(flat.shape, dtype=np.int64)
+    for lut, channel in zip(luts, flat):
+        occupied = np.flatnonzero(channel)
+        if occupied.size == 0:
+            continue
+        first = occupied[0]
+        total = int(channel.sum())
+        if channel[first] == total:
+            lut[:] = first
+            continue
+        scale = np.float32(bins - 1) / np.float32(total - channel[first])
+        running = np.cumsum(channel[first + 1:]).astype(np.float32)
+        lut[first + 1:] = np.clip(np.rint(running * scale), 0, bins - 1)
+    return luts.reshape(counts.shape)
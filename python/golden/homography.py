@@ -0,0 +1,88 @@
+import numpy as np
+
+# homography.v takes unsigned FRAC_WIDTH-bit coefficients; the quotient
+# x'/w' cancels their scale, and tb_homography.v writes 1.0 as 16'h0100.
+# homography_enhanced.v takes signed 32-bit coefficients with 1.0 = 1 << 16
+# and returns 16 fraction bits of the source coordinate.
+FRAC_WIDTH = 16
+BASIC_FRAC = 8
+ENHANCED_FRAC = 16
+
+def _wrap(values, bits):
+    # Two's-complement reinterpretation of the low bits, as a signed reg holds them.
+    sign = 1 << (bits - 1)
+    return ((values & ((1 << bits) - 1)) ^ sign) - sign
+
+def _divide(numerator, denominator):
+    # Verilog signed division: truncates toward zero, 0 for a zero denominator.
+    quotient = np.abs(numerator) // np.maximum(np.abs(denominator), 1)
+    quotient = np.where((numerator < 0) != (denominator < 0), -quotient, quotient)
+    return np.where(denominator == 0, 0, quotient)
+
+def _grid(coeffs, width, height):
+    # Coefficients (..., 9) against the raster of destination pixels; the
+    # leading axes stay in front of (height, width).
+    coeffs = np.asarray(coeffs, dtype=np.int64)
+    h = coeffs.reshape(coeffs.shape[:-1] + (1, 1, 9))
+    dst_x = np.arange(width, dtype=np.int64)
+    dst_y = np.arange(height, dtype=np.int64)[:, None]
+    return h, dst_x, dst_y
+
+def homography_basic(coeffs, width, height, src_width=None, src_height=None, streamed=False):
+    # homography.v for every pixel of a width x height destination frame.
+    # The products and sums are unsigned and wrap to the 32-bit x'/y'/w'
+    # registers, which the divider then reads as signed; the quotient keeps
+    # its low COORD_WIDTH bits. coord_out_valid is registered from the
+    # previous src_x/src_y, so it only describes the current pixel when the
+    # input is held (as tb_homography.v does); streamed=True returns the
+    # flag for one pixel per clock, where it lags by a pixel and the first
+    # one compares the reset value 0.
+    src_width = width if src_width is None else src_width
+    src_height = height if src_height is None else src_height
+    mask = (1 << FRAC_WIDTH) - 1
+    h, dst_x, dst_y = _grid(np.asarray(coeffs, dtype=np.int64) & mask, width, height)
+    x = _wrap(h[..., 0] * dst_x + h[..., 1] * dst_y + h[..., 2], 32)
+    y = _wrap(h[..., 3] * dst_x + h[..., 4] * dst_y + h[..., 5], 32)
+    w = _wrap(h[..., 6] * dst_x + h[..., 7] * dst_y + h[..., 8], 32)
+    src_x = _divide(x, w) & 0xFFFF
+    src_y = _divide(y, w) & 0xFFFF
+    valid = (src_x < src_width) & (src_y < src_height)
+    if streamed:
+        flat = valid.reshape(valid.shape[:-2] + (-1,))
+        valid = np.concatenate([np.full(flat.shape[:-1] + (1,), src_width > 0 and src_height > 0),
+                                flat[..., :-1]], axis=-1).reshape(valid.shape)
+    return src_x, src_y, valid
+
+def homography_enhanced(coeffs, width, height, src_width=None, src_height=None):
+    # homography_enhanced.v for every destination pixel: signed 32-bit
+    # x'/y'/w' (dst_x/dst_y pass through $signed, so 16-bit coordinates
+    # from 32768 up are negative), x' << 16 divided by w' in 64 bits with
+    # truncation toward zero, then bits [31:16] and [15:0] of the quotient.
+    # Pixels whose unsigned integer part falls outside the source are
+    # dropped by the pipeline; valid marks the ones that come out.
+    src_width = width if src_width is None else src_width
+    src_height = height if src_height is None else src_height
+    h, dst_x, dst_y = _grid(_wrap(np.asarray(coeffs, dtype=np.int64), 32), width, height)
+    dst_x, dst_y = _wrap(dst_x, 16), _wrap(dst_y, 16)
+    x = _wrap(h[..., 0] * dst_x + h[..., 1] * dst_y + h[..., 2], 32)
+    y = _wrap(h[..., 3] * dst_x + h[..., 4] * dst_y + h[..., 5], 32)
+    w = _wrap(h[..., 6] * dst_x + h[..., 7] * dst_y + h[..., 8], 32)
+    temp_x = _divide(x << ENHANCED_FRAC, w)
+    temp_y = _divide(y << ENHANCED_FRAC, w)
+    src_x = (temp_x >> 16) & 0xFFFF
+    src_y = (temp_y >> 16) & 0xFFFF
+    valid = (src_x < src_width) & (src_y < src_height)
+    return src_x, src_y, temp_x & 0xFFFF, temp_y & 0xFFFF, valid
+
+def interpolation_weights(x_frac, y_frac):
+    # {x_frac MSB, y_frac MSB}, the INTERPOLATION_TYPE == 1 output.
+    return ((x_frac >> (FRAC_WIDTH - 1)) << 1) | (y_frac >> (FRAC_WIDTH - 1))
+
+def warp(image, src_x, src_y, valid):
+    # Nearest-neighbour frame the testbenches write: the source pixel where
+    # the coordinate came out valid and inside the image, 0 elsewhere.
+    image = np.asarray(image)
+    height, width = image.shape
+    inside = valid & (src_x < width) & (src_y < height)
+    index = np.where(inside, src_y * width + src_x, 0)
+    return np.where(inside, image.ravel().take(index), 0).astype(image.dtype)
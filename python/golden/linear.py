@@ -0,0 +1,148 @@
+import numpy as np
+from .window import accepted_stream, line_buffer_filter, row_sums, window_sum, window_tap
+
+BINOMIAL_5 = (1, 4, 6, 4, 1)
+BINOMIAL_9 = (1, 8, 28, 56, 70, 56, 28, 8, 1)
+SOBEL_ROWS = (0, 1, 2)
+
+def _box_mean(size):
+    def compute(stream, width):
+        taps = (1,) * size
+        return window_sum(stream, width, taps, taps) // (size * size)
+    return compute
+
+# The tb_mean*.v benches send one pixel every 11 clocks while reset is held
+# for 10, so the first pixel never reaches the filter.
+
+def mean3x3(image, schedule='iverilog'):
+    height, width = image.shape
+    return line_buffer_filter(image, schedule, _box_mean(3), 1, 1, 2, 10, 'first', 1,
+                               (width - 2) * (height - 2))
+
+def mean7x7(image, schedule='iverilog'):
+    height, width = image.shape
+    return line_buffer_filter(image, schedule, _box_mean(7), -1, 3, 2, 10, 'first', 1,
+                               (width - 6) * (height - 6))
+
+def mean9x9(image, schedule='iverilog'):
+    height, width = image.shape
+    return line_buffer_filter(image, schedule, _box_mean(9), -1, 4, 2, 10, 'first', 1,
+                               (width - 8) * (height - 8))
+
+def mean9x9_linebuffer(image):
+    # linebuffer.v: the alternative mean9x9 with whole-line shifts. It has
+    # no center outputs, so this returns (mean_valid, mean_out) per pixel.
+    # The sum accumulates in the 8-bit mean_out register before the divide,
+    # and reads past IMAGE_WIDTH-1 count as 0 (Icarus gives x for those).
+    height, width = image.shape
+    stream = accepted_stream(image)
+    count = stream.size
+    index = np.arange(count)
+    col = index % width
+    total = np.zeros(count, dtype=np.int64)
+    for row in range(9):
+        # linebuf[row] holds linebuf[0] as it was row pixels before the
+        # previous one; each column keeps the last pixel written to it.
+        written = index - 1 - row
+        for offset in range(9):
+            column = col + offset
+            source = written - ((written % width) - column) % width
+            ok = (column < width) & (written >= 0) & (source >= 0)
+            total += np.where(ok, stream[np.clip(source, 0, count - 1)], 0)
+    return index // width >= 8, ((total % 256) // 81).astype(np.uint8)
+
+def _gauss5x5(stream, width):
+    return (window_sum(stream, width, BINOMIAL_5, BINOMIAL_5) >> 8) & 0xFF
+
+def gauss5x5(image, schedule='iverilog'):
+    height, width = image.shape
+    return line_buffer_filter(image, schedule, _gauss5x5, 1, 2, 1, 5, 'rewrite', 2,
+                               width * height)
+
+def _gauss9x9(stream, width):
+    # The line buffers are never read: the "vertical" pass convolves the last
+    # nine horizontal sums of the pixel stream, so this is a 1x17 filter.
+    return (row_sums(row_sums(stream, BINOMIAL_9), BINOMIAL_9) >> 16) & 0xFF
+
+def gauss9x9(image, schedule='iverilog'):
+    height, width = image.shape
+    return line_buffer_filter(image, schedule, _gauss9x9, -1, 4, 1, 8, 'rewrite', 2,
+                               width * height)
+
+def _laplacian3x3(stream, width):
+    box = window_sum(stream, width, (1, 1, 1), (1, 1, 1))
+    center = window_tap(stream, width, 3, 1, 1)
+    return np.clip(9 * center - box + 128, 0, 255)
+
+def laplacian3x3(image, schedule='iverilog'):
+    height, width = image.shape
+    return line_buffer_filter(image, schedule, _laplacian3x3, -1, 1, 1, 3, 'rewrite', 3,
+                               width * height)
+
+def sobel(image, schedule='iverilog'):
+    # sobel.v only rotates its row registers on the hsync edge when
+    # gray_valid is also high, which tb_sobel.v never drives. The upper rows
+    # stay zero, window_valid never rises and the bench writes 0 everywhere.
+    return np.zeros(image.shape, dtype=np.uint8)
+
+def sobel_basic_stream(stream, width):
+    # sobel_basic.v over an accepted pixel stream, one value per pixel, for
+    # the bench replays to place. linebuf1 is filled from the registered
+    # mid_read, so the top row lags one more sample than the middle one.
+    gx = window_sum(stream, width, (1, 2, 1), (-1, 0, 1), SOBEL_ROWS)
+    gy = window_sum(stream, width, (-1, 0, 1), (1, 2, 1), SOBEL_ROWS)
+    return np.minimum(np.abs(gx) + np.abs(gy), 255)
+
+def sobel_basic(image, schedule='iverilog'):
+    height, width = image.shape
+    return line_buffer_filter(image, schedule, sobel_basic_stream, -1, 2, 4, 3, 'last', 0,
+                               width * height)
+
+def _shifted(image, rows, cols):
+    out = np.zeros_like(image)
+    height, width = image.shape
+    out[max(0, -rows):min(height, height - rows), max(0, -cols):min(width, width - cols)] = \
+        image[max(0, rows):min(height, height + rows), max(0, cols):min(width, width + cols)]
+    return out
+
+def emboss(image, schedule='iverilog'):
+    # tb_emboss.v waits for pixel_out_valid after every pixel, so the result
+    # does not depend on the schedule. The bottom window row loads pixel_in
+    # after the bench has already cleared it, so it is always zero.
+    height, width = image.shape
+    pixels = image.astype(np.int64)
+    w00, w01, w02 = _shifted(pixels, -1, -1), _shifted(pixels, -1, 0), _shifted(pixels, -2, 1)
+    w10, w11, w12 = _shifted(pixels, 0, -1), pixels.copy(), _shifted(pixels, -1, 1)
+
+    # Window registers only load when their column is in range, so the
+    # first and last columns keep what the previous pixel left there.
+    w00[:, 0] = np.concatenate([[0], w00[:-1, width - 1]])
+    w10[:, 0] = np.concatenate([[0], w10[:-1, width - 1]])
+    w02[:, width - 1] = w02[:, width - 2]
+    w12[:, width - 1] = w12[:, width - 2]
+    for window in (w00, w01, w02, w10, w11, w12):
+        window[0] = 0
+    w00[1, 0] = w10[1, 0] = 0
+
+    conv = np.clip(-2 * w00 - w01 - w10 + w11 + w12 + 128, 0, 255)
+
+    # The border test uses the delayed counters, which already point at the
+    # next pixel by the time the output is registered.
+    following = np.arange(1, height * width + 1)
+    next_row = (following // width) % height
+    next_col = following % width
+    border = ((next_col == 0) | (next_col == width - 1) |
+              (next_row == 0) | (next_row == height - 1)).reshape(height, width)
+    return np.where(border, w11, conv).astype(np.uint8)
+
+LINEAR_MODELS = {
+    'mean3x3': mean3x3,
+    'mean7x7': mean7x7,
+    'mean9x9': mean9x9,
+    'gauss5x5': gauss5x5,
+    'gauss9x9': gauss9x9,
+    'laplacian3x3': laplacian3x3,
+    'sobel': sobel,
+    'sobel_basic': sobel_basic,
+    'emboss': emboss,
+}
@@ -0,0 +1,454 @@
+from functools import lru_cache, partial
+import numpy as np
+from .linear import BINOMIAL_5, BINOMIAL_9
+from .window import REGISTERED_ROWS, SCHEDULES, line_buffer_filter, window_tap
+
+BINOMIAL_3 = (1, 2, 1)
+
+# Window pixels processed per NumPy pass; big enough to hide the Python
+# overhead of one comparator or tap, small enough to stay in cache.
+CHUNK = 1 << 16
+
+# Rank filters run comparator networks over whole arrays: each comparator is
+# an np.minimum/np.maximum pair applied to every window at once.
+
+def _merge(a, b, network):
+    # Batcher's odd-even merge of two sorted wire lists of any length.
+    if not a or not b:
+        return a + b
+    if len(a) == 1 and len(b) == 1:
+        network.append((a[0], b[0]))
+        return [a[0], b[0]]
+    even = _merge(a[0::2], b[0::2], network)
+    odd = _merge(a[1::2], b[1::2], network)
+    merged = [even[0]]
+    for low, high in zip(odd, even[1:]):
+        network.append((low, high))
+        merged += [low, high]
+    paired = min(len(odd), len(even) - 1)
+    return merged + odd[paired:] + even[paired + 1:]
+
+def _sort(wires, network):
+    if len(wires) < 2:
+        return list(wires)
+    half = len(wires) // 2
+    return _merge(_sort(wires[:half], network), _sort(wires[half:], network), network)
+
+def _full(network):
+    return [(low, high, True, True) for low, high in network]
+
+def _runs(lengths):
+    runs, start = [], 0
+    for length in lengths:
+        runs.append(list(range(start, start + length)))
+        start += length
+    return runs
+
+@lru_cache(maxsize=None)
+def _select(lengths, low, high):
+    # Comparators leaving ranks low..high of the union of sorted runs of the
+    # given lengths, and the wires that end up holding them. Runs are merged
+    # shortest first and wires that can no longer reach those ranks are
+    # dropped after every merge. Comparators whose outputs are never read
+    # again are removed or reduced to a single min or max.
+    network = []
+    total = sum(lengths)
+
+    def trim(run):
+        nonlocal total, low, high
+        while True:
+            above = max(0, len(run) - high - 1)
+            run = run[:len(run) - above]
+            total -= above
+            below = max(0, len(run) - (total - low))
+            run = run[below:]
+            total -= below
+            low -= below
+            high -= below
+            if not above and not below:
+                return run
+
+    runs = [trim(run) for run in _runs(lengths)]
+    while len(runs) > 1:
+        runs.sort(key=len)
+        runs = runs[2:] + [trim(_merge(runs[0], runs[1], network))]
+    outputs = runs[0][low:high + 1]
+
+    needed = set(outputs)
+    pruned = []
+    for a, b in reversed(network):
+        keep_min, keep_max = a in needed, b in needed
+        if keep_min or keep_max:
+            pruned.append((a, b, keep_min, keep_max))
+            needed.update((a, b))
+    return pruned[::-1], outputs
+
+@lru_cache(maxsize=None)
+def _merge_network(length):
+    network = []
+    outputs = _merge(*_runs((length, length)), network)
+    return _full(network), outputs
+
+@lru_cache(maxsize=None)
+def _sort_network(length):
+    network = []
+    outputs = _sort(list(range(length)), network)
+    return _full(network), outputs
+
+def _apply(network, outputs, wires):
+    # Wires this call allocated are updated in place, and a comparator that
+    # keeps both outputs writes its min into a spare array, so a network
+    # over large chunks costs no allocation per comparator. Wires passed in
+    # may be shared with other calls and are never written.
+    wires = list(wires)
+    owned = [False] * len(wires)
+    spare = None
+    for a, b, keep_min, keep_max in network:
+        low, high = wires[a], wires[b]
+        if keep_min and keep_max:
+            if spare is None:
+                spare = np.empty_like(low)
+            np.minimum(low, high, out=spare)
+            if owned[b]:
+                np.maximum(low, high, out=high)
+            else:
+                wires[b] = np.maximum(low, high)
+                owned[b] = True
+            wires[a], spare = spare, low if owned[a] else None
+            owned[a] = True
+        elif keep_min:
+            if owned[a]:
+                np.minimum(low, high, out=low)
+            else:
+                wires[a] = np.minimum(low, high)
+                owned[a] = True
+        elif owned[b]:
+            np.maximum(low, high, out=high)
+        else:
+            wires[b] = np.maximum(low, high)
+            owned[b] = True
+    return [wires[i] for i in outputs]
+
+def _core_parts(columns):
+    # Splits the columns two neighbouring windows share into power-of-two
+    # blocks, so each block is one level of the column merge tree.
+    parts = [1 << bit for bit in reversed(range(columns.bit_length())) if columns >> bit & 1]
+    if len(parts) == 1 and parts[0] > 1:
+        parts = [parts[0] // 2] * 2
+    return parts
+
+def window_rank(stream, width, size, rank, row_skew=REGISTERED_ROWS, chunk=CHUNK):
+    # Rank-th smallest value in the size x size window each accepted pixel
+    # completes (same skew as window_tap). Every column of the window is a
+    # sorted network output shared by the size windows that contain it;
+    # merged pairs of columns are shared the same way. Windows m and m+1
+    # (m even) overlap in size-1 columns, so only the ranks of that core
+    # that can still be the answer are selected once for both, and each
+    # window then merges in its own last column.
+    # Each chunk is split into even and odd positions, so it has to start
+    # on an even one.
+    chunk += chunk & 1
+    count = stream.size
+    offsets = [rows_up * width + row_skew[rows_up] for rows_up in range(size)]
+    reach = offsets[-1] + size
+    padded = np.concatenate([np.zeros(reach, dtype=np.uint8), stream.astype(np.uint8),
+                             np.zeros(2, dtype=np.uint8)])
+    out = np.zeros(count + 1, dtype=np.uint8)
+
+    parts = _core_parts(size - 1)
+    levels = max(parts).bit_length() - 1
+    core_size = (size - 1) * size
+    low, high = max(0, rank - size), min(rank, core_size - 1)
+    column_sort = _sort_network(size)
+    core = _select(tuple(part * size for part in parts), low, high)
+    final = _select((high - low + 1, size), rank - low, rank - low)
+
+    for start in range(0, count, chunk):
+        stop = min(start + chunk, count + (count & 1))
+        pairs = (stop - start) // 2
+        # Sorted columns K(q) for q in [first, stop); column q holds
+        # stream[q - offsets[d]] for every row d. They are sorted as two
+        # halves, q - first even and odd, so every later pass reads
+        # contiguous wires.
+        first = start - (size - 1)
+        halves = [_apply(*column_sort, [padded[reach + first + parity - offset:reach + stop - offset:2]
+                                        for offset in offsets])
+                  for parity in (0, 1)]
+        # merged[l] holds the union of columns q-2^l+1..q for even q from
+        # first + 2^l, two positions apart.
+        # Level l merges the level l-1 run ending at q with the one ending
+        # 2^(l-1) columns earlier; level 1 pairs the two parity halves.
+        merged = [None]
+        newer, older = [wire[1:] for wire in halves[0]], halves[1]
+        for level in range(1, levels + 1):
+            length = (stop - first - (1 << level)) // 2
+            below = _apply(*_merge_network(len(older)),
+                           [wire[:length] for wire in newer] + [wire[:length] for wire in older])
+            merged.append(below)
+            shift = (1 << level) // 2
+            newer, older = [wire[shift:] for wire in below], below
+
+        def run(level, position):
+            if level == 0:
+                index = position - first
+                return [wire[index // 2:index // 2 + pairs] for wire in halves[index % 2]]
+            index = (position - first - (1 << level)) // 2
+            return [wire[index:index + pairs] for wire in merged[level]]
+
+        runs, position = [], start
+        for part in parts:
+            level = part.bit_length() - 1
+            runs += run(level, position)
+            position -= part
+        shared = _apply(*core, runs)
+        out[start:stop:2] = _apply(*final, shared + run(0, start - (size - 1)))[0]
+        out[start + 1:stop:2] = _apply(*final, shared + run(0, start + 1))[0]
+    return out[:count].astype(np.int64)
+
+def _median(size):
+    def compute(stream, width):
+        return window_rank(stream, width, size, size * size // 2)
+    return compute
+
+def _median3x3(stream, width):
+    # mid_l is declared reg [7:8], so only the low two bits of the middle
+    # row's left pixel reach the sort.
+    stream = stream.astype(np.uint8)
+    taps = [window_tap(stream, width, 3, row, col) for row in range(3) for col in range(3)]
+    taps[3] &= 3
+    return _apply(*_select((1,) * 9, 4, 4), taps)[0].astype(np.int64)
+
+def median3x3(image, schedule='iverilog'):
+    # tb_median3x3.v starts from a zero buffer and keeps the first capture.
+    height, width = image.shape
+    return line_buffer_filter(image, schedule, _median3x3, 1, 1, 2, 3, 'once', 3, width * height,
+                              dtype=np.uint8)
+
+def median7x7(image, schedule='iverilog'):
+    height, width = image.shape
+    return line_buffer_filter(image, schedule, _median(7), -1, 3, 2, 6, 'rewrite', 2,
+                              width * height, dtype=np.uint8)
+
+def median9x9(image, schedule='iverilog'):
+    height, width = image.shape
+    return line_buffer_filter(image, schedule, _median(9), -1, 4, 2, 5, 'rewrite', 2,
+                              width * height, dtype=np.uint8)
+
+def _bilateral(weights):
+    size = len(weights)
+
+    def compute(stream, width, chunk=CHUNK):
+        # The range weight is 256 - 2|d| for |d| < 128 and 0 beyond; halved,
+        # it cancels in the final divide, and the center tap always has full
+        # weight, so the sum is never 0. Sums are taken relative to the
+        # center, c + (sum w*(x - c)) / (sum w), so each term w*(x - c) is
+        # at most 64*64 and seven of them fit int16. Terms are summed in int16
+        # per spatial weight and only those sums are scaled into int32.
+        # Range weights have more room: a group's sum, scaled by its spatial
+        # weight over a bucket's unit, is added into that bucket in uint16,
+        # and only the buckets are scaled into int32. A tap at shift +s and
+        # its mirror at -s weigh the same pixel pair, so one pass over a
+        # stretch s longer than the chunk serves both.
+        half = size // 2
+        center = half * width + REGISTERED_ROWS[half] + half
+        center_weight = 128 * weights[half] * weights[half]
+        groups = {}
+        for rows_up in range(size):
+            for col in range(size):
+                spatial = weights[size - 1 - rows_up] * weights[col]
+                # Position of the tap's pixel relative to the center's.
+                shift = center - (rows_up * width + REGISTERED_ROWS[rows_up] + size - 1 - col)
+                groups.setdefault(spatial, set()).add(shift)
+        reach = max(abs(shift) for shifts in groups.values() for shift in shifts)
+
+        buckets, plan = [], []
+        for spatial in sorted(groups):
+            # The center tap has w = 128 and w*(x - c) = 0 on every pixel.
+            shifts = groups[spatial] - {0}
+            if not shifts:
+                continue
+            load = 128 * len(shifts)
+            for bucket, (unit, used) in enumerate(buckets):
+                if spatial % unit == 0 and used + spatial // unit * load <= 0xffff:
+                    break
+            else:
+                bucket = len(buckets)
+                buckets.append((spatial, 0))
+            unit, used = buckets[bucket]
+            buckets[bucket] = unit, used + spatial // unit * load
+            # (shift, paired, restart): a restart flushes the term sum, which
+            # holds at most 7 terms, and begins a new one.
+            steps, terms = [], 7
+            for shift in sorted(shifts, reverse=True):
+                if shift < 0 and -shift in shifts:
+                    continue
+                paired = -shift in shifts
+                restart = terms + 1 + paired > 7
+                terms = (0 if restart else terms) + 1 + paired
+                steps.append((shift, paired, restart))
+            plan.append((spatial, steps, bucket, spatial // unit))
+
+        count = stream.size
+        front = center + 2 * reach
+        padded = np.concatenate([np.zeros(front, dtype=np.int16), stream.astype(np.int16)])
+        cap = np.full(chunk + reach, 128, dtype=np.int16)
+        diff = np.empty(chunk + reach, dtype=np.int16)
+        weight = np.empty(chunk + reach, dtype=np.int16)
+        out = np.empty(count, dtype=np.uint8)
+        for start in range(0, count, chunk):
+            length = min(chunk, count - start)
+            base = front + start - center
+            sums = [np.zeros(length, dtype=np.uint16) for _ in buckets]
+            weight_sum = np.empty(length, dtype=np.uint16)
+            term = np.empty(length, dtype=np.int16)
+            scaled = np.empty(length, dtype=np.int32)
+            weighted = np.zeros(length, dtype=np.int32)
+            for spatial, steps, bucket, scale in plan:
+                # Weights go straight into their bucket when unscaled.
+                into = sums[bucket] if scale == 1 else weight_sum
+                for index, (shift, paired, restart) in enumerate(steps):
+                    if restart and index:
+                        np.multiply(term, spatial, out=scaled, dtype=np.int32)
+                        weighted += scaled
+                    # diff[i] = x[p + shift] - x[p] from p = start - extra on,
+                    # so the mirror's pairs are the first length entries.
+                    extra = shift if paired else 0
+                    span = length + extra
+                    pair = diff[:span]
+                    pair_weight = weight[:span]
+                    np.subtract(padded[base - extra + shift:base + length + shift],
+                                padded[base - extra:base + length], out=pair)
+                    np.abs(pair, out=pair_weight)
+                    np.minimum(pair_weight, cap[:span], out=pair_weight)
+                    np.subtract(128, pair_weight, out=pair_weight)
+                    pair *= pair_weight
+                    # The weights are never negative, so their bits can be
+                    # added as uint16.
+                    bits = pair_weight.view(np.uint16)
+                    if index or scale == 1:
+                        into += bits[extra:]
+                        if paired:
+                            into += bits[:length]
+                    elif paired:
+                        np.add(bits[extra:], bits[:length], out=into)
+                    else:
+                        into[:] = bits
+                    if not restart:
+                        term += pair[extra:]
+                        if paired:
+                            term -= pair[:length]
+                    elif paired:
+                        np.subtract(pair[extra:], pair[:length], out=term)
+                    else:
+                        term[:] = pair
+                np.multiply(term, spatial, out=scaled, dtype=np.int32)
+                weighted += scaled
+                if scale != 1:
+                    weight_sum *= scale
+                    sums[bucket] += weight_sum
+            total = np.full(length, center_weight, dtype=np.int32)
+            for (unit, _), bucket_sum in zip(buckets, sums):
+                np.multiply(bucket_sum, unit, out=scaled, dtype=np.int32)
+                total += scaled
+            # Both sums are exact in float64 and the quotient is at most 255
+            # in magnitude, so rounding cannot carry it across an integer.
+            quotient = np.divide(weighted, total)
+            np.floor(quotient, out=quotient)
+            quotient += padded[base:base + length]
+            np.copyto(out[start:start + length], quotient, casting='unsafe')
+        return out
+    return compute
+
+def bilateral3x3(image, schedule='iverilog'):
+    height, width = image.shape
+    return line_buffer_filter(image, schedule, _bilateral(BINOMIAL_3), 1, 1, 1, 10, 'first', 1,
+                              (width - 2) * (height - 2), dtype=np.uint8)
+
+def bilateral5x5(image, schedule='iverilog'):
+    # bilat_valid is driven from both always blocks. Verilator lets the
+    # first block's clear win, so the bench never captures and writes back
+    # its input copy; Icarus keeps the output stage's value. That stage also
+    # drops centers two pixels from the right and bottom edges, and
+    # tb_bilateral5x5.v sets IMAGE_HEIGHT to the frame height.
+    if schedule == 'verilator':
+        return image.copy()
+    height, width = image.shape
+    return line_buffer_filter(image, schedule, _bilateral(BINOMIAL_5), 1, 2, 1, 1, 'rewrite', 5,
+                              width * height, height=height, dtype=np.uint8)
+
+def bilateral9x9(image, schedule='iverilog'):
+    height, width = image.shape
+    return line_buffer_filter(image, schedule, _bilateral(BINOMIAL_9), -1, 4, 1, 10, 'rewrite', 1,
+                              width * height, dtype=np.uint8)
+
+def _morphology(image, schedule, background_color, erode, missed):
+    # tb_erosion.v and tb_dilation.v stream binarize.v (THRESH=128) into the
+    # DUT one pixel per clock; the black instance gets the inverted image,
+    # so in both cases the foreground is the dark input pixels. The window
+    # is 3x3, but both line buffers are written with the same pixel, so it
+    # holds only six distinct values and a direct test over them is already
+    # constant time per pixel.
+    if schedule not in SCHEDULES:
+        raise ValueError(f"Unknown schedule: {schedule}, please choose one of {', '.join(SCHEDULES)}")
+    height, width = image.shape
+    count = height * width
+    background = 255 if background_color else 0
+    foreground = 255 - background
+    # Zero padding and the zeroed line buffers only match a black foreground.
+    pad_matches = foreground == 0
+    front = 2 * width
+    dark = np.concatenate([np.full(front, pad_matches), image.ravel() < 128, np.zeros(2, dtype=bool)])
+
+    # Output k is decided on the window around pixel k+2. The edge padding
+    # inside that window follows the counters one pixel behind it, while
+    # the border test sees them at k+2 as well.
+    col = np.arange(width)
+    row = np.arange(height)[:, None]
+    pad_col = (col + 1) % width
+    pad_row = row + (col == width - 1)
+    left, right = pad_col > 0, pad_col < width - 1
+    top, bottom = pad_row > 0, pad_row < height - 1
+
+    def tap(offset, keep=None):
+        start = front + 2 + offset
+        match = dark[start:start + count].reshape(height, width)
+        if keep is None:
+            return match
+        return match | ~keep if pad_matches else match & keep
+
+    middle = [tap(-1, left), tap(0), tap(1 - width, right)]
+    lower = [tap(-1, left & bottom), tap(0, bottom), tap(1 - width, right & bottom)]
+    upper = [tap(-1 - width, left & top), tap(-width, top), tap(1 - 2 * width, right & top)]
+    reduce = np.logical_and.reduce if erode else np.logical_or.reduce
+    hit = reduce(upper + middle + lower)
+
+    border_col = (col + 2) % width
+    border_row = row + (col + 2 >= width)
+    border = ((border_col < 1) | (border_col >= width - 1) |
+              (border_row < 1) | (border_row >= height - 1))
+    out = np.where(hit & ~border, foreground, background).astype(np.uint8).ravel()
+    # tb_erosion.v keeps sampling after the last pixel; tb_dilation.v stops
+    # with the last pixel and leaves the rest of its buffer at background.
+    if missed:
+        out[-missed:] = background
+    return out.reshape(image.shape)
+
+def erosion(image, schedule='iverilog', background_color=1):
+    return _morphology(image, schedule, background_color, True, 0)
+
+def dilation(image, schedule='iverilog', background_color=1):
+    return _morphology(image, schedule, background_color, False,
+                       6 if schedule == 'iverilog' else 5)
+
+NONLINEAR_MODELS = {
+    'median3x3': median3x3,
+    'median7x7': median7x7,
+    'median9x9': median9x9,
+    'erosion_white': partial(erosion, background_color=1),
+    'erosion_black': partial(erosion, background_color=0),
+    'dilation_white': partial(dilation, background_color=1),
+    'dilation_black': partial(dilation, background_color=0),
+    'bilateral3x3': bilateral3x3,
+    'bilateral5x5': bilateral5x5,
+    'bilateral9x9': bilateral9x9,
+}
@@ -0,0 +1,142 @@
+import numpy as np
+from .linear import LINEAR_MODELS, sobel_basic_stream
+from .nonlinear import NONLINEAR_MODELS
+from .window import SCHEDULES, accepted_stream, col_ptr_centers
+
+# rgb2gray.v: gray = (76 R + 150 G + 29 B)[15:8]
+RGB2GRAY_WEIGHTS = (76, 150, 29)
+# Rows per strip when point stages run strip by strip.
+STRIP_ROWS = 64
+
+def rgb2gray(rgb):
+    rgb = np.asarray(rgb, dtype=np.uint32)
+    r, g, b = RGB2GRAY_WEIGHTS
+    return (((rgb[..., 0] * r + rgb[..., 1] * g + rgb[..., 2] * b) >> 8) & 0xFF).astype(np.uint8)
+
+# Point stages as 256-entry tables, so a run of them folds into one lookup.
+
+def _threshold_lut(value=128):
+    # threshold.v (and binarize.v with THRESH = value): 255 from value up.
+    return np.where(np.arange(256) >= int(value), 255, 0).astype(np.uint8)
+
+def _brightness_lut(level=128):
+    # gray_brightness.v with brightness_enable: levels above 128 add twice
+    # the difference and saturate, levels below subtract it and floor at 0.
+    level = int(level)
+    gray = np.arange(256)
+    if level > 128:
+        return np.minimum(gray + (level - 128) * 2, 255).astype(np.uint8)
+    return np.maximum(gray - (128 - level), 0).astype(np.uint8)
+
+POINT_LUTS = {
+    'threshold': _threshold_lut,
+    'binarize': _threshold_lut,
+    'gray_brightness': _brightness_lut,
+}
+
+def rgb2gray_sobel(rgb, schedule='iverilog'):
+    # tb_rgb2gray_sobel.v: rgb2gray.v and a bench register in front of
+    # sobel_basic.v, one pixel every 5 clocks, and the bench keeps the first
+    # output it sees for the live center_row_s1/center_col_s1. By then the
+    # output belongs to the window two pixels on, so each center gets the
+    # value of the window three columns right of it. Both schedules first
+    # sample a center on the same two edges, so they give the same frame.
+    if schedule not in SCHEDULES:
+        raise ValueError(f"Unknown schedule: {schedule}, please choose one of {', '.join(SCHEDULES)}")
+    gray = rgb2gray(rgb)
+    height, width = gray.shape
+    stream = accepted_stream(gray)
+    value = sobel_basic_stream(stream, width).astype(np.uint8)
+    center, valid = col_ptr_centers(stream.size, width, -3, 2)
+    accept = np.flatnonzero(valid & (center >= 0))
+    position, index = np.unique(center[accept], return_index=True)
+    out = np.zeros(stream.size, dtype=np.uint8)
+    out[position] = value[accept[index]]
+    # When valid first rises the output stage still holds the windows of
+    # the first two centers themselves.
+    if height > 2 and width > 5:
+        out[2 * width + 2:2 * width + 4] = value[2 * width + 2:2 * width + 4]
+    return out.reshape(height, width)
+
+WINDOW_MODELS = dict(LINEAR_MODELS, **NONLINEAR_MODELS, rgb2gray_sobel=rgb2gray_sobel)
+RGB_STAGES = ('rgb2gray', 'rgb2gray_sobel')
+STAGES = sorted(set(POINT_LUTS) | set(WINDOW_MODELS) | {'rgb2gray'})
+
+def parse_stages(text):
+    # "rgb2gray,sobel_basic,threshold=64" -> [(name, argument), ...]
+    stages = []
+    for item in text.split(','):
+        name, _, argument = item.strip().partition('=')
+        if name not in STAGES:
+            raise ValueError(f"Unknown stage: {name}, please choose from {', '.join(STAGES)}")
+        if argument and name not in POINT_LUTS:
+            raise ValueError(f"Stage {name} takes no argument")
+        stages.append((name, int(argument) if argument else None))
+    return stages
+
+def fuse(stages, rgb=False):
+    # Folds every run of point stages into one step: ('point', rgb2gray
+    # first, combined LUT or None) or ('window', model). rgb says whether
+    # the pipeline input is RGB; only the RGB stages accept it.
+    steps = []
+    for name, argument in stages:
+        if rgb != (name in RGB_STAGES):
+            raise ValueError(f"Stage {name} takes {'a gray' if rgb else 'an RGB'} frame here")
+        if name in WINDOW_MODELS:
+            steps.append(('window', WINDOW_MODELS[name]))
+        elif steps and steps[-1][0] == 'point' and name != 'rgb2gray':
+            _, to_gray, lut = steps[-1]
+            table = POINT_LUTS[name]() if argument is None else POINT_LUTS[name](argument)
+            steps[-1] = ('point', to_gray, table if lut is None else table[lut])
+        elif name == 'rgb2gray':
+            steps.append(('point', True, None))
+        else:
+            steps.append(('point', False, POINT_LUTS[name]() if argument is None else POINT_LUTS[name](argument)))
+        rgb = False
+    return steps
+
+def _point(image, to_gray, lut, strip_rows, out):
+    # One pass over the frame strip by strip; the rgb2gray sums go through a
+    # scratch buffer the size of a strip, reused for every strip.
+    height = image.shape[0]
+    strip_rows = strip_rows or height
+    scratch = np.empty((min(strip_rows, height),) + image.shape[1:2], dtype=np.uint32) if to_gray else None
+    for start in range(0, height, strip_rows):
+        rows = slice(start, start + strip_rows)
+        target = out[rows]
+        if to_gray:
+            strip = image[rows]
+            total = scratch[:target.shape[0]]
+            r, g, b = RGB2GRAY_WEIGHTS
+            np.multiply(strip[..., 0], r, out=total, dtype=np.uint32)
+            total += strip[..., 1] * np.uint32(g)
+            total += strip[..., 2] * np.uint32(b)
+            total >>= 8
+            total &= 0xFF
+            if lut is None:
+                target[...] = total
+            else:
+                np.take(lut, total, out=target)
+        else:
+            np.take(lut, image[rows], out=target)
+    return out
+
+def run_pipeline(image, stages, schedule='iverilog', strip_rows=STRIP_ROWS, fused=False):
+    # Chains the stages in memory and returns the last stage's frame. With
+    # fused, stages are the steps fuse() returns rather than parse_stages()
+    # pairs. Point steps write into a buffer of their own, or straight into
+    # the frame a window model just returned, since nothing else holds it;
+    # the window models replay their benches over the whole frame.
+    image = np.asarray(image)
+    steps = stages if fused else fuse(stages, image.ndim == 3)
+    buffer = None
+    for step in steps:
+        if step[0] == 'window':
+            image = step[1](image, schedule)
+            buffer = image if image.ndim == 2 and image.dtype == np.uint8 else None
+            continue
+        _, to_gray, lut = step
+        if buffer is None:
+            buffer = np.empty(image.shape[:2], dtype=np.uint8)
+        image = _point(image.astype(np.uint8, copy=False), to_gray, lut, strip_rows, buffer)
+    return image
@@ -0,0 +1,34 @@
+import numpy as np
+
+# remap.v's map_x/map_y: unsigned fixed point with FRAC fraction bits.
+FRAC = 12
+MAP_BITS = 24
+
+def remap(image, map_x, map_y, frac=FRAC):
+    # Output of remap.v for every (map_x, map_y) word pair. The words are
+    # unsigned, so the integer part is only clamped at the far edge, and a
+    # neighbour past the last row or column is replaced by the pixel itself.
+    # The four taps are weighted by the fraction and its complement against
+    # 1 << frac, summed in the 32-bit integers of the RTL and truncated.
+    image = np.asarray(image)
+    height, width = image.shape
+    map_x = np.asarray(map_x, dtype=np.int64)
+    map_y = np.asarray(map_y, dtype=np.int64)
+    one = 1 << frac
+
+    ix = np.minimum(map_x >> frac, width - 1)
+    iy = np.minimum(map_y >> frac, height - 1)
+    wx = map_x & (one - 1)
+    wy = map_y & (one - 1)
+    right = np.where(ix + 1 < width, 1, 0)
+    below = np.where(iy + 1 < height, width, 0)
+
+    flat = image.ravel().astype(np.int64)
+    base = iy * width + ix
+    total = flat.take(base) * ((one - wx) * (one - wy))
+    total += flat.take(base + right) * (wx * (one - wy))
+    total += flat.take(base + below) * ((one - wx) * wy)
+    total += flat.take(base + below + right) * (wx * wy)
+    total &= 0xFFFFFFFF
+    total >>= 2 * frac
+    return (total & 0xFF).astype(np.uint8)
@@ -0,0 +1,91 @@
+from collections import deque
+import numpy as np
+from .window import column_bits
+
+# Line-buffer window engines as (rows, cols, shift, row border, col border,
+# latency). shift is what col_ptr adds to the column it reports as center,
+# the borders are the lowest center row/col that raises valid, and latency
+# is how many edges the output lags the window registers.
+WINDOW_ENGINES = {
+    'mean3x3': (3, 3, 1, 1, 1, 2),
+    'mean7x7': (7, 7, -1, 3, 3, 2),
+    'mean9x9': (9, 9, -1, 4, 4, 2),
+    'median3x3': (3, 3, 1, 1, 1, 2),
+    'median7x7': (7, 7, -1, 3, 3, 2),
+    'median9x9': (9, 9, -1, 4, 4, 2),
+    'census7x9': (7, 9, -1, 3, 4, 2),
+    'bilateral3x3': (3, 3, 1, 1, 1, 1),
+    'bilateral9x9': (9, 9, -1, 4, 4, 1),
+}
+
+def clocked(pixels, idle=0):
+    # One clock with gray_valid high per pixel, then `idle` clocks without;
+    # None marks a clock on which no pixel is offered.
+    for pixel in pixels:
+        yield pixel
+        for _ in range(idle):
+            yield None
+
+def window_stream(clocks, width, rows, cols=None, shift=-1, row_border=None, col_border=None, latency=2):
+    # Replays the col_ptr line-buffer engine one clock edge at a time. clocks
+    # yields a pixel (gray_valid high) or None per edge after reset. Each
+    # edge yields (row, col, window, valid) as the output stage holds them
+    # right after it: the center_row_s1/center_col_s1 that valid was decided
+    # from, the window the output value was computed from, and valid.
+    # State is the rows-1 line buffers, their read registers, the window and
+    # `latency` earlier copies of it, so the stream can be endless.
+    cols = cols or rows
+    row_border = (rows - 1) // 2 if row_border is None else row_border
+    col_border = (cols - 1) // 2 if col_border is None else col_border
+    col_mask = (1 << column_bits(width)) - 1
+    linebuf = np.zeros((rows - 1, width), dtype=np.uint8)
+    read = np.zeros(rows - 1, dtype=np.uint8)
+    window = np.zeros((rows, cols), dtype=np.uint8)
+    history = deque([window.copy() for _ in range(latency + 1)], maxlen=latency + 1)
+    col_ptr = row_cnt = 0
+    center_row = center_col = 0
+
+    for pixel in clocks:
+        valid = center_row >= row_border and center_col >= col_border
+        row, col = center_row, center_col
+        if pixel is not None:
+            # The window takes last edge's line-buffer reads, so every row
+            # above the incoming one lags one sample (REGISTERED_ROWS).
+            window[:, :-1] = window[:, 1:]
+            window[:-1, -1] = read[::-1]
+            window[-1, -1] = pixel
+            read = linebuf[:, col_ptr].copy()
+            linebuf[1:, col_ptr] = linebuf[:-1, col_ptr]
+            linebuf[0, col_ptr] = pixel
+            center_col = 0 if col_ptr == 0 else (col_ptr + shift) & col_mask
+            center_row = row_cnt
+            if col_ptr == width - 1:
+                col_ptr = 0
+                row_cnt += 1
+            else:
+                col_ptr += 1
+        history.append(window.copy())
+        yield row, col, history[0], valid
+
+def engine_stream(name, clocks, width):
+    rows, cols, shift, row_border, col_border, latency = WINDOW_ENGINES[name]
+    return window_stream(clocks, width, rows, cols, shift, row_border, col_border, latency)
+
+def stream_kernel(windows, kernel):
+    # Applies a reference kernel to every window: (row, col, value, valid).
+    for row, col, window, valid in windows:
+        yield row, col, kernel(window), valid
+
+def stream_timing(windows):
+    # Edges until valid first rises and valid edges per edge, measured over
+    # a finite run of window_stream.
+    first = None
+    count = edges = 0
+    for edge, (_, _, _, valid) in enumerate(windows):
+        edges = edge + 1
+        if valid:
+            count += 1
+            if first is None:
+                first = edge
+    return {'first_valid': first, 'valid_edges': count, 'edges': edges,
+            'valid_per_edge': count / edges if edges else 0.0}
@@ -0,0 +1,186 @@
+import numpy as np
+
+# When the testbench reads DUT registers after @(posedge clk): Icarus runs it
+# before that edge's non-blocking updates land, Verilator after them.
+SCHEDULES = ('iverilog', 'verilator')
+
+# Upper window rows come from t0/t1/... registers loaded one pixel earlier,
+# so every row above the incoming one lags by an extra sample.
+REGISTERED_ROWS = (0, 1, 1, 1, 1, 1, 1, 1, 1)
+
+def column_bits(width):
+    return max(1, (width - 1).bit_length())
+
+def accepted_stream(image, dropped=0, dtype=np.int64):
+    return image.ravel()[dropped:].astype(dtype, copy=False)
+
+def delay(stream, samples):
+    # stream[m - samples]; anything before the first pixel reads the
+    # zero-initialised line buffers and window registers.
+    if samples <= 0:
+        return stream
+    out = np.zeros_like(stream)
+    if samples < stream.size:
+        out[samples:] = stream[:-samples]
+    return out
+
+def row_sums(stream, taps):
+    # sum_j taps[j] * stream[m - (len(taps) - 1 - j)], oldest sample first
+    return np.convolve(stream, np.asarray(taps, dtype=np.int64)[::-1])[:stream.size]
+
+def window_sum(stream, width, row_taps, col_taps, row_skew=REGISTERED_ROWS):
+    # Separable weighted sum over the window each accepted pixel completes:
+    # the bottom row is the incoming stream, row d above it is d lines back
+    # plus that row's register skew.
+    line = row_sums(stream, col_taps)
+    total = np.zeros_like(stream)
+    size = len(row_taps)
+    for i, weight in enumerate(row_taps):
+        rows_up = size - 1 - i
+        if weight:
+            total += weight * delay(line, rows_up * width + row_skew[rows_up])
+    return total
+
+def window_tap(stream, width, size, row, col, row_skew=REGISTERED_ROWS):
+    rows_up = size - 1 - row
+    return delay(stream, rows_up * width + row_skew[rows_up] + size - 1 - col)
+
+def col_ptr_centers(count, width, shift, border, height=None):
+    # center_col_s1/center_row_s1 as registered on each accepted pixel, and
+    # whether the output stage raises valid for that center. With a height,
+    # centers within `border` of the right and bottom edges are invalid too.
+    # Centers are int32 (-1 outside the frame) to halve the replay's traffic.
+    rows = -(-count // width)
+    col = np.arange(width)
+    center_col = np.where(col == 0, 0, (col + shift) % (1 << column_bits(width)))
+    row = np.arange(rows, dtype=np.int32)[:, None]
+    col_valid = center_col >= border
+    row_valid = row >= border
+    if height is not None:
+        col_valid &= center_col < width - border
+        row_valid &= row < height - border
+    valid = row_valid & col_valid
+    center = np.empty((rows, width), dtype=np.int32)
+    np.add(row * width, center_col.astype(np.int32), out=center)
+    center[:, center_col >= width] = -1
+    return center.ravel()[:count], valid.ravel()[:count]
+
+def _unique(position, last=False):
+    # np.unique(..., return_index=True) for the first (or last) occurrence,
+    # returning (unique, select) where value[select] picks each occurrence's
+    # value. The benches visit centers in order, which skips the sort, and
+    # select is then a boolean mask so the values are compressed out rather
+    # than gathered (or everything, when no center repeats).
+    if np.all(position[1:] > position[:-1]):
+        return position, slice(None)
+    if np.all(position[1:] >= position[:-1]):
+        if last:
+            keep = np.append(position[1:] != position[:-1], True)
+        else:
+            keep = np.insert(position[1:] != position[:-1], 0, True)
+        return position[keep], keep
+    if last:
+        unique, index = np.unique(position[::-1], return_index=True)
+        return unique, position.size - 1 - index
+    return np.unique(position, return_index=True)
+
+def _resolve(out, position, value, hit, late, policy):
+    # Writes the surviving captures into out and returns how many the bench
+    # counted (None when it does not keep count). hit marks the clocks that
+    # capture, and late says whether each came on or after the clock that
+    # sent its center pixel. Every mask is applied to the full-length arrays
+    # at once, so each kept value is compressed out in a single pass.
+    # policy 'first': got[] is never cleared, so the first capture sticks
+    #   unless the input copy for that pixel is written after it.
+    # policy 'rewrite': writing the input copy clears got[], so only
+    #   captures made after the pixel was sent survive.
+    # policy 'once': no input copy; the first capture sticks.
+    # policy 'last': no input copy and no got[]; every capture overwrites.
+    if policy == 'once':
+        unique, select = _unique(position[hit])
+        out[unique] = value[hit][select]
+        return unique.size
+    if policy == 'last':
+        unique, select = _unique(position[hit], last=True)
+        out[unique] = value[hit][select]
+        return None
+    if policy == 'first':
+        unique, select = _unique(position[hit])
+        keep = late[hit][select]
+        out[unique[keep]] = value[hit][select][keep]
+        return unique.size
+    if policy == 'rewrite':
+        kept = hit & late
+        unique, select = _unique(position[kept])
+        out[unique] = value[kept][select]
+        return unique.size + _unique(position[hit & ~late])[0].size
+    raise ValueError(f"Unknown capture policy: {policy}")
+
+def testbench_frame(image, value, valid, center, latency, samples, policy, schedule='iverilog',
+                    dropped=0, drain_target=None, fill=0):
+    # Replays the capture loop of the tb_*.v benches: each accepted pixel is
+    # followed by `samples` clocks on which the bench copies the output into
+    # outbuf[center] whenever valid is high. value is the settled output for
+    # each accepted pixel; the output stage shows the previous pixel's result
+    # for `latency` edges and the previous center's valid for one edge.
+    if schedule not in SCHEDULES:
+        raise ValueError(f"Unknown schedule: {schedule}, please choose one of {', '.join(SCHEDULES)}")
+    flat = image.ravel()
+    # The benches write the low eight bits, so narrow early and keep every
+    # pass over the frame in bytes.
+    value = value.astype(np.uint8, copy=False)
+    in_frame = center >= 0
+    prev_valid = delay(valid, 1)
+    prev_valid &= in_frame
+    valid = valid & in_frame
+
+    # Sampled edges run from 0 (the accepting edge) under Icarus and from 1
+    # under Verilator. Every sample shares one center, so only the first (or
+    # last, when captures overwrite) valid sample of each pixel matters.
+    first_edge = 0 if schedule == 'iverilog' else 1
+    last_edge = first_edge + samples - 1
+    edge_zero = prev_valid if first_edge == 0 else np.zeros_like(valid)
+    if policy == 'last':
+        take_zero = edge_zero & ~valid
+        pick_edge = last_edge
+    else:
+        take_zero = edge_zero
+        pick_edge = 1
+    hit = take_zero | valid if last_edge >= 1 else take_zero
+    if pick_edge < latency:
+        sampled = delay(value, 1)
+    else:
+        # Edge-zero samples show the previous pixel's output, which is zero
+        # before the first one.
+        sampled = value.copy()
+        np.copyto(sampled[1:], value[:-1], where=take_zero[1:])
+        sampled[:1][take_zero[:1]] = 0
+
+    # Captures are compressed out with boolean masks rather than gathered
+    # through an index array; pixel k is sent on tick k + dropped.
+    late = None
+    if policy in ('first', 'rewrite'):
+        late = np.arange(dropped, dropped + center.size, dtype=np.int32) >= center
+    out = np.full(flat.size, fill, dtype=np.uint8) if policy in ('once', 'last') else flat.astype(np.uint8)
+    captured = _resolve(out, center, sampled, hit, late, policy)
+    if captured is None:
+        captured = int(np.count_nonzero(edge_zero)) + int(np.count_nonzero(valid)) * max(0, last_edge)
+
+    if drain_target is not None and captured < drain_target and valid.size and valid[-1]:
+        # After the last pixel the bench keeps sampling the settled output,
+        # which can only change the last center; that sample is late.
+        same = hit & (center == center[-1])
+        _resolve(out, np.append(center[same], center[-1]), np.append(sampled[same], value[-1]),
+                 np.ones(np.count_nonzero(same) + 1, dtype=bool),
+                 None if late is None else np.append(late[same], True), policy)
+    return out.reshape(image.shape)
+
+def line_buffer_filter(image, schedule, compute, shift, border, latency, samples, policy,
+                       dropped, drain_target, fill=0, height=None, dtype=np.int64):
+    # compute(stream, width) gives the settled output for each accepted pixel;
+    # the stream is read as dtype, which the rank and bilateral kernels keep
+    # at the image's bytes.
+    stream = accepted_stream(image, dropped, dtype)
+    center, valid = col_ptr_centers(stream.size, image.shape[1], shift, border, height)
+    return testbench_frame(image, compute(stream, image.shape[1]), valid, center, latency, samples,
+                           policy, schedule, dropped, drain_target, fill)
@@ -0,0 +1,100 @@
+import argparse
+import os
+import sys
+import time
+import numpy as np
+import pnm
+from fpga_image import BAYER_PATTERNS, RAW_LAYOUTS, load_image, parse_size
+from golden import SCHEDULES, STAGES, parse_stages, run_pipeline
+from golden.pipeline import RGB_STAGES, STRIP_ROWS
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Multi-stage benches: (stages, input, output the bench writes, fixture).
+# The fixture is a known-good dump of the bench, kept under data/ so the
+# models can be checked without running the simulator.
+BENCH_CASES = {
+    'rgb2gray_sobel': ('rgb2gray_sobel', os.path.join(ROOT, 'data', 'rgb1.ppm'),
+                       os.path.join(ROOT, 'output', 'out_sobel1.pgm'),
+                       os.path.join(ROOT, 'data', 'rgb1_rgb2gray_sobel.pgm')),
+}
+
+def check_output(path, expected):
+    output, _, _ = pnm.read_pgm(path)
+    if output.shape != expected.shape:
+        print(f"{path}: FAIL, {output.shape[1]}x{output.shape[0]} vs expected "
+              f"{expected.shape[1]}x{expected.shape[0]}")
+        return False
+    mismatched = np.argwhere(output != expected)
+    if len(mismatched) == 0:
+        print(f"{path}: PASS, {expected.size} pixels match")
+        return True
+    print(f"{path}: FAIL, {len(mismatched)}/{expected.size} pixels differ")
+    for row, col in mismatched[:10]:
+        print(f"  ({row}, {col}): output {output[row, col]}, expected {expected[row, col]}")
+    return False
+
+def main():
+    parser = argparse.ArgumentParser(description='Expected output of a chain of RTL modules, computed in memory')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run = subparsers.add_parser('run', help='Run a stage chain over one frame')
+    run.add_argument('input', help='Input image or raw frame')
+    run.add_argument('output', help='Output PGM file (written as P2, like the testbenches)')
+    run.add_argument('-S', '--stages', required=True,
+                     help=f"Comma-separated stages, point stages take =VALUE ({', '.join(STAGES)})")
+    run.add_argument('--strip-rows', type=int, default=STRIP_ROWS,
+                     help=f"Rows per strip for point stages, 0 for whole frames (default: {STRIP_ROWS})")
+    run.add_argument('--check', help='Bench output to diff against the result')
+    run.add_argument('-s', '--size', type=parse_size, help='WIDTHxHEIGHT of raw frames')
+    run.add_argument('--layout', choices=RAW_LAYOUTS, help='Raw frame layout (default: from file name)')
+    run.add_argument('-p', '--pattern', choices=BAYER_PATTERNS, help='Bayer pattern (default: from file name)')
+
+    check = subparsers.add_parser('check', help='Diff the multi-stage bench outputs against the pipeline')
+    check.add_argument('benches', nargs='*', help=f"Benches to check: {', '.join(sorted(BENCH_CASES))} "
+                                                  "(default: all with an output)")
+    check.add_argument('--fixtures', action='store_true',
+                       help='Diff the known-good dumps in data/ instead of the bench outputs')
+    for command in (run, check):
+        command.add_argument('--schedule', default='iverilog', choices=SCHEDULES,
+                             help='Simulator whose event ordering to reproduce (default: iverilog)')
+    args = parser.parse_args()
+
+    try:
+        if args.command == 'run':
+            stages = parse_stages(args.stages)
+            rgb = stages[0][0] in RGB_STAGES
+            image, max_val = load_image(args.input, 'rgb' if rgb else 'gray', args.size, args.layout, args.pattern)
+            if max_val != 255:
+                # Same rescaling the benches apply while reading the input
+                image = np.clip(image.astype(np.int64) * 255 // max_val, 0, 255).astype(np.uint8)
+            start = time.perf_counter()
+            result = run_pipeline(image, stages, args.schedule, args.strip_rows or None)
+            elapsed = time.perf_counter() - start
+            pnm.write_pgm(args.output, result, 255, 'P2')
+            print(f"{len(stages)} stage(s) in {elapsed * 1000:.1f} ms, expected output saved to {args.output}")
+            if args.check and not check_output(args.check, result):
+                sys.exit(1)
+            return
+
+        which = 3 if args.fixtures else 2
+        names = args.benches or [name for name, case in BENCH_CASES.items() if os.path.exists(case[which])]
+        if not names:
+            print("FAIL: no multi-stage bench outputs found (run tb_rgb2gray_sobel)")
+            sys.exit(1)
+        passed = True
+        for name in names:
+            if name not in BENCH_CASES:
+                raise ValueError(f"Unknown bench: {name}, please choose from {', '.join(sorted(BENCH_CASES))}")
+            stages, source = BENCH_CASES[name][:2]
+            image, _ = load_image(source, 'rgb')
+            print(f"{name} ({os.path.basename(source)}):")
+            passed &= check_output(BENCH_CASES[name][which], run_pipeline(image, parse_stages(stages), args.schedule))
+    except (OSError, ValueError, IndexError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not passed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
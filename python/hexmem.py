@@ -0,0 +1,347 @@
+import argparse
+import os
+import re
+import cv2
+import numpy as np
+import pnm
+from jpg2bayer import rgb_to_bayer
+from raw_frame import BAYER_PATTERNS, RAW_LAYOUTS, RawFrame, plane_views
+from stimulus_stream import IMAGE_EXTENSIONS
+from yuv import YUV_LAYOUTS, encode_yuv
+
+# Memory image formats. Every plane becomes one memory file with one word
+# per line: gray, Bayer and YUV samples are 8-bit words, rgb packs a pixel
+# into one 24-bit {R, G, B} word.
+HEX_FORMATS = ['gray', 'rgb', 'bayer'] + YUV_LAYOUTS
+
+FORMAT_CHUNK = 1 << 20
+
+_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+
+# -1 = not a digit; x/z/? digits (uninitialised words) read as 0 and are
+# counted separately.
+_DIGIT_VALUE = np.full(256, -1, dtype=np.int8)
+_DIGIT_VALUE[list(b'0123456789')] = range(10)
+_DIGIT_VALUE[list(b'abcdef')] = range(10, 16)
+_DIGIT_VALUE[list(b'ABCDEF')] = range(10, 16)
+_UNKNOWN = np.zeros(256, dtype=np.bool_)
+_UNKNOWN[list(b'xXzZ?')] = True
+_DIGIT_VALUE[_UNKNOWN] = 0
+_SPACE = np.zeros(256, dtype=np.bool_)
+_SPACE[list(b' \t\n\v\f\r')] = True
+
+_comment = re.compile(rb'//[^\n]*|/\*.*?\*/', re.S)
+_address = re.compile(rb'@([0-9a-fA-F_]+)')
+_field = re.compile(r'(\w+)=(\S+)')
+
+def digits_per_word(word_bits, radix=16):
+    return -(-word_bits // 4) if radix == 16 else word_bits
+
+def format_words(values, word_bits, radix=16):
+    # Fixed-width words, one per line, as $writememh/$writememb print them.
+    flat = np.asarray(values).ravel().astype(np.uint64)
+    step = 4 if radix == 16 else 1
+    count = digits_per_word(word_bits, radix)
+    shifts = np.arange(count - 1, -1, -1, dtype=np.uint64) * np.uint64(step)
+    mask = np.uint64(radix - 1)
+    pieces = []
+    for start in range(0, flat.size, FORMAT_CHUNK):
+        chunk = flat[start:start + FORMAT_CHUNK]
+        text = np.empty((chunk.size, count + 1), dtype=np.uint8)
+        text[:, :count] = _DIGITS[(chunk[:, None] >> shifts) & mask]
+        text[:, count] = ord('\n')
+        pieces.append(text.tobytes())
+    return b''.join(pieces)
+
+def memory_header(fields):
+    return '// hexmem ' + ' '.join(f"{key}={value}" for key, value in fields.items()) + '\n'
+
+def write_memory(file_path, values, word_bits, radix=16, fields=None):
+    with open(file_path, 'wb') as f:
+        if fields:
+            f.write(memory_header(fields).encode('ascii'))
+        f.write(format_words(values, word_bits, radix))
+
+def parse_header(data):
+    # The metadata written by write_memory, or {} for plain dumps.
+    match = re.search(rb'^// hexmem ([^\n]*)', data[:4096], re.M)
+    if match is None:
+        return {}
+    fields = dict(_field.findall(match.group(1).decode('ascii', 'replace')))
+    for key in ('width', 'height', 'words', 'word_bits', 'radix'):
+        if key in fields:
+            fields[key] = int(fields[key])
+    return fields
+
+def _fixed_words(chunk, radix):
+    # Fast path for $writememh output: fixed-width words, one per line, no
+    # x/z digits. Returns None for anything else.
+    width = int(np.argmax(chunk == ord('\n')))
+    if not width or chunk.size % (width + 1) or not np.all(chunk[width::width + 1] == ord('\n')):
+        return None
+    if radix == 16 and width % 2 == 0:
+        try:
+            data = np.frombuffer(bytes.fromhex(chunk.tobytes().decode('ascii')), dtype=np.uint8)
+        except ValueError:
+            return None
+        data = data.reshape(-1, width // 2)
+        values = np.zeros(data.shape[0], dtype=np.int64)
+        for place in range(width // 2):
+            values <<= 8
+            values |= data[:, place]
+        return values
+    digits = chunk.reshape(-1, width + 1)[:, :width]
+    digit = np.where(digits >= ord('A'), (digits | 0x20) - (ord('a') - 10), digits - ord('0'))
+    if np.any(digit >= radix):
+        return None
+    values = np.zeros(digits.shape[0], dtype=np.int64)
+    for place in range(width):
+        values *= radix
+        values += digit[:, place]
+    return values
+
+def _decode_words(chunk, radix):
+    values = _fixed_words(chunk, radix)
+    if values is not None:
+        return values, 0
+
+    digit = _DIGIT_VALUE.take(chunk)
+    space = _SPACE.take(chunk)
+    bad = ~space & ((digit < 0) | (digit >= radix))
+    if bad.any():
+        raise ValueError(f"Invalid character in memory file: {chr(chunk[bad][0])!r}")
+
+    # Each word is built from its first digit onwards, one digit per pass.
+    is_digit = np.zeros(chunk.size + 2, dtype=np.bool_)
+    is_digit[1:-1] = ~space
+    starts = np.flatnonzero(is_digit[1:-1] & ~is_digit[:-2])
+    lengths = np.flatnonzero(is_digit[1:-1] & ~is_digit[2:]) + 1 - starts
+    values = np.zeros(starts.size, dtype=np.int64)
+    unknown = np.zeros(starts.size, dtype=np.bool_)
+    for place in range(int(lengths.max(initial=0))):
+        live = lengths > place
+        pos = np.minimum(starts + place, chunk.size - 1)
+        values = np.where(live, values * radix + digit.take(pos), values)
+        unknown |= live & _UNKNOWN.take(chunk.take(pos))
+    return values, int(np.count_nonzero(unknown))
+
+def _parse_words(raw, radix):
+    pieces = []
+    unknown = 0
+    pos = 0
+    while pos < raw.size:
+        stop = min(pos + pnm.PARSE_CHUNK, raw.size)
+        if stop < raw.size:
+            # Never split a word: end the chunk on its last separator.
+            while stop > pos and not _SPACE[raw[stop - 1]]:
+                stop -= 1
+            if stop == pos:
+                stop = raw.size
+        values, missing = _decode_words(raw[pos:stop], radix)
+        pieces.append(values)
+        unknown += missing
+        pos = stop
+    return (np.concatenate(pieces) if pieces else np.zeros(0, dtype=np.int64)), unknown
+
+def parse_memory(data, radix=16):
+    # Reads a $readmemh/$readmemb style file: comments, @address jumps,
+    # underscores and x/z digits are accepted. Returns (words, header,
+    # unknown) where unknown counts words holding x/z digits (read as 0).
+    header = parse_header(data)
+    radix = header.get('radix', radix)
+    text = _comment.sub(b' ', bytes(data)).replace(b'_', b'')
+    parts = _address.split(text)
+    blocks = []
+    unknown = 0
+    address = 0
+    for index, part in enumerate(parts):
+        if index % 2:
+            address = int(part, 16)
+            continue
+        words, missing = _parse_words(np.frombuffer(part.lstrip(), dtype=np.uint8), radix)
+        unknown += missing
+        if words.size:
+            blocks.append((address, words))
+        address += words.size
+    if len(blocks) == 1 and blocks[0][0] == 0:
+        return blocks[0][1], header, unknown
+    size = max((start + words.size for start, words in blocks), default=0)
+    memory = np.zeros(size, dtype=np.int64)
+    for start, words in blocks:
+        memory[start:start + words.size] = words
+    return memory, header, unknown
+
+def read_memory(file_path, radix=16):
+    with open(file_path, 'rb') as f:
+        return parse_memory(f.read(), radix)
+
+def pack_rgb(rgb):
+    rgb = rgb.astype(np.uint32)
+    return (rgb[..., 0] << 16) | (rgb[..., 1] << 8) | rgb[..., 2]
+
+def unpack_rgb(words):
+    words = np.asarray(words)
+    return np.stack([(words >> 16) & 0xFF, (words >> 8) & 0xFF, words & 0xFF], axis=-1).astype(np.uint8)
+
+def image_planes(img, hex_format, pattern='BGGR'):
+    # Returns [(plane, 2D array, word_bits)] for a BGR image.
+    if hex_format == 'gray':
+        return [('gray', cv2.cvtColor(img, cv2.COLOR_BGR2GRAY), 8)]
+    if hex_format == 'rgb':
+        return [('rgb', pack_rgb(cv2.cvtColor(img, cv2.COLOR_BGR2RGB)), 24)]
+    if hex_format == 'bayer':
+        return [('raw', rgb_to_bayer(cv2.cvtColor(img, cv2.COLOR_BGR2RGB), pattern), 8)]
+    if hex_format in YUV_LAYOUTS:
+        height, width = img.shape[:2]
+        planes = plane_views(encode_yuv(img, hex_format), hex_format, width, height)
+        return [(name, plane, 8) for name, plane in planes.items()]
+    raise ValueError(f"Unsupported memory format: {hex_format}")
+
+def raw_planes(frame):
+    return [(name, plane, frame.bit_depth) for name, plane in frame._planes.items()]
+
+def _plane_path(output_stem, plane, planes, radix):
+    suffix = '.hex' if radix == 16 else '.bin'
+    return output_stem + (suffix if len(planes) == 1 else f"_{plane}{suffix}")
+
+def write_verilog_header(file_path, planes, paths, width, height, prefix='HEX', source=None):
+    # localparams a testbench can `include next to its $readmemh calls.
+    lines = [f"// Generated by hexmem.py{' from ' + source if source else ''}\n",
+             f"localparam {prefix}_WIDTH = {width};\n",
+             f"localparam {prefix}_HEIGHT = {height};\n"]
+    for (plane, values, word_bits), path in zip(planes, paths):
+        name = f"{prefix}_{plane.upper()}"
+        lines += [f"localparam {name}_WORDS = {values.size};\n",
+                  f"localparam {name}_BITS = {word_bits};\n",
+                  f"localparam {name}_FILE = \"{path}\";\n"]
+    with open(file_path, 'w') as f:
+        f.writelines(lines)
+
+def export_memory(input_path, output_stem, hex_format=None, pattern='BGGR', radix=16, prefix='HEX',
+                  layout=None, width=None, height=None):
+    # Images are converted to hex_format; raw Bayer/YUV dumps are exported
+    # plane by plane as stored.
+    if layout or os.path.splitext(input_path)[1].lower() not in IMAGE_EXTENSIONS:
+        try:
+            frame = RawFrame(input_path, layout, width, height, pattern)
+        except (ValueError, IndexError) as e:
+            print(f"Error: {e}")
+            return False
+        planes = raw_planes(frame)
+        hex_format, pattern = frame.layout, frame.pattern
+        width, height = frame.width, frame.height
+    else:
+        img = cv2.imread(input_path, cv2.IMREAD_COLOR)
+        if img is None:
+            print(f"Error: Cannot read image file {input_path}")
+            return False
+        planes = image_planes(img, hex_format or 'gray', pattern)
+        hex_format = hex_format or 'gray'
+        height, width = img.shape[:2]
+
+    paths = []
+    for plane, values, word_bits in planes:
+        path = _plane_path(output_stem, plane, planes, radix)
+        fields = {'format': hex_format, 'plane': plane, 'width': width, 'height': height,
+                  'rows': values.shape[0], 'cols': values.shape[1], 'words': values.size,
+                  'word_bits': word_bits, 'radix': radix}
+        if hex_format == 'bayer':
+            fields['pattern'] = pattern
+        write_memory(path, values, word_bits, radix, fields)
+        paths.append(path)
+        print(f"Memory image saved to {path} ({values.size} x {word_bits}-bit words)")
+    write_verilog_header(output_stem + '.vh', planes, paths, width, height, prefix, input_path)
+    print(f"Verilog header saved to {output_stem}.vh")
+    return True
+
+def import_memory(input_paths, output_path, width=None, height=None, radix=16, word_bits=None):
+    # Reads one or more $writememh/$writememb dumps (planes in order) and
+    # writes a PGM, a PPM (24-bit {R, G, B} words) or raw samples, chosen by
+    # the output extension.
+    blocks = []
+    header = {}
+    header_path = None
+    planes = []
+    for path in input_paths:
+        try:
+            words, fields, unknown = read_memory(path, radix)
+        except (OSError, ValueError) as e:
+            print(f"Error: Cannot read memory file {path}: {e}")
+            return False
+        if unknown:
+            print(f"Warning: {unknown} word(s) in {path} hold x/z digits, read as 0")
+        # Every plane of one frame carries the same frame fields.
+        for key in ('format', 'width', 'height', 'word_bits'):
+            if key in fields and key in header and fields[key] != header[key]:
+                print(f"Error: {path} has {key}={fields[key]} but {header_path} has {key}={header[key]}")
+                return False
+        if 'words' in fields and words.size != fields['words']:
+            print(f"Warning: {path} holds {words.size} words, its header says {fields['words']}")
+        if fields and not header:
+            header, header_path = fields, path
+        if 'plane' in fields:
+            planes.append(fields['plane'])
+        blocks.append(words)
+    words = np.concatenate(blocks)
+    width = width or header.get('width')
+    height = height or header.get('height')
+    word_bits = word_bits or header.get('word_bits') or (24 if output_path.lower().endswith('.ppm') else 8)
+    if word_bits < 63:
+        words &= (1 << word_bits) - 1
+
+    ext = os.path.splitext(output_path)[1].lower()
+    if ext in ('.pgm', '.ppm'):
+        if len(set(planes)) > 1:
+            print(f"Error: {ext[1:].upper()} output takes one plane, got {', '.join(planes)}; write raw samples instead")
+            return False
+        if not width or not height:
+            print("Error: Image size unknown, please specify width and height")
+            return False
+        if words.size < width * height:
+            print(f"Warning: only {words.size} of {width * height} words present, padding with 0")
+            words = np.concatenate([words, np.zeros(width * height - words.size, dtype=words.dtype)])
+        words = words[:width * height].reshape(height, width)
+        if ext == '.ppm':
+            pnm.write_ppm(output_path, unpack_rgb(words), 255, 'P6')
+        else:
+            max_val = (1 << word_bits) - 1 if word_bits <= 16 else 65535
+            pnm.write_pgm(output_path, words.astype(np.uint16 if max_val > 255 else np.uint8), max_val, 'P5')
+    else:
+        dtype = np.uint8 if word_bits <= 8 else np.dtype('<u2')
+        words.astype(dtype).tofile(output_path)
+    print(f"Image saved to {output_path}")
+    return True
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert images to and from $readmemh/$writememh memory files')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    export = commands.add_parser('export', help='Write an image or raw frame as memory files plus a .vh header')
+    export.add_argument('input', help='Input image (jpg/png/pgm/ppm) or raw Bayer/YUV frame')
+    export.add_argument('output', help='Output stem; planes go to <stem>.hex or <stem>_<plane>.hex')
+    export.add_argument('-f', '--format', choices=HEX_FORMATS, help='Memory format for images (default: gray)')
+    export.add_argument('-p', '--pattern', default='BGGR', choices=BAYER_PATTERNS, help='Bayer pattern (default: BGGR)')
+    export.add_argument('-l', '--layout', choices=sorted(RAW_LAYOUTS), help='Raw layout (default: from file name)')
+    export.add_argument('-W', '--width', type=int, help='Raw frame width')
+    export.add_argument('-H', '--height', type=int, help='Raw frame height')
+    export.add_argument('-b', '--binary', action='store_true', help='Write $readmemb files instead of hex')
+    export.add_argument('--prefix', default='HEX', help='localparam prefix in the .vh header (default: HEX)')
+
+    imp = commands.add_parser('import', help='Convert $writememh/$writememb dumps to PNM or raw')
+    imp.add_argument('inputs', nargs='+', help='Memory dump(s), one per plane in order')
+    imp.add_argument('output', help='Output .pgm, .ppm or raw file')
+    imp.add_argument('-W', '--width', type=int, help='Image width (default: from the hexmem header)')
+    imp.add_argument('-H', '--height', type=int, help='Image height (default: from the hexmem header)')
+    imp.add_argument('-w', '--word-bits', type=int, help='Bits per word (default: from header, else 8, or 24 for .ppm)')
+    imp.add_argument('-b', '--binary', action='store_true', help='Dumps are $writememb files')
+    args = parser.parse_args()
+
+    radix = 2 if args.binary else 16
+    if args.command == 'export':
+        export_memory(args.input, args.output, args.format, args.pattern, radix, args.prefix,
+                      args.layout, args.width, args.height)
+    else:
+        import_memory(args.inputs, args.output, args.width, args.height, radix, args.word_bits)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import argparse
+import csv
+import itertools
+import os
+import re
+import sys
+import numpy as np
+import hexmem
+import pnm
+from golden.histogram import HIST_BINS, HIST_WIDTH, cdf, equalization_lut, histogram_stream
+from fpga_image import BAYER_PATTERNS, RAW_LAYOUTS, iter_frames, parse_size
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIM_LOGS = os.path.join(ROOT, '.sim_cache', 'logs')
+CHANNELS = ['R', 'G', 'B']
+
+# tb_histogram.v prints every bin it reads back as "DEBUG: bin[ N] = V".
+_bin_line = re.compile(r'bin\[\s*(\d+)\]\s*=\s*(\d+)')
+
+# What the benches read and write: (reference source, rgb, dumps). The gray
+# bench logs its bins; the RGB bench only draws each channel as a bar chart
+# scaled to its largest bin.
+BENCH_CASES = {
+    'histogram': (os.path.join(ROOT, 'data', 'baby.pgm'), False, [os.path.join(SIM_LOGS, 'tb_histogram.log')]),
+    'histogram_rgb': (os.path.join(ROOT, 'data', 'color.ppm'), True,
+                      [os.path.join(ROOT, 'output', f"histogram_{channel.lower()}_channel.pgm")
+                       for channel in CHANNELS]),
+}
+
+def write_table(path, values, word_bits, fields):
+    # One word per line for $readmemh; RGB tables are the R, G and B
+    # channels back to back.
+    hexmem.write_memory(path, np.asarray(values).ravel(), word_bits, 16, fields)
+
+def compute(sources, rgb=False, raw_size=None, layout=None, pattern=None, bit_depth=8, bins=HIST_BINS,
+            hist_width=HIST_WIDTH, clear_every=None, per_frame_path=None):
+    # Streams the sources once and returns (frames, accumulated counts); the
+    # per-frame counts are written as they are computed. tee keeps the names
+    # in step with the frames, so only the current frame is held.
+    mode = 'rgb' if rgb else 'gray'
+    named, frames = itertools.tee(iter_frames(sources, mode, raw_size, layout, pattern, bit_depth))
+    stream = histogram_stream((image for _, image in frames), bins, hist_width, clear_every)
+    accumulated = None
+    count = 0
+    out = open(per_frame_path, 'w', newline='') if per_frame_path else None
+    try:
+        writer = csv.writer(out) if out else None
+        if writer:
+            writer.writerow(['frame', 'source', 'channel'] + list(range(bins)))
+        for (name, _), (counts, accumulated) in zip(named, stream):
+            if writer:
+                rows = counts.reshape(-1, bins)
+                labels = CHANNELS if len(rows) == 3 else ['Y']
+                for label, row in zip(labels, rows):
+                    writer.writerow([count, name, label] + row.tolist())
+            count += 1
+            if count % 100 == 0:
+                print(f"  {count} frames")
+    finally:
+        if out:
+            out.close()
+    return count, accumulated
+
+def read_bin_dump(path, bins=HIST_BINS):
+    # Bins read back from the FPGA or a simulation: a $writememh-style
+    # memory file (channels back to back), or a log with "bin[N] = V" lines
+    # (the last value printed for a bin wins).
+    if path.endswith(('.hex', '.mem')):
+        words, _, unknown = hexmem.read_memory(path)
+        if unknown:
+            raise ValueError(f"{path} holds {unknown} undefined words")
+        if words.size % bins:
+            raise ValueError(f"{path} holds {words.size} words, not a whole number of {bins}-bin histograms")
+        counts = words.astype(np.int64).reshape(-1, bins)
+        return counts[0] if len(counts) == 1 else counts
+    values = {}
+    with open(path, errors='replace') as f:
+        for line in f:
+            match = _bin_line.search(line)
+            if match:
+                values[int(match.group(1))] = int(match.group(2))
+    if not values:
+        raise ValueError(f"No bin values found in {path}")
+    counts = np.zeros(bins, dtype=np.int64)
+    for index, value in values.items():
+        if index < bins:
+            counts[index] = value
+    missing = bins - sum(1 for index in values if index < bins)
+    if missing:
+        print(f"Warning: {path} has no value for {missing} bin(s), read as 0")
+    return counts
+
+def bar_heights(path):
+    # Column heights of a tb_histogram_rgb.v channel chart.
+    image, _, _ = pnm.read_pgm(path)
+    return np.count_nonzero(image, axis=0)
+
+def expected_bar_heights(counts):
+    # (count * 255) / max in the bench's integer arithmetic.
+    counts = np.asarray(counts, dtype=np.int64)
+    peak = int(counts.max())
+    return counts * 255 // peak if peak else np.zeros_like(counts)
+
+def diff_bins(name, dump, reference):
+    mismatched = np.flatnonzero(dump != reference)
+    if mismatched.size == 0:
+        print(f"{name}: PASS, {reference.size} bins match")
+        return True
+    print(f"{name}: FAIL, {mismatched.size}/{reference.size} bins differ, total {int(dump.sum())} vs "
+          f"{int(reference.sum())}")
+    for index in mismatched[:10]:
+        print(f"  bin {index}: dump {int(dump[index])}, reference {int(reference[index])}")
+    return False
+
+def check_dumps(dumps, reference, bins=HIST_BINS):
+    # Bar charts are matched to the reference channels in order; other
+    # dumps hold the bins of every channel.
+    passed = True
+    reference = reference.reshape(-1, bins)
+    for index, path in enumerate(dumps):
+        if path.endswith('.pgm'):
+            channel = reference[index % len(reference)]
+            passed &= diff_bins(path, bar_heights(path), expected_bar_heights(channel))
+            continue
+        dump = read_bin_dump(path, bins).reshape(-1, bins)
+        if dump.shape != reference.shape:
+            print(f"{path}: FAIL, {len(dump)} histogram(s) dumped, reference has {len(reference)}")
+            passed = False
+            continue
+        for channel, (dumped, expected) in enumerate(zip(dump, reference)):
+            label = f"{path} [{CHANNELS[channel]}]" if len(reference) == 3 else path
+            passed &= diff_bins(label, dumped, expected)
+    return passed
+
+def main():
+    parser = argparse.ArgumentParser(description='Reference histograms and equalization LUTs for histogram.v/histogram_rgb.v')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    def add_source_options(command):
+        command.add_argument('--rgb', action='store_true', help='Per-channel R, G, B histograms (histogram_rgb.v)')
+        command.add_argument('-s', '--size', type=parse_size, help='WIDTHxHEIGHT of raw frames')
+        command.add_argument('--layout', choices=RAW_LAYOUTS, help='Raw frame layout (default: from file name)')
+        command.add_argument('-p', '--pattern', choices=BAYER_PATTERNS, help='Bayer pattern (default: from file name)')
+        command.add_argument('--bit-depth', type=int, default=8, help='Raw sample bits (default: 8)')
+        command.add_argument('--bins', type=int, default=HIST_BINS, help=f"HIST_BINS (default: {HIST_BINS})")
+        command.add_argument('--hist-width', type=int, default=HIST_WIDTH,
+                             help=f"HIST_WIDTH, counters wrap at this many bits (default: {HIST_WIDTH})")
+
+    compute_command = subparsers.add_parser('compute', help='Accumulate histograms over a frame stream')
+    compute_command.add_argument('sources', nargs='+', help='Images, raw Bayer/YUV streams, directories or videos')
+    add_source_options(compute_command)
+    compute_command.add_argument('--clear-every', type=int, help='Clear the accumulated counters every N frames')
+    compute_command.add_argument('-o', '--output', help='Accumulated histogram as a memory file')
+    compute_command.add_argument('--per-frame', help='CSV with the counts of every frame')
+    compute_command.add_argument('--cdf', help='Cumulative counts as a memory file')
+    compute_command.add_argument('--lut', help='Equalization LUT (cv2.equalizeHist) as a $readmemh table')
+
+    check = subparsers.add_parser('check', help='Diff FPGA or simulation bin dumps against the reference')
+    check.add_argument('dumps', nargs='*', help='Memory files, logs with bin[N] = V lines or tb_histogram_rgb '
+                                                 'bar charts (default: the bench outputs)')
+    check.add_argument('-r', '--reference', nargs='+', help='Frames the dumps counted (default: the bench input)')
+    add_source_options(check)
+    args = parser.parse_args()
+
+    if args.command == 'check' and not args.dumps:
+        cases = [(name, source, rgb, dumps) for name, (source, rgb, dumps) in BENCH_CASES.items()
+                 if all(os.path.exists(path) for path in dumps)]
+        if not cases:
+            print("FAIL: no histogram bench dumps found (run tb_histogram/tb_histogram_rgb)")
+            sys.exit(1)
+    elif args.command == 'check':
+        if not args.reference:
+            parser.error('check needs --reference when dumps are given')
+        cases = [(None, args.reference, args.rgb, args.dumps)]
+
+    try:
+        if args.command == 'compute':
+            count, counts = compute(args.sources, args.rgb, args.size, args.layout, args.pattern, args.bit_depth,
+                                    args.bins, args.hist_width, args.clear_every, args.per_frame)
+            if count == 0:
+                raise ValueError("No frames read")
+            fields = {'format': 'histogram', 'bins': args.bins, 'channels': len(counts.reshape(-1, args.bins)),
+                      'frames': count}
+            if args.output:
+                write_table(args.output, counts, args.hist_width, dict(fields, word_bits=args.hist_width))
+            if args.cdf:
+                cumulative = cdf(counts)
+                bits = max(args.hist_width, int(cumulative.max()).bit_length())
+                write_table(args.cdf, cumulative, bits, dict(fields, format='cdf', word_bits=bits))
+            if args.lut:
+                bits = max(1, (args.bins - 1).bit_length())
+                write_table(args.lut, equalization_lut(counts), bits, dict(fields, format='lut', word_bits=bits))
+            totals = counts.reshape(-1, args.bins).sum(axis=1)
+            print(f"{count} frame(s), accumulated {'/'.join(str(int(total)) for total in totals)} samples")
+            for label, path in (('Histogram', args.output), ('CDF', args.cdf), ('Equalization LUT', args.lut)):
+                if path:
+                    print(f"{label} saved to {path}")
+            return
+
+        passed = True
+        for name, sources, rgb, dumps in cases:
+            sources = [sources] if isinstance(sources, str) else sources
+            _, reference = compute(sources, rgb, args.size, args.layout, args.pattern, args.bit_depth, args.bins,
+                                   args.hist_width)
+            if reference is None:
+                raise ValueError("No reference frames read")
+            if name:
+                print(f"{name} ({os.path.basename(sources[0])}):")
+            passed &= check_dumps(dumps, reference, args.bins)
+    except (OSError, ValueError, IndexError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not passed:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,325 @@
+import argparse
+import csv
+import os
+import sys
+import zlib
+import numpy as np
+import hexmem
+import pnm
+from golden.homography import BASIC_FRAC, ENHANCED_FRAC, homography_basic, homography_enhanced, warp
+from fpga_image import parse_size
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+BENCH_IMAGE = os.path.join(ROOT, 'data', 'gray1.pgm')
+
+# RTL module -> (default fraction bits, coefficient bits, signed).
+TARGETS = {
+    'basic': (BASIC_FRAC, 16, False),
+    'enhanced': (ENHANCED_FRAC, 32, True),
+}
+
+# The matrices tb_homography.v and tb_homography_enhanced.v hard-code for
+# their +image_test runs, and the frame each one writes.
+BENCH_CASES = {
+    'identity': ('basic', [0x100, 0, 0, 0, 0x100, 0, 0, 0, 0x100], 'out_homography_identity.pgm'),
+    'translate': ('basic', [0x100, 0, 0x1400, 0, 0x100, 0xA00, 0, 0, 0x100], 'out_homography_translate.pgm'),
+    'scale': ('basic', [0xB3, 0, 0, 0, 0x14D, 0, 0, 0, 0x100], 'out_homography_scale.pgm'),
+    'enhanced_identity': ('enhanced', [0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x10000],
+                          'out_homography_enhanced_identity.pgm'),
+    'enhanced_translate': ('enhanced', [0x10000, 0, -20 * 65536, 0, 0x10000, -10 * 65536, 0, 0, 0x10000],
+                           'out_homography_enhanced_translate.pgm'),
+    'enhanced_scale': ('enhanced', [0x20000, 0, 0, 0, 0x8000, 0, 0, 0, 0x10000],
+                       'out_homography_enhanced_scale.pgm'),
+    'enhanced_perspective': ('enhanced', [0x10000, 0, 0, 0, 0x10000, 0, 0x80, 0x40, 0x10000],
+                             'out_homography_enhanced_perspective.pgm'),
+}
+
+# Destination pixels modelled at once; whole frames of several matrices
+# are evaluated together up to this many.
+CHUNK_PIXELS = 1 << 20
+
+def load_matrices(path):
+    # Float 3x3 matrices: a .npy array of shape (..., 3, 3), or text with
+    # the nine row-major values of one matrix per line.
+    matrices = np.load(path) if path.endswith('.npy') else np.loadtxt(path, ndmin=2)
+    matrices = np.asarray(matrices, dtype=np.float64)
+    if matrices.size == 0:
+        raise ValueError(f"{path} holds no matrices")
+    if matrices.size % 9:
+        raise ValueError(f"{path} holds {matrices.size} values, not a whole number of 3x3 matrices")
+    return matrices.reshape(-1, 3, 3)
+
+def load_correspondences(path):
+    # Point sets of (dst_x, dst_y, src_x, src_y) rows: a .npy array of shape
+    # (..., K, 4), or text with the 4K values of one set per line.
+    points = np.load(path) if path.endswith('.npy') else np.loadtxt(path, ndmin=2)
+    points = np.asarray(points, dtype=np.float64)
+    if points.size == 0:
+        raise ValueError(f"{path} holds no point sets")
+    if points.ndim == 2 and points.shape[-1] != 4:
+        points = points.reshape(points.shape[0], -1, 4)
+    points = points.reshape((-1,) + points.shape[-2:])
+    if points.shape[-1] != 4 or points.shape[-2] < 4:
+        raise ValueError(f"{path} must hold sets of at least 4 (dst_x, dst_y, src_x, src_y) points")
+    return points
+
+def _normalizing_transforms(points):
+    # Moves each point set's centroid to the origin and its mean distance to sqrt(2).
+    centroid = points.mean(axis=1)
+    distance = np.linalg.norm(points - centroid[:, None], axis=2).mean(axis=1)
+    scale = np.sqrt(2) / np.where(distance > 0, distance, 1)
+    transforms = np.zeros((points.shape[0], 3, 3))
+    transforms[:, 0, 0] = transforms[:, 1, 1] = scale
+    transforms[:, :2, 2] = -scale[:, None] * centroid
+    transforms[:, 2, 2] = 1
+    return transforms
+
+def fit_homographies(points):
+    # Normalized DLT for every point set at once: the matrices map the
+    # destination points onto the source points, which is the direction the
+    # RTL evaluates. Four points give the exact homography, more a least
+    # squares fit.
+    dst_t, src_t = _normalizing_transforms(points[..., :2]), _normalizing_transforms(points[..., 2:])
+    ones = np.ones(points.shape[:2] + (1,))
+    dst = np.concatenate([points[..., :2], ones], axis=2) @ dst_t.transpose(0, 2, 1)
+    src = np.concatenate([points[..., 2:], ones], axis=2) @ src_t.transpose(0, 2, 1)
+    x, y, u, v = dst[..., 0], dst[..., 1], src[..., 0], src[..., 1]
+    zero, one = np.zeros_like(x), np.ones_like(x)
+    rows_u = np.stack([x, y, one, zero, zero, zero, -u * x, -u * y, -u], axis=2)
+    rows_v = np.stack([zero, zero, zero, x, y, one, -v * x, -v * y, -v], axis=2)
+    system = np.concatenate([rows_u, rows_v], axis=1)
+    normalized = np.linalg.svd(system)[2][:, -1].reshape(-1, 3, 3)
+    return np.linalg.inv(src_t) @ normalized @ dst_t
+
+def encode_coefficients(matrices, target='basic', frac=None):
+    # h11..h33 for the target's ports: each matrix is scaled to h33 = 1 and
+    # rounded to 1/2**frac, then wrapped to the port width as the bench's
+    # assignment would. overflow flags the matrices that did not fit.
+    default_frac, bits, signed = TARGETS[target]
+    frac = default_frac if frac is None else frac
+    matrices = np.asarray(matrices, dtype=np.float64).reshape(-1, 3, 3)
+    h33 = matrices[:, 2, 2]
+    if np.any(np.abs(h33) < 1e-12):
+        raise ValueError(f"Matrix {int(np.argmax(np.abs(h33) < 1e-12))} has h33 = 0 and cannot be normalized")
+    scaled = np.floor(matrices.reshape(-1, 9) / h33[:, None] * (1 << frac) + 0.5)
+    low, high = (-(1 << (bits - 1)), (1 << (bits - 1)) - 1) if signed else (0, (1 << bits) - 1)
+    overflow = np.any((scaled < low) | (scaled > high), axis=1)
+    coeffs = np.clip(scaled, -(1 << 62), 1 << 62).astype(np.int64) & ((1 << bits) - 1)
+    if signed:
+        coeffs = np.where(coeffs >> (bits - 1), coeffs - (1 << bits), coeffs)
+    return coeffs, overflow
+
+def write_coefficients(path, coeffs, target, frac):
+    _, bits, _ = TARGETS[target]
+    words = np.asarray(coeffs, dtype=np.int64) & ((1 << bits) - 1)
+    hexmem.write_memory(path, words, bits, 16,
+                        {'format': 'homography', 'target': target, 'frac': frac, 'matrices': len(coeffs),
+                         'words': words.size, 'word_bits': bits})
+
+def read_coefficients(path):
+    # (coeffs, target, frac) from a file written by write_coefficients.
+    words, header, _ = hexmem.read_memory(path)
+    target = header.get('target')
+    if header.get('format') != 'homography' or target not in TARGETS:
+        raise ValueError(f"{path} is not a homography coefficient file")
+    if words.size % 9:
+        raise ValueError(f"{path} holds {words.size} words, not a whole number of matrices")
+    _, bits, signed = TARGETS[target]
+    coeffs = words.astype(np.int64).reshape(-1, 9)
+    if signed:
+        coeffs = np.where(coeffs >> (bits - 1), coeffs - (1 << bits), coeffs)
+    return coeffs, target, int(header.get('frac', TARGETS[target][0]))
+
+def verilog_assignments(coeffs, target):
+    # The h11..h33 lines as the testbenches write them.
+    _, bits, _ = TARGETS[target]
+    digits = bits // 4
+    names = [f"h{row}{col}" for row in (1, 2, 3) for col in (1, 2, 3)]
+    values = [f"{name} = {bits}'h{int(value) & ((1 << bits) - 1):0{digits}X};" for name, value in zip(names, coeffs)]
+    return [' '.join(values[row:row + 3]) for row in (0, 3, 6)]
+
+def model_frames(coeffs, target, size, source_size=None):
+    # Yields (index, fields) for every coefficient set, where fields holds
+    # the src_x/src_y/valid frames (and x_frac/y_frac for the enhanced
+    # module). Sets are modelled CHUNK_PIXELS at a time.
+    width, height = size
+    src_width, src_height = source_size or size
+    coeffs = np.asarray(coeffs, dtype=np.int64).reshape(-1, 9)
+    step = max(1, CHUNK_PIXELS // (width * height))
+    for start in range(0, len(coeffs), step):
+        chunk = coeffs[start:start + step]
+        if target == 'basic':
+            src_x, src_y, valid = homography_basic(chunk, width, height, src_width, src_height)
+            fields = {'src_x': src_x, 'src_y': src_y, 'valid': valid}
+        else:
+            src_x, src_y, x_frac, y_frac, valid = homography_enhanced(chunk, width, height, src_width, src_height)
+            fields = {'src_x': src_x, 'src_y': src_y, 'x_frac': x_frac, 'y_frac': y_frac, 'valid': valid}
+        for offset in range(len(chunk)):
+            yield start + offset, {key: value[offset] for key, value in fields.items()}
+
+def frame_digest(fields):
+    # CRC-32 of the coordinates as the RTL outputs them, for comparing sweeps.
+    digest = 0
+    for key in ('src_x', 'src_y', 'x_frac', 'y_frac'):
+        if key in fields:
+            digest = zlib.crc32(fields[key].astype('<u2').tobytes(), digest)
+    return zlib.crc32(fields['valid'].astype(np.uint8).tobytes(), digest)
+
+def frame_summary(index, fields, overflow=False):
+    valid = fields['valid']
+    count = int(np.count_nonzero(valid))
+    summary = {'index': index, 'overflow': int(overflow), 'valid': count, 'valid_ratio': count / valid.size}
+    for key in ('src_x', 'src_y'):
+        inside = fields[key][valid]
+        summary[f"{key}_min"] = int(inside.min()) if count else ''
+        summary[f"{key}_max"] = int(inside.max()) if count else ''
+    summary['crc32'] = f"{frame_digest(fields):08x}"
+    return summary
+
+def read_bench_image(path):
+    image, max_val, _ = pnm.read_pgm(path)
+    if max_val != 255:
+        image = np.clip(image.astype(np.int64) * 255 // max_val, 0, 255).astype(np.uint8)
+    return image
+
+def load_coefficients(path, target, points=False, inverse=False, frac=None):
+    # Compiled .hex files carry their target and scale; matrix and point
+    # files are compiled for the requested target.
+    if path.endswith('.hex'):
+        coeffs, target, frac = read_coefficients(path)
+        return coeffs, np.zeros(len(coeffs), dtype=bool), target, frac
+    matrices = fit_homographies(load_correspondences(path)) if points else load_matrices(path)
+    if inverse:
+        matrices = np.linalg.inv(matrices)
+    frac = TARGETS[target][0] if frac is None else frac
+    coeffs, overflow = encode_coefficients(matrices, target, frac)
+    return coeffs, overflow, target, frac
+
+def check_bench(names, image_path, output_dir):
+    image = read_bench_image(image_path)
+    height, width = image.shape
+    failed = False
+    checked = 0
+    for name in names:
+        target, coeffs, dump_name = BENCH_CASES[name]
+        dump_path = os.path.join(output_dir, dump_name)
+        if not os.path.exists(dump_path):
+            continue
+        _, fields = next(model_frames([coeffs], target, (width, height)))
+        expected = warp(image, fields['src_x'], fields['src_y'], fields['valid'])
+        dump, _, _ = pnm.read_pgm(dump_path)
+        checked += 1
+        if dump.shape != expected.shape:
+            print(f"{name}: FAIL, dump is {dump.shape[1]}x{dump.shape[0]}, expected {width}x{height}")
+            failed = True
+            continue
+        mismatches = int(np.count_nonzero(dump != expected))
+        print(f"{name}: {'PASS' if mismatches == 0 else 'FAIL'}, {mismatches}/{expected.size} pixels differ")
+        failed |= mismatches > 0
+    if not checked:
+        print(f"FAIL: no homography bench dumps in {output_dir} (run the benches with +image_test)")
+        return False
+    return not failed
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile homographies to homography.v coefficients and model the RTL')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    for name, help_text in (('compile', 'Encode float matrices or point correspondences as h11..h33'),
+                            ('model', 'Compute src_x/src_y for every destination pixel of every matrix')):
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument('input', help='Matrices (.npy or 9 values per line), point sets with --points, '
+                                           'or a compiled .hex (model only)')
+        command.add_argument('-t', '--target', choices=sorted(TARGETS), default='basic',
+                             help='RTL module: basic = homography.v, enhanced = homography_enhanced.v (default: basic)')
+        command.add_argument('--points', action='store_true',
+                             help='Input holds (dst_x, dst_y, src_x, src_y) point sets to fit')
+        command.add_argument('--inverse', action='store_true',
+                             help='Input matrices map source to destination (as for cv2.warpPerspective)')
+        command.add_argument('--frac', type=int, help='Fraction bits of the encoding (default: 8 basic, 16 enhanced)')
+    compile_command = subparsers.choices['compile']
+    compile_command.add_argument('-o', '--output', help='Coefficient memory file, 9 words per matrix')
+    compile_command.add_argument('--verilog', action='store_true', help='Print testbench assignments per matrix')
+    model = subparsers.choices['model']
+    model.add_argument('-s', '--size', type=parse_size, required=True, help='Destination WIDTHxHEIGHT')
+    model.add_argument('--source-size', type=parse_size, help='src_width x src_height (default: --size)')
+    model.add_argument('--summary', help='CSV with valid count, coordinate range and CRC-32 per matrix')
+    model.add_argument('--maps', help='.npz with the src_x/src_y/valid frames of every matrix')
+    model.add_argument('--image', help='Source PGM to warp as the testbenches do')
+    model.add_argument('--output-dir', default='.', help='Directory for the warped frames (default: .)')
+
+    check = subparsers.add_parser('check', help='Compare the +image_test bench dumps against the model')
+    check.add_argument('cases', nargs='*', help=f"Bench matrices (default: all of {', '.join(BENCH_CASES)})")
+    check.add_argument('--image', default=BENCH_IMAGE, help='Bench input (default: data/gray1.pgm)')
+    check.add_argument('--output-dir', default=os.path.join(ROOT, 'output'), help='Bench output directory')
+    args = parser.parse_args()
+
+    if args.command == 'check':
+        unknown = [name for name in args.cases if name not in BENCH_CASES]
+        if unknown:
+            parser.error(f"Unknown case(s): {', '.join(unknown)}; choose from {', '.join(BENCH_CASES)}")
+        try:
+            passed = check_bench(args.cases or list(BENCH_CASES), args.image, args.output_dir)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            passed = False
+        if not passed:
+            sys.exit(1)
+        return
+
+    try:
+        coeffs, overflow, target, frac = load_coefficients(args.input, args.target, args.points, args.inverse,
+                                                           args.frac)
+    except (OSError, ValueError, np.linalg.LinAlgError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    for index in np.flatnonzero(overflow)[:10]:
+        print(f"Warning: matrix {index} does not fit the {target} coefficients and wraps")
+    if np.count_nonzero(overflow) > 10:
+        print(f"Warning: {np.count_nonzero(overflow)} matrices overflow in total")
+
+    if args.command == 'compile':
+        if args.verilog:
+            for index, row in enumerate(coeffs):
+                print(f"// matrix {index}")
+                print('\n'.join(verilog_assignments(row, target)))
+        if args.output:
+            write_coefficients(args.output, coeffs, target, frac)
+            print(f"{len(coeffs)} {target} coefficient set(s) saved to {args.output} (FRAC={frac})")
+        return
+
+    image = None
+    if args.image:
+        try:
+            image = read_bench_image(args.image)
+        except (OSError, ValueError) as e:
+            print(f"Error: {e}")
+            sys.exit(1)
+        os.makedirs(args.output_dir, exist_ok=True)
+    source_size = args.source_size or (None if image is None else (image.shape[1], image.shape[0]))
+    summaries = []
+    maps = {}
+    for index, fields in model_frames(coeffs, target, args.size, source_size):
+        summaries.append(frame_summary(index, fields, overflow[index]))
+        if args.maps:
+            for key, value in fields.items():
+                maps.setdefault(key, []).append(value)
+        if image is not None:
+            frame = warp(image, fields['src_x'], fields['src_y'], fields['valid'])
+            pnm.write_pgm(os.path.join(args.output_dir, f"homography_{index:05d}.pgm"), frame, 255, 'P2')
+
+    if args.summary:
+        with open(args.summary, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=list(summaries[0]))
+            writer.writeheader()
+            writer.writerows(summaries)
+        print(f"Summary of {len(summaries)} matrices saved to {args.summary}")
+    if args.maps:
+        np.savez_compressed(args.maps, coeffs=coeffs, **{key: np.stack(value) for key, value in maps.items()})
+        print(f"Coordinate frames saved to {args.maps}")
+    valid = sum(item['valid'] for item in summaries)
+    print(f"Modelled {len(summaries)} {target} matrices at {args.size[0]}x{args.size[1]}: "
+          f"{valid / (len(summaries) * args.size[0] * args.size[1]):.2%} of the pixels valid")
+
+if __name__ == "__main__":
+    main()
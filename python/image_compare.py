@@ -0,0 +1,265 @@
+import argparse
+import json
+import math
+import os
+import sys
+import numpy as np
+import pnm
+from fpga_image import BAYER_PATTERNS, RAW_LAYOUTS, iter_frames, parse_size
+
+# Window radius of each module: the rows and columns at the frame edge
+# that the benches leave at their fill value instead of a filtered pixel.
+MODULE_BORDERS = {
+    'mean3x3': 1, 'mean7x7': 3, 'mean9x9': 4,
+    'gauss5x5': 2, 'gauss9x9': 4,
+    'laplacian3x3': 1, 'sobel': 1, 'sobel_basic': 1, 'emboss': 1,
+    'median3x3': 1, 'median7x7': 3, 'median9x9': 4,
+    'bilateral3x3': 1, 'bilateral5x5': 2, 'bilateral9x9': 4,
+    'erosion': 1, 'dilation': 1,
+    'census3x3': 1, 'census7x9': 4,
+    'bayer2rgb': 1, 'demosaic': 1,
+}
+
+# Gaussian SSIM window of Wang et al.
+SSIM_WINDOW = 11
+SSIM_SIGMA = 1.5
+# Rows compared at a time when gating with early exit.
+BAND_ROWS = 64
+HEATMAP_STRIP = 16
+
+def parse_offset(text):
+    try:
+        dy, dx = (int(value) for value in text.split(','))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Invalid offset '{text}', expected DY,DX") from None
+    return dy, dx
+
+def align(output, reference, offset=(0, 0), border=0):
+    # Views of the overlap where output[y + dy, x + dx] holds reference[y, x],
+    # less `border` pixels on every side of the reference frame.
+    dy, dx = offset
+    height = min(reference.shape[0], output.shape[0] - dy) if dy >= 0 else min(reference.shape[0] + dy, output.shape[0])
+    width = min(reference.shape[1], output.shape[1] - dx) if dx >= 0 else min(reference.shape[1] + dx, output.shape[1])
+    top, left = max(-dy, 0), max(-dx, 0)
+    rows = slice(max(top, border), min(top + height, reference.shape[0] - border))
+    cols = slice(max(left, border), min(left + width, reference.shape[1] - border))
+    if rows.start >= rows.stop or cols.start >= cols.stop:
+        raise ValueError(f"Nothing left to compare at offset {dy},{dx} with border {border}")
+    shifted_rows = slice(rows.start + dy, rows.stop + dy)
+    shifted_cols = slice(cols.start + dx, cols.stop + dx)
+    return output[shifted_rows, shifted_cols], reference[rows, cols]
+
+def search_offset(output, reference, radius, border=0):
+    # The offset within +-radius with the smallest mean absolute error.
+    best = None
+    for dy in range(-radius, radius + 1):
+        for dx in range(-radius, radius + 1):
+            try:
+                out, ref = align(output, reference, (dy, dx), max(border, radius))
+            except ValueError:
+                continue
+            error = np.abs(out.astype(np.int32) - ref).mean()
+            if best is None or error < best[0]:
+                best = (error, (dy, dx))
+    if best is None:
+        raise ValueError(f"Frames too small to search offsets of +-{radius}")
+    return best[1]
+
+def psnr(mse, peak):
+    return math.inf if mse == 0 else 10 * math.log10(peak * peak / mse)
+
+def ssim(output, reference, peak):
+    # Mean SSIM over the frame (and channels) with the 11x11, sigma 1.5
+    # Gaussian window and the usual K1 = 0.01, K2 = 0.03 constants.
+    import cv2
+    c1, c2 = (0.01 * peak) ** 2, (0.03 * peak) ** 2
+    a, b = output.astype(np.float64), reference.astype(np.float64)
+
+    def blur(image):
+        return cv2.GaussianBlur(image, (SSIM_WINDOW, SSIM_WINDOW), SSIM_SIGMA)
+
+    mu_a, mu_b = blur(a), blur(b)
+    var_a = blur(a * a) - mu_a * mu_a
+    var_b = blur(b * b) - mu_b * mu_b
+    covariance = blur(a * b) - mu_a * mu_b
+    index = ((2 * mu_a * mu_b + c1) * (2 * covariance + c2)) / ((mu_a ** 2 + mu_b ** 2 + c1) * (var_a + var_b + c2))
+    return float(index.mean())
+
+def pixel_errors(output, reference):
+    # Largest absolute difference of every pixel over its channels.
+    diff = np.abs(output.astype(np.int32) - reference)
+    return diff.max(axis=2) if diff.ndim == 3 else diff
+
+def compare(output, reference, peak=255, tolerance=0, quality=True):
+    # Mismatches are pixels off by more than tolerance in any channel; the
+    # row and column counts are the heatmap profiles.
+    errors = pixel_errors(output, reference)
+    bad = errors > tolerance
+    result = {
+        'max_abs': int(errors.max()),
+        'mismatches': int(np.count_nonzero(bad)),
+        'pixels': int(bad.size),
+        'rows': np.count_nonzero(bad, axis=1),
+        'cols': np.count_nonzero(bad, axis=0),
+    }
+    if quality:
+        diff = output.astype(np.float64) - reference
+        result['psnr'] = psnr(float(np.mean(diff * diff)), peak)
+        result['ssim'] = ssim(output, reference, peak)
+    return result
+
+def within(output, reference, tolerance=0, max_mismatches=0):
+    # Band-by-band check that stops as soon as the frame has more than
+    # max_mismatches pixels off by more than tolerance.
+    mismatches = 0
+    for start in range(0, reference.shape[0], BAND_ROWS):
+        band = pixel_errors(output[start:start + BAND_ROWS], reference[start:start + BAND_ROWS])
+        mismatches += int(np.count_nonzero(band > tolerance))
+        if mismatches > max_mismatches:
+            return False
+    return True
+
+def heatmap(output, reference, result):
+    # |output - reference| scaled to 0..255, with the mismatches of every row
+    # drawn as a bar on the right and of every column as a bar underneath.
+    errors = pixel_errors(output, reference)
+    height, width = errors.shape
+    image = np.zeros((height + HEATMAP_STRIP, width + HEATMAP_STRIP), dtype=np.uint8)
+    peak = int(errors.max())
+    if peak:
+        image[:height, :width] = errors * 255 // peak
+    rows = -(-result['rows'] * HEATMAP_STRIP // width)
+    cols = -(-result['cols'] * HEATMAP_STRIP // height)
+    image[:height, width:] = np.where(np.arange(HEATMAP_STRIP) < rows[:, None], 255, 64)
+    image[height:, :width] = np.where(np.arange(HEATMAP_STRIP)[:, None] < cols, 255, 64)
+    return image
+
+def frame_pairs(outputs, references, raw_size=None, layout=None, pattern=None, bit_depth=8):
+    # Both streams are read one frame at a time and paired in order.
+    sentinel = object()
+    output_frames = iter_frames(outputs, 'any', raw_size, layout, pattern, bit_depth)
+    reference_frames = iter_frames(references, 'any', raw_size, layout, pattern, bit_depth)
+    while True:
+        output = next(output_frames, sentinel)
+        reference = next(reference_frames, sentinel)
+        if output is sentinel or reference is sentinel:
+            if output is not reference:
+                print(f"Warning: {'output' if output is sentinel else 'reference'} stream ended first")
+            return
+        yield output, reference
+
+def passes(result, max_mismatches=0, min_psnr=None, min_ssim=None):
+    return (result['mismatches'] <= max_mismatches
+            and (min_psnr is None or result['psnr'] >= min_psnr)
+            and (min_ssim is None or result['ssim'] >= min_ssim))
+
+def format_result(result):
+    text = f"{result['mismatches']}/{result['pixels']} pixels differ, max abs {result['max_abs']}"
+    if 'psnr' in result:
+        text += f", PSNR {result['psnr']:.2f} dB, SSIM {result['ssim']:.4f}"
+    return text
+
+def run_compare(outputs, references, offset=(0, 0), border=0, search=0, peak=None, tolerance=0,
+                max_mismatches=0, min_psnr=None, min_ssim=None, early_exit=False, heatmap_dir=None,
+                report_path=None, raw_size=None, layout=None, pattern=None, bit_depth=8):
+    # Compares the streams frame by frame and returns (frames, failures).
+    # With early_exit the run stops at the first failing frame, and unless a
+    # PSNR or SSIM gate needs them, passing frames are only checked band by
+    # band for mismatches.
+    gated_quality = min_psnr is not None or min_ssim is not None
+    fast = early_exit and not gated_quality
+    results = []
+    frames = failures = 0
+    for (name, output), (reference_name, reference) in frame_pairs(outputs, references, raw_size, layout, pattern,
+                                                                    bit_depth):
+        if output.ndim != reference.ndim:
+            raise ValueError(f"{name} and {reference_name} do not have the same channels")
+        if search and frames == 0:
+            offset = search_offset(output, reference, search, border)
+            print(f"Best offset: {offset[0]},{offset[1]} (DY,DX)")
+        out, ref = align(output, reference, offset, border)
+        frame_peak = peak or (255 if reference.dtype == np.uint8 else 65535)
+        if fast and within(out, ref, tolerance, max_mismatches):
+            result = None
+            passed = True
+        else:
+            result = compare(out, ref, frame_peak, tolerance)
+            passed = passes(result, max_mismatches, min_psnr, min_ssim)
+        record = {'frame': frames, 'output': name, 'reference': reference_name, 'passed': passed}
+        if result is not None:
+            record.update((key, value) for key, value in result.items() if key not in ('rows', 'cols'))
+            if result['mismatches']:
+                record['rows'] = result['rows'].tolist()
+                record['cols'] = result['cols'].tolist()
+        results.append(record)
+        frames += 1
+        if not passed:
+            failures += 1
+            print(f"FAIL: frame {frames - 1} ({name}): {format_result(result)}")
+            if heatmap_dir:
+                os.makedirs(heatmap_dir, exist_ok=True)
+                path = os.path.join(heatmap_dir, f"heatmap_{frames - 1:05d}.pgm")
+                pnm.write_pgm(path, heatmap(out, ref, result), 255, 'P5')
+                print(f"  heatmap saved to {path}")
+            if early_exit:
+                break
+        elif result is not None and frames == 1:
+            print(f"Frame 0 ({name}): {format_result(result)}")
+        if frames % 100 == 0:
+            print(f"  {frames} frames compared, {failures} failed")
+
+    if report_path:
+        for record in results:
+            for key in ('psnr', 'ssim'):
+                if key in record and math.isinf(record[key]):
+                    record[key] = None
+        with open(report_path, 'w') as f:
+            json.dump({'offset': list(offset), 'border': border, 'tolerance': tolerance, 'frames': frames,
+                       'failures': failures, 'early_exit': early_exit, 'results': results}, f, indent=1)
+        print(f"Report saved to {report_path}")
+    return frames, failures
+
+def main():
+    parser = argparse.ArgumentParser(description='Compare FPGA or simulation output frames against a reference')
+    parser.add_argument('output', nargs='+', help='Output frames: images, raw streams, directories or videos')
+    parser.add_argument('-r', '--reference', nargs='+', required=True, help='Reference frames, paired in order')
+    parser.add_argument('-m', '--module', choices=sorted(MODULE_BORDERS),
+                        help='Ignore the border the module leaves unfiltered')
+    parser.add_argument('--border', type=int, help='Pixels ignored on every side (default: from --module, else 0)')
+    parser.add_argument('--offset', type=parse_offset, default=(0, 0),
+                        help='DY,DX: output[y + DY, x + DX] holds reference[y, x] (default: 0,0)')
+    parser.add_argument('--search', type=int, default=0,
+                        help='Find the offset within +-N pixels on the first frame and use it for the rest')
+    parser.add_argument('--tolerance', type=int, default=0, help='Allowed absolute error per sample (default: 0)')
+    parser.add_argument('--max-mismatches', type=int, default=0,
+                        help='Pixels beyond the tolerance a frame may have and still pass (default: 0)')
+    parser.add_argument('--min-psnr', type=float, help='Fail frames below this PSNR (dB)')
+    parser.add_argument('--min-ssim', type=float, help='Fail frames below this SSIM')
+    parser.add_argument('--peak', type=int, help='Peak sample value for PSNR/SSIM (default: 255, 65535 for 16-bit)')
+    parser.add_argument('--early-exit', action='store_true', help='Stop at the first failing frame')
+    parser.add_argument('--heatmap-dir', help='Write a mismatch heatmap PGM for every failing frame')
+    parser.add_argument('--report', help='JSON report with the metrics of every frame')
+    parser.add_argument('-s', '--size', type=parse_size, help='WIDTHxHEIGHT of raw frames')
+    parser.add_argument('--layout', choices=RAW_LAYOUTS, help='Raw frame layout (default: from file name)')
+    parser.add_argument('-p', '--pattern', choices=BAYER_PATTERNS, help='Bayer pattern (default: from file name)')
+    parser.add_argument('--bit-depth', type=int, default=8, help='Raw sample bits (default: 8)')
+    args = parser.parse_args()
+
+    border = args.border if args.border is not None else MODULE_BORDERS.get(args.module, 0)
+    try:
+        frames, failures = run_compare(args.output, args.reference, args.offset, border, args.search, args.peak,
+                                       args.tolerance, args.max_mismatches, args.min_psnr, args.min_ssim,
+                                       args.early_exit, args.heatmap_dir, args.report, args.size, args.layout,
+                                       args.pattern, args.bit_depth)
+    except (OSError, ValueError, IndexError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if frames == 0:
+        print("FAIL: no frames compared")
+        sys.exit(1)
+    print(f"{'PASS' if failures == 0 else 'FAIL'}: {frames - failures}/{frames} frames passed")
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
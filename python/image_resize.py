@@ -1,8 +1,17 @@
 import cv2
 import numpy as np
+import math
 import os
 import argparse
+import sys
 from pathlib import Path
+import batch
+import conversion_cache
+import pnm
+from raw_frame import RawFrame, parse_dimensions
+
+# Output rows per strip when streaming is requested without a size.
+DEFAULT_STRIP_ROWS = 256
 
 def detect_image_format(file_path):
     ext = Path(file_path).suffix.lower()
@@ -18,6 +27,8 @@ def detect_image_format(file_path):
         return 'bmp'
     elif ext in ['.tif', '.tiff']:
         return 'tiff'
+    elif ext == '.raw':
+        return 'raw'
     else:
         try:
             with open(file_path, 'rb') as f:
@@ -31,109 +42,197 @@ def detect_image_format(file_path):
         return 'unknown'
 
 def read_pgm(file_path):
-    with open(file_path, 'rb') as f:
-        magic = f.readline().decode('ascii').strip()
-        
-        line = ''
-        while True:
-            line = f.readline().decode('ascii')
-            if not line.startswith('#'):
-                break
-        
-        width, height = map(int, line.strip().split())
-        
-        max_val_line = f.readline().decode('ascii').strip()
-        max_val = int(max_val_line)
-        
-        if magic == 'P5':
-            image_data = np.fromfile(f, dtype=np.uint16 if max_val > 255 else np.uint8)
-            image = image_data.reshape((height, width))
-        else:
-            all_values = list(map(int, f.read().decode('ascii').split()))
-            image = np.array(all_values, dtype=np.uint16 if max_val > 255 else np.uint8).reshape((height, width))
-        
-        return image, max_val, magic
+    return pnm.read_pgm(file_path)
 
 def write_pgm(file_path, image, max_val=255, format_type='P5'):
     height, width = image.shape
-    
-    if format_type == 'P2':
-        with open(file_path, 'w') as f:
-            f.write("P2\n")
-            f.write(f"# Resized image {width}x{height}\n")
-            f.write(f"{width} {height}\n")
-            f.write(f"{max_val}\n")
-            
-            pixel_count = 0
-            line_buffer = ""
-            for row in image:
-                for pixel in row:
-                    pixel_str = str(pixel)
-                    if len(line_buffer) + len(pixel_str) + 1 > 70:
-                        f.write(line_buffer.rstrip() + "\n")
-                        line_buffer = ""
-                    if line_buffer:
-                        line_buffer += " " + pixel_str
-                    else:
-                        line_buffer = pixel_str
-                    pixel_count += 1
-            if line_buffer:
-                f.write(line_buffer + "\n")
-    else:
-        with open(file_path, 'wb') as f:
-            f.write(b"P5\n")
-            f.write(f"# Resized image {width}x{height}\n".encode('ascii'))
-            f.write(f"{width} {height}\n".encode('ascii'))
-            f.write(f"{max_val}\n".encode('ascii'))
-            image.astype(np.uint16 if max_val > 255 else np.uint8).tofile(f)
+    pnm.write_pgm(file_path, image, max_val, format_type, f"# Resized image {width}x{height}")
 
 def read_ppm(file_path):
-    with open(file_path, 'rb') as f:
-        magic = f.readline().decode('ascii').strip()
-        
-        line = ''
-        while True:
-            line = f.readline().decode('ascii')
-            if not line.startswith('#'):
-                break
-        
-        width, height = map(int, line.strip().split())
-        
-        max_val_line = f.readline().decode('ascii').strip()
-        max_val = int(max_val_line)
-        
-        if magic == 'P6':
-            image_data = np.fromfile(f, dtype=np.uint8)
-            image = image_data.reshape((height, width, 3))
-        else:
-            all_values = list(map(int, f.read().decode('ascii').split()))
-            image = np.array(all_values, dtype=np.uint8).reshape((height, width, 3))
-        
-        return image, max_val, magic
+    return pnm.read_ppm(file_path)
 
 def write_ppm(file_path, image, max_val=255, format_type='P6'):
     height, width, channels = image.shape
-    
-    if format_type == 'P3':
-        with open(file_path, 'w') as f:
-            f.write("P3\n")
-            f.write(f"# Resized image {width}x{height}\n")
-            f.write(f"{width} {height}\n")
-            f.write(f"{max_val}\n")
-            
-            for row in image:
-                for pixel in row:
-                    f.write(f"{pixel[0]} {pixel[1]} {pixel[2]} ")
-                f.write("\n")
+    pnm.write_ppm(file_path, image, max_val, format_type, f"# Resized image {width}x{height}")
+
+def target_size(original_width, original_height, width=None, height=None, scale_factor=1.0):
+    if width is not None and height is not None:
+        return width, height
+    if width is not None:
+        return width, int(original_height * (width / original_width))
+    if height is not None:
+        return int(original_width * (height / original_height)), height
+    return int(original_width * scale_factor), int(original_height * scale_factor)
+
+def open_raster(input_path, input_format, raw_size=None, bit_depth=8):
+    # Returns (raster, max_val, magic). Binary PGM/PPM and raw samples are
+    # memory-mapped, so nothing is read until rows are sliced; ASCII PNM has
+    # to be parsed whole.
+    if input_format == 'raw':
+        width, height = raw_size or parse_dimensions(input_path) or (None, None)
+        frame = RawFrame(input_path, 'bayer', width, height, bit_depth=bit_depth)
+        raster = np.memmap(input_path, dtype=frame.dtype, mode='r', shape=(frame.height, frame.width))
+        return raster, (1 << bit_depth) - 1, None
+    data = np.memmap(input_path, dtype=np.uint8, mode='r')
+    magic, width, height, max_val, offset = pnm.parse_header(data)
+    if magic in ('P2', 'P3'):
+        img, max_val, magic = read_pgm(input_path) if magic == 'P2' else read_ppm(input_path)
+        return img, max_val, magic
+    shape = (height, width, 3) if magic == 'P6' else (height, width)
+    raster = np.memmap(input_path, dtype=pnm.binary_dtype(max_val), mode='r', offset=offset, shape=shape)
+    return raster, max_val, magic
+
+def _read_rows(raster, first, last):
+    # Strips of a mapped file are read with plain file reads, so rows that
+    # were already resized do not stay resident through the mapping.
+    if isinstance(raster, np.memmap):
+        row_items = raster[0].size
+        rows = np.fromfile(raster.filename, dtype=raster.dtype, count=(last - first) * row_items,
+                           offset=raster.offset + first * row_items * raster.itemsize)
+        return rows.reshape((last - first,) + raster.shape[1:]).astype(raster.dtype.newbyteorder('='), copy=False)
+    return np.ascontiguousarray(raster[first:last])
+
+def _cubic_weights(f):
+    # cv2's bicubic kernel (A = -0.75) at taps -1..2 around the source row.
+    a = -0.75
+    w0 = ((a * (f + 1) - 5 * a) * (f + 1) + 8 * a) * (f + 1) - 4 * a
+    w1 = ((a + 2) * f - (a + 3)) * f * f + 1
+    w2 = ((a + 2) * (1 - f) - (a + 3)) * (1 - f) * (1 - f) + 1
+    return np.stack([w0, w1, w2, 1 - w0 - w1 - w2], axis=-1)
+
+def _lanczos4_weights(f):
+    # Taps -3..4, normalized like cv2's Lanczos4 table.
+    x = f[:, None] + 3 - np.arange(8)
+    weights = np.sinc(x) * np.sinc(x / 4)
+    return weights / weights.sum(axis=1, keepdims=True)
+
+def area_box(interpolation, width, height, target_width, target_height):
+    # cv2.resize uses the INTER_AREA box filter only when neither axis
+    # grows; otherwise both axes switch to linear with cell-based fractions.
+    return interpolation == cv2.INTER_AREA and target_width <= width and target_height <= height
+
+def axis_weights(interpolation, size, target_size, start, stop, area):
+    # Returns (taps, weights): output samples [start, stop) of a size ->
+    # target_size resize along one axis are the weighted sums of the source
+    # samples in taps, with the source coordinates cv2.resize uses for the
+    # whole frame and a replicated border. Fractions are float32, as in
+    # cv2.resize. area says whether the box filter applies (see area_box).
+    inv_scale = target_size / size
+    scale = 1.0 / inv_scale
+    dx = np.arange(start, stop, dtype=np.float64)
+    if interpolation == cv2.INTER_NEAREST:
+        taps = np.minimum(np.floor(dx * scale), size - 1)[:, None]
+        weights = np.ones_like(taps)
+    elif interpolation == cv2.INTER_AREA and area:
+        # Box filter: each source sample weighs by its overlap with the cell.
+        begin = dx * scale
+        end = np.minimum(begin + scale, size)
+        taps = np.floor(begin)[:, None] + np.arange(math.ceil(scale) + 1)
+        weights = np.minimum(taps + 1, end[:, None]) - np.maximum(taps, begin[:, None])
+        weights = np.clip(weights, 0, None) / (end - begin)[:, None]
     else:
-        with open(file_path, 'wb') as f:
-            f.write(b"P6\n")
-            f.write(f"# Resized image {width}x{height}\n".encode('ascii'))
-            f.write(f"{width} {height}\n".encode('ascii'))
-            f.write(f"{max_val}\n".encode('ascii'))
-            image.astype(np.uint8).tofile(f)
+        if interpolation == cv2.INTER_AREA:
+            sx = np.floor(dx * scale)
+            f = ((dx + 1) - (sx + 1) * inv_scale).astype(np.float32)
+            f = np.where(f <= 0, 0, f - np.floor(f))
+        else:
+            fx = ((dx + 0.5) * scale - 0.5).astype(np.float32)
+            sx = np.floor(fx)
+            f = fx - sx
+        f = f.astype(np.float64)
+        if interpolation == cv2.INTER_CUBIC:
+            taps = sx[:, None] + np.arange(-1, 3)
+            weights = _cubic_weights(f)
+        elif interpolation == cv2.INTER_LANCZOS4:
+            taps = sx[:, None] + np.arange(-3, 5)
+            weights = _lanczos4_weights(f)
+        else:
+            edge = (sx < 0) | (sx >= size - 1)
+            sx = np.clip(sx, 0, size - 1)
+            f = np.where(edge, 0, f)
+            taps = sx[:, None] + np.arange(2)
+            weights = np.stack([1 - f, f], axis=-1)
+    return np.clip(taps, 0, size - 1).astype(np.intp), weights.astype(np.float32)
 
-def resize_image(input_path, output_path, width=None, height=None, scale_factor=1.0, interpolation=cv2.INTER_LINEAR):
+def _mix(samples, taps, weights, axis):
+    # Weighted sums of samples along axis, one per row of taps, in float32.
+    shape = (-1,) + (1,) * (samples.ndim - axis - 1)
+    out = np.take(samples, taps[:, 0], axis=axis) * weights[:, 0].reshape(shape)
+    for k in range(1, taps.shape[1]):
+        out += np.take(samples, taps[:, k], axis=axis) * weights[:, k].reshape(shape)
+    return out
+
+def resize_strips(raster, target_width, target_height, interpolation=cv2.INTER_LINEAR, strip_rows=None):
+    # Yields the resized raster in bands of strip_rows output rows, or in
+    # one piece without strip_rows. Each band reads only the source rows its
+    # output rows depend on. Rows and then columns are mixed with the
+    # weights cv2.resize gives them for the whole frame (see axis_weights),
+    # so any scale factor streams in bands of the requested size. Both
+    # passes run in float32 and round once, which keeps every sample within
+    # 0.52 of the exact resampling; see strip_tolerance for how far that is
+    # from the one-shot resize.
+    height, width = raster.shape[:2]
+    if not strip_rows:
+        # cv2 takes native byte order only; 16-bit PNM rasters are big-endian.
+        image = np.asarray(raster, dtype=raster.dtype.newbyteorder('='))
+        yield cv2.resize(image, (target_width, target_height), interpolation=interpolation)
+        return
+    area = area_box(interpolation, width, height, target_width, target_height)
+    col_taps, col_weights = axis_weights(interpolation, width, target_width, 0, target_width, area)
+    for top in range(0, target_height, strip_rows):
+        bottom = min(top + strip_rows, target_height)
+        row_taps, row_weights = axis_weights(interpolation, height, target_height, top, bottom, area)
+        first, last = int(row_taps.min()), int(row_taps.max()) + 1
+        rows = _read_rows(raster, first, last)
+        mixed = _mix(rows.astype(np.float32), row_taps - first, row_weights, 0)
+        band = _mix(mixed, col_taps, col_weights, 1)
+        if np.issubdtype(rows.dtype, np.integer):
+            limits = np.iinfo(rows.dtype)
+            band = np.clip(np.rint(band), limits.min, limits.max)
+        yield band.astype(rows.dtype)
+
+def strip_tolerance(interpolation, dtype):
+    # Largest difference between the strip and the one-shot resize. For
+    # 16-bit samples cv2.resize's own linear and cubic paths are up to 2.5
+    # away from the exact resampling, so those two can differ by 3 LSB.
+    if interpolation == cv2.INTER_NEAREST:
+        return 0
+    if np.dtype(dtype).itemsize > 1 and interpolation in (cv2.INTER_LINEAR, cv2.INTER_CUBIC):
+        return 3
+    return 1
+
+def check_strips(raster, interpolation, strip_rows):
+    # Resizes the raster in strips and in one shot to sizes that shrink one
+    # axis and grow the other, and to ones that scale both the same way.
+    # Returns (target size, max abs error, tolerance) per size.
+    height, width = raster.shape[:2]
+    raster = np.asarray(raster, dtype=raster.dtype.newbyteorder('='))
+    sizes = [(width * 2 - 1, max(1, height // 2)), (max(1, width // 2), height * 3 // 2 + 1),
+             (max(1, width * 2 // 3), max(1, height * 3 // 4)), (width * 3 // 2, height * 2 + 1)]
+    tolerance = strip_tolerance(interpolation, raster.dtype)
+    results = []
+    for target_width, target_height in sizes:
+        expected = cv2.resize(raster, (target_width, target_height), interpolation=interpolation)
+        strips = np.concatenate(list(resize_strips(raster, target_width, target_height, interpolation, strip_rows)))
+        error = int(np.abs(strips.astype(np.int64) - expected).max())
+        results.append(((target_width, target_height), error, tolerance))
+    return results
+
+def write_strips(output_path, strips, magic, width, height, max_val):
+    # Binary PNM (big-endian 16-bit samples) or headerless raw samples
+    # (little-endian, like the raw dumps), written band by band.
+    with open(output_path, 'wb') as f:
+        if magic is not None:
+            f.write(pnm.pnm_header(magic, width, height, max_val, f"# Resized image {width}x{height}"))
+        for band in strips:
+            if magic is not None:
+                band = band.astype(pnm.binary_dtype(max_val), copy=False)
+            elif band.dtype.itemsize > 1:
+                band = band.astype('<u2', copy=False)
+            f.write(band.tobytes())
+
+def resize_image(input_path, output_path, width=None, height=None, scale_factor=1.0, interpolation=cv2.INTER_LINEAR,
+                 strip_rows=None, raw_size=None, bit_depth=8):
     try:
         if not os.path.exists(input_path):
             print(f"Error: Input file does not exist -> {input_path}")
@@ -147,63 +246,38 @@ def resize_image(input_path, output_path, width=None, height=None, scale_factor=
             return False
         
         if input_format in ['jpg', 'png', 'bmp', 'tiff']:
+            if strip_rows:
+                print(f"Error: Strip mode needs a binary PGM/PPM or raw input -> {input_path}")
+                return False
             img = cv2.imread(input_path)
             if img is None:
                 print(f"Error: Cannot read image -> {input_path}")
                 return False
-            
-            if len(img.shape) == 3:
-                img_rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
-            else:
-                img_rgb = img
-                
-            original_height, original_width = img.shape[:2]
-            max_val = 255
-            
-        elif input_format == 'pgm':
-            img, max_val, magic = read_pgm(input_path)
-            original_height, original_width = img.shape
-            img_rgb = img
-            
-        elif input_format == 'ppm':
-            img, max_val, magic = read_ppm(input_path)
-            original_height, original_width, _ = img.shape
-            img_rgb = img
-            
-        print(f"Original size: {original_width} x {original_height}")
-        
-        if width is not None and height is not None:
-            target_width = width
-            target_height = height
-        elif width is not None:
-            target_width = width
-            target_height = int(original_height * (width / original_width))
-        elif height is not None:
-            target_height = height
-            target_width = int(original_width * (height / original_height))
+            raster, max_val, magic = img, 255, None
         else:
-            target_width = int(original_width * scale_factor)
-            target_height = int(original_height * scale_factor)
-        
+            raster, max_val, magic = open_raster(input_path, input_format, raw_size, bit_depth)
+            if strip_rows and magic in ('P2', 'P3'):
+                print(f"Error: Strip mode needs a binary PGM/PPM, got {magic} -> {input_path}")
+                return False
+
+        original_height, original_width = raster.shape[:2]
+        print(f"Original size: {original_width} x {original_height}")
+        target_width, target_height = target_size(original_width, original_height, width, height, scale_factor)
         print(f"Target size: {target_width} x {target_height}")
-        
-        if len(img_rgb.shape) == 3:
-            resized_img = cv2.resize(img_rgb, (target_width, target_height), interpolation=interpolation)
-        else:
-            resized_img = cv2.resize(img_rgb, (target_width, target_height), interpolation=interpolation)
-        
+        if strip_rows:
+            print(f"Streaming in strips of {strip_rows} rows")
+
+        # Interpolation is per channel, so color images are resized in the
+        # channel order they were read in.
+        strips = resize_strips(raster, target_width, target_height, interpolation, strip_rows)
         if input_format in ['jpg', 'png', 'bmp', 'tiff']:
-            if len(resized_img.shape) == 3:
-                resized_bgr = cv2.cvtColor(resized_img, cv2.COLOR_RGB2BGR)
-                cv2.imwrite(output_path, resized_bgr)
-            else:
-                cv2.imwrite(output_path, resized_img)
-                
-        elif input_format == 'pgm':
-            write_pgm(output_path, resized_img, max_val, magic)
-            
-        elif input_format == 'ppm':
-            write_ppm(output_path, resized_img, max_val, magic)
+            cv2.imwrite(output_path, next(strips))
+        elif magic == 'P2':
+            write_pgm(output_path, next(strips), max_val, magic)
+        elif magic == 'P3':
+            write_ppm(output_path, next(strips), max_val, magic)
+        else:
+            write_strips(output_path, strips, magic, target_width, target_height, max_val)
         
         print(f"Resize successful! Output file: {output_path}")
         print(f"Output format: {input_format}")
@@ -214,8 +288,15 @@ def resize_image(input_path, output_path, width=None, height=None, scale_factor=
         print(f"Error during resize: {e}")
         return False
 
+def resize_params(width, height, scale_factor, interpolation, raw_size=None, bit_depth=8, strip_rows=None):
+    # Strip mode may differ from the one-shot resize by a few LSB (see
+    # strip_tolerance), so the strip size is part of the key.
+    return {'width': width, 'height': height, 'scale': scale_factor, 'interpolation': int(interpolation),
+            'raw_size': raw_size, 'bit_depth': bit_depth, 'strips': strip_rows}
+
 def batch_resize(input_dir, output_dir, width=None, height=None, scale_factor=1.0, 
-                 supported_formats=['jpg', 'jpeg', 'pgm', 'ppm', 'png', 'bmp', 'tiff']):
+                 supported_formats=['jpg', 'jpeg', 'pgm', 'ppm', 'png', 'bmp', 'tiff'],
+                 interpolation=cv2.INTER_LINEAR, jobs=1, strip_rows=None):
     if not os.path.exists(input_dir):
         print(f"Error: Input directory does not exist -> {input_dir}")
         return
@@ -223,7 +304,7 @@ def batch_resize(input_dir, output_dir, width=None, height=None, scale_factor=1.
     os.makedirs(output_dir, exist_ok=True)
     
     image_files = []
-    for filename in os.listdir(input_dir):
+    for filename in sorted(os.listdir(input_dir)):
         ext = Path(filename).suffix.lower()[1:]
         if ext in supported_formats:
             image_files.append(filename)
@@ -235,19 +316,17 @@ def batch_resize(input_dir, output_dir, width=None, height=None, scale_factor=1.
     print(f"Found {len(image_files)} image files:")
     for img_file in image_files:
         print(f"  - {img_file}")
+    print()
     
-    success_count = 0
+    tasks = []
     for img_file in image_files:
         input_path = os.path.join(input_dir, img_file)
         output_path = os.path.join(output_dir, img_file)
-        
-        print(f"\nProcessing: {img_file}")
-        success = resize_image(input_path, output_path, width, height, scale_factor)
-        
-        if success:
-            success_count += 1
+        params = resize_params(width, height, scale_factor, interpolation, None, 8, strip_rows)
+        tasks.append((img_file, (resize_image, input_path, output_path, params,
+                                 width, height, scale_factor, interpolation, strip_rows)))
     
-    print(f"\nBatch processing completed! Successfully processed {success_count}/{len(image_files)} files")
+    return batch.run_batch(conversion_cache.cached_convert, tasks, jobs)
 
 def main():
     parser = argparse.ArgumentParser(description='Universal image resize tool')
@@ -260,8 +339,23 @@ def main():
                        choices=['nearest', 'linear', 'cubic', 'area', 'lanczos'],
                        help='Interpolation method (default: linear)')
     parser.add_argument('-b', '--batch', action='store_true', help='Batch process directory')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                       help='Parallel worker processes for batch mode (default: 1, 0 = all cores)')
+    parser.add_argument('--strips', nargs='?', type=int, const=DEFAULT_STRIP_ROWS, metavar='ROWS',
+                        help=f'Stream binary PGM/PPM or raw input in bands of ROWS output rows '
+                             f'to bound memory (default ROWS: {DEFAULT_STRIP_ROWS})')
+    parser.add_argument('--raw-size', help='WIDTHxHEIGHT of a raw input (default: from the file name)')
+    parser.add_argument('--bit-depth', type=int, default=8, help='Bits per sample of a raw input (default: 8)')
+    parser.add_argument('--check-strips', action='store_true',
+                        help='Compare strip mode with a one-shot resize of the input at mixed up/down scales '
+                             'and exit with 1 on a mismatch')
     
     args = parser.parse_args()
+    raw_size = None
+    if args.raw_size:
+        raw_size = parse_dimensions(args.raw_size)
+        if raw_size is None:
+            parser.error("--raw-size must look like WIDTHxHEIGHT")
     
     interpolation_map = {
         'nearest': cv2.INTER_NEAREST,
@@ -272,16 +366,42 @@ def main():
     }
     interpolation = interpolation_map[args.interpolation]
     
+    if args.check_strips:
+        input_format = detect_image_format(args.input)
+        if input_format in ['jpg', 'png', 'bmp', 'tiff']:
+            raster = cv2.imread(args.input)
+        else:
+            raster = open_raster(args.input, input_format, raw_size, args.bit_depth)[0]
+        if raster is None:
+            print(f"Error: Cannot read image -> {args.input}")
+            sys.exit(1)
+        failed = False
+        for (target_width, target_height), error, tolerance in \
+                check_strips(raster, interpolation, args.strips or DEFAULT_STRIP_ROWS):
+            status = 'PASS' if error <= tolerance else 'FAIL'
+            failed |= error > tolerance
+            print(f"{target_width}x{target_height}: {status}, max abs error {error} (allowed {tolerance})")
+        if failed:
+            sys.exit(1)
+        return
+
     if args.batch:
-        batch_resize(args.input, args.output, args.width, args.height, args.scale)
+        jobs = args.jobs if args.jobs > 0 else batch.default_jobs()
+        batch_resize(args.input, args.output, args.width, args.height, args.scale,
+                     interpolation=interpolation, jobs=jobs, strip_rows=args.strips)
     else:
-        resize_image(args.input, args.output, args.width, args.height, args.scale, interpolation)
+        conversion_cache.cached_convert(resize_image, args.input, args.output,
+                                        resize_params(args.width, args.height, args.scale, interpolation,
+                                                      raw_size, args.bit_depth, args.strips),
+                                        args.width, args.height, args.scale, interpolation, args.strips,
+                                        raw_size, args.bit_depth)
 
 if __name__ == "__main__":
-    import sys
     if len(sys.argv) > 1:
         main()
     else:
         print("Running...")
-        resize_image("../data/color.jpeg", "../data/color_resized.jpg", width=320, height=240)
-        resize_image("../data/chessboard.png", "../data/chessboard_resized.jpg", width=320, height=466)
\ No newline at end of file
+        conversion_cache.cached_convert(resize_image, "../data/color.jpeg", "../data/color_resized.jpg",
+                                        resize_params(320, 240, 1.0, cv2.INTER_LINEAR), 320, 240)
+        conversion_cache.cached_convert(resize_image, "../data/chessboard.png", "../data/chessboard_resized.jpg",
+                                        resize_params(320, 466, 1.0, cv2.INTER_LINEAR), 320, 466)
\ No newline at end of file
@@ -1,59 +1,149 @@
-import cv2
+import argparse
+import os
+import sys
 import numpy as np
+import conversion_cache
+from raw_frame import BAYER_PATTERNS, check_pattern
 
-def rgb_to_bayer(rgb_img, pattern='BGGR'):
+BIT_DEPTHS = [8, 10, 12, 16]
+# MIPI CSI-2 packed layouts: (bits per sample, samples per group)
+MIPI_PACKINGS = {'raw10': (10, 4), 'raw12': (12, 2)}
+
+_CHANNELS = {'R': 0, 'G': 1, 'B': 2}
+
+def rgb_to_bayer_patterns(rgb_img, patterns=BAYER_PATTERNS):
+    # Mosaics one RGB image into several patterns at once. Every 2x2 phase
+    # of the source is read once and copied into each pattern that samples
+    # it, so the strided gathers are shared.
     if len(rgb_img.shape) != 3 or rgb_img.shape[2] != 3:
         raise ValueError("Input image must be RGB format (H, W, 3)")
+    patterns = [check_pattern(pattern) for pattern in patterns]
+    height, width = rgb_img.shape[:2]
+    mosaics = {pattern: np.empty((height, width), dtype=rgb_img.dtype) for pattern in patterns}
+    for index in range(4):
+        row, col = divmod(index, 2)
+        phase = rgb_img[row::2, col::2]
+        planes = {}
+        for pattern in patterns:
+            channel = _CHANNELS[pattern[index]]
+            if channel not in planes:
+                planes[channel] = phase[..., channel]
+            mosaics[pattern][row::2, col::2] = planes[channel]
+    return mosaics
 
-    pattern = pattern.upper()
-    if pattern not in ['BGGR', 'GRBG', 'GBRG', 'RGGB']:
-        raise ValueError("Unsupported Bayer pattern, please choose 'BGGR', 'GRBG', 'GBRG' or 'RGGB'")
+def rgb_to_bayer(rgb_img, pattern='BGGR'):
+    pattern = check_pattern(pattern)
+    return rgb_to_bayer_patterns(rgb_img, [pattern])[pattern]
 
-    height, width = rgb_img.shape[:2]
-    bayer_img = np.zeros((height, width), dtype=np.uint8)
-
-    r_channel = rgb_img[..., 0]
-    g_channel = rgb_img[..., 1]
-    b_channel = rgb_img[..., 2]
-
-    if pattern == 'BGGR':
-        bayer_img[::2, ::2] = b_channel[::2, ::2]
-        bayer_img[::2, 1::2] = g_channel[::2, 1::2]
-        bayer_img[1::2, ::2] = g_channel[1::2, ::2]
-        bayer_img[1::2, 1::2] = r_channel[1::2, 1::2]
-    elif pattern == 'GRBG':
-        bayer_img[::2, ::2] = g_channel[::2, ::2]
-        bayer_img[::2, 1::2] = r_channel[::2, 1::2]
-        bayer_img[1::2, ::2] = b_channel[1::2, ::2]
-        bayer_img[1::2, 1::2] = g_channel[1::2, 1::2]
-    elif pattern == 'GBRG':
-        bayer_img[::2, ::2] = g_channel[::2, ::2]
-        bayer_img[::2, 1::2] = b_channel[::2, 1::2]
-        bayer_img[1::2, ::2] = r_channel[1::2, ::2]
-        bayer_img[1::2, 1::2] = g_channel[1::2, 1::2]
-    elif pattern == 'RGGB':
-        bayer_img[::2, ::2] = r_channel[::2, ::2]
-        bayer_img[::2, 1::2] = g_channel[::2, 1::2]
-        bayer_img[1::2, ::2] = g_channel[1::2, ::2]
-        bayer_img[1::2, 1::2] = b_channel[1::2, 1::2]
-
-    return bayer_img
-
-def jpg_to_bayer(jpg_path, bayer_path, pattern='BGGR'):
+def scale_samples(samples, bit_depth):
+    # Widens 8-bit samples by bit replication, so 0 and 255 map to the ends
+    # of the wider range.
+    if bit_depth not in BIT_DEPTHS:
+        raise ValueError(f"Unsupported bit depth: {bit_depth}, please choose one of {BIT_DEPTHS}")
+    if bit_depth == 8:
+        return samples
+    wide = samples.astype(np.uint16)
+    return (wide << (bit_depth - 8)) | (wide >> (16 - bit_depth))
+
+def pack_mipi(samples, packing):
+    # RAW10: four samples in five bytes, the high eight bits of each first
+    # and their low two bits in the fifth byte (sample 0 in bits 1:0).
+    # RAW12: two samples in three bytes, the third holding both low nibbles.
+    bits, group = MIPI_PACKINGS[packing]
+    height, width = samples.shape
+    if width % group:
+        raise ValueError(f"{packing.upper()} needs a width that is a multiple of {group}")
+    samples = samples.astype(np.uint16).reshape(height, width // group, group)
+    low_bits = bits - 8
+    packed = np.empty((height, width // group, group + 1), dtype=np.uint8)
+    packed[..., :group] = samples >> low_bits
+    low = samples & ((1 << low_bits) - 1)
+    packed[..., group] = sum(low[..., i] << (i * low_bits) for i in range(group))
+    return packed.reshape(height, -1)
+
+def unpack_mipi(data, width, height, packing):
+    bits, group = MIPI_PACKINGS[packing]
+    low_bits = bits - 8
+    packed = np.frombuffer(data, dtype=np.uint8, count=height * width // group * (group + 1))
+    packed = packed.reshape(height, width // group, group + 1).astype(np.uint16)
+    samples = packed[..., :group] << low_bits
+    for i in range(group):
+        samples[..., i] |= (packed[..., group] >> (i * low_bits)) & ((1 << low_bits) - 1)
+    return samples.reshape(height, width)
+
+def encode_bayer(bayer_img, bit_depth=8, packing=None):
+    # Raw bytes of an 8-bit mosaic at the requested depth: one byte per
+    # sample, little-endian 16-bit words, or MIPI-packed RAW10/RAW12.
+    if packing:
+        bits = MIPI_PACKINGS[packing][0]
+        return pack_mipi(scale_samples(bayer_img, bits), packing).tobytes()
+    samples = scale_samples(bayer_img, bit_depth)
+    if bit_depth == 8:
+        return samples.tobytes()
+    return samples.astype('<u2').tobytes()
+
+def pattern_outputs(output, patterns):
+    # One pattern writes to output itself, several to '<stem>_<pattern>.raw'.
+    if len(patterns) == 1:
+        return {patterns[0]: output}
+    stem, ext = os.path.splitext(output)
+    return {pattern: f"{stem}_{pattern.lower()}{ext or '.raw'}" for pattern in patterns}
+
+def jpg_to_bayer_patterns(jpg_path, outputs, bit_depth=8, packing=None):
+    # outputs maps each pattern to its output path; the JPEG is decoded once.
+    # OpenCV is only needed for decoding, so the mosaic helpers above stay
+    # usable without it.
+    import cv2
     img = cv2.imread(jpg_path)
     if img is None:
         print(f"Error: Cannot read image {jpg_path}")
-        return
+        return False
 
     rgb_img = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+    try:
+        mosaics = rgb_to_bayer_patterns(rgb_img, list(outputs))
+        for pattern, bayer_path in outputs.items():
+            data = encode_bayer(mosaics[pattern.upper()], bit_depth, packing)
+            with open(bayer_path, 'wb') as f:
+                f.write(data)
+            print(f"Conversion successful! Bayer file saved to {bayer_path}")
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+    return True
+
+def jpg_to_bayer(jpg_path, bayer_path, pattern='BGGR', bit_depth=8, packing=None):
+    return jpg_to_bayer_patterns(jpg_path, {pattern: bayer_path}, bit_depth, packing)
+
+def bayer_params(pattern, bit_depth=8, packing=None):
+    return {'pattern': pattern, 'bit_depth': bit_depth, 'packing': packing}
+
+def cached_bayer_patterns(func, many, input_path, outputs, bit_depth=8, packing=None):
+    # Caches each pattern as if func(input_path, path, pattern, ...) had
+    # written it alone; many(input_path, outputs, ...) builds the patterns
+    # that missed from one decode.
+    patterns = {path: pattern for pattern, path in outputs.items()}
+    return conversion_cache.cached_convert_many(
+        func, input_path, {path: bayer_params(pattern, bit_depth, packing) for pattern, path in outputs.items()},
+        lambda missing: many(input_path, {patterns[path]: path for path in missing}, bit_depth, packing))
 
-    bayer_img = rgb_to_bayer(rgb_img, pattern)
+def main():
+    parser = argparse.ArgumentParser(description='Convert an image to raw Bayer mosaics')
+    parser.add_argument('input', help='Input image')
+    parser.add_argument('output', help="Output file, or a stem when several patterns are given ('<stem>_<pattern>.raw')")
+    parser.add_argument('-p', '--patterns', nargs='+', default=['BGGR'], choices=BAYER_PATTERNS,
+                        help='Bayer pattern(s) to write from one decode (default: BGGR)')
+    parser.add_argument('-b', '--bit-depth', type=int, default=8, choices=BIT_DEPTHS,
+                        help='Sample depth; above 8 bits samples are little-endian 16-bit words (default: 8)')
+    parser.add_argument('--packing', choices=sorted(MIPI_PACKINGS), help='Write MIPI CSI-2 packed RAW10/RAW12 instead')
+    args = parser.parse_args()
 
-    bayer_img.tofile(bayer_path)
-    print(f"Conversion successful! Bayer file saved to {bayer_path}")
+    outputs = pattern_outputs(args.output, args.patterns)
+    cached_bayer_patterns(jpg_to_bayer, jpg_to_bayer_patterns, args.input, outputs, args.bit_depth, args.packing)
 
 if __name__ == "__main__":
-    jpg_to_bayer("../data/color2.jpg", "../data/color2_bayer_bggr.raw", "BGGR")
-    jpg_to_bayer("../data/color2.jpg", "../data/color2_bayer_grbg.raw", "GRBG")
-    jpg_to_bayer("../data/color2.jpg", "../data/color2_bayer_gbrg.raw", "GBRG")
-    jpg_to_bayer("../data/color2.jpg", "../data/color2_bayer_rggb.raw", "RGGB")
\ No newline at end of file
+    if len(sys.argv) > 1:
+        main()
+    else:
+        cached_bayer_patterns(jpg_to_bayer, jpg_to_bayer_patterns, "../data/color2.jpg",
+                              {pattern: f"../data/color2_bayer_{pattern.lower()}.raw" for pattern in BAYER_PATTERNS})
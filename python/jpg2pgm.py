@@ -1,6 +1,9 @@
 import cv2
-import numpy as np
 import os
+import argparse
+import batch
+import conversion_cache
+import pnm
 
 def jpg_to_pgm_p2(jpg_path, pgm_path, comment="# Created by jpg2pgm.py"):
     try:
@@ -20,34 +23,10 @@ def jpg_to_pgm_p2(jpg_path, pgm_path, comment="# Created by jpg2pgm.py"):
         print(f"Input JPG dimensions: {width} x {height}")
         print(f"Grayscale image data range: [{img_gray.min()}, {img_gray.max()}]")
 
-        with open(pgm_path, "w") as f:
-            f.write("P2\n")
-            f.write(f"{width} {height}\n")
-            f.write(f"{max_val}\n")
-            
-            pixel_count = 0
-            line_buffer = ""
-            
-            for row in img_gray:
-                for pixel in row:
-                    pixel_str = str(pixel)
-                    
-                    if len(line_buffer) + len(pixel_str) + 1 > 70:
-                        f.write(line_buffer.rstrip() + "\n")
-                        line_buffer = ""
-                    
-                    if line_buffer:
-                        line_buffer += " " + pixel_str
-                    else:
-                        line_buffer = pixel_str
-                    
-                    pixel_count += 1
-            
-            if line_buffer:
-                f.write(line_buffer + "\n")
+        pnm.write_pgm(pgm_path, img_gray, max_val, 'P2')
         
         print(f"Conversion successful! PGM P2 file saved to {pgm_path}")
-        print(f"Total pixels written: {pixel_count}")
+        print(f"Total pixels written: {img_gray.size}")
         print(f"Output file dimensions: {width} x {height}")
         return True
 
@@ -77,13 +56,7 @@ def jpg_to_pgm_p5(jpg_path, pgm_path, comment="# Created by jpg2pgm.py"):
         print(f"Input JPG dimensions: {width} x {height}")
         print(f"Grayscale image data range: [{img_gray.min()}, {img_gray.max()}]")
 
-        with open(pgm_path, "wb") as f:
-            f.write(b"P5\n")
-            f.write((comment + "\n").encode('ascii'))
-            f.write(f"{width} {height}\n".encode('ascii'))
-            f.write(f"{max_val}\n".encode('ascii'))
-            
-            img_gray.tofile(f)
+        pnm.write_pgm(pgm_path, img_gray, max_val, 'P5', comment)
         
         print(f"Conversion successful! PGM P5 file saved to {pgm_path}")
         print(f"Output file dimensions: {width} x {height}")
@@ -97,15 +70,13 @@ def jpg_to_pgm_p5(jpg_path, pgm_path, comment="# Created by jpg2pgm.py"):
         print(f"Error occurred during conversion: {e}")
         return False
 
-def convert_all_jpg_in_data(output_format="P2"):
-    data_dir = "../data"
-    
+def convert_all_jpg_in_data(output_format="P2", data_dir="../data", jobs=1):
     if not os.path.exists(data_dir):
         print(f"Data directory does not exist: {data_dir}")
         return
     
     jpg_files = []
-    for filename in os.listdir(data_dir):
+    for filename in sorted(os.listdir(data_dir)):
         if filename.lower().endswith(('.jpg', '.jpeg')):
             jpg_files.append(filename)
     
@@ -117,26 +88,34 @@ def convert_all_jpg_in_data(output_format="P2"):
     for jpg_file in jpg_files:
         print(f"  - {jpg_file}")
     
-    success_count = 0
+    convert = jpg_to_pgm_p2 if output_format.upper() == "P2" else jpg_to_pgm_p5
+    tasks = []
     for jpg_file in jpg_files:
         jpg_path = os.path.join(data_dir, jpg_file)
         pgm_filename = os.path.splitext(jpg_file)[0] + ".pgm"
         pgm_path = os.path.join(data_dir, pgm_filename)
-        
-        print(f"Converting: {jpg_file} -> {pgm_filename}")
-        
-        if output_format.upper() == "P2":
-            success = jpg_to_pgm_p2(jpg_path, pgm_path)
-        else:
-            success = jpg_to_pgm_p5(jpg_path, pgm_path)
-        
-        if success:
-            success_count += 1
+        tasks.append((f"{jpg_file} -> {pgm_filename}",
+                      (convert, jpg_path, pgm_path, {'format': output_format.upper()})))
+    
+    return batch.run_batch(conversion_cache.cached_convert, tasks, jobs)
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert every JPG in a directory to PGM')
+    parser.add_argument('-d', '--data-dir', default='../data', help='Directory to convert (default: ../data)')
+    parser.add_argument('-f', '--format', default='P2', choices=['P2', 'P5'], help='PGM format (default: P2)')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='Parallel worker processes (default: 1, 0 = all cores)')
+    args = parser.parse_args()
     
-    print(f"Batch conversion completed! Successfully converted {success_count}/{len(jpg_files)} files")
+    jobs = args.jobs if args.jobs > 0 else batch.default_jobs()
+    convert_all_jpg_in_data(args.format, args.data_dir, jobs)
 
 if __name__ == "__main__":
-    jpg_to_pgm_p2("../data/gray1.jpg", "../data/gray1.pgm")
-    jpg_to_pgm_p2("../data/baby.jpg", "../data/baby.pgm")
-    jpg_to_pgm_p2("../data/in_erosion.jpg", "../data/in_erosion.pgm")
-    jpg_to_pgm_p2("../data/chessboard_resized.jpg", "../data/chessboard_resized.pgm")
\ No newline at end of file
+    import sys
+    if len(sys.argv) > 1:
+        main()
+    else:
+        conversion_cache.cached_convert(jpg_to_pgm_p2, "../data/gray1.jpg", "../data/gray1.pgm", {'format': 'P2'})
+        conversion_cache.cached_convert(jpg_to_pgm_p2, "../data/baby.jpg", "../data/baby.pgm", {'format': 'P2'})
+        conversion_cache.cached_convert(jpg_to_pgm_p2, "../data/in_erosion.jpg", "../data/in_erosion.pgm", {'format': 'P2'})
+        conversion_cache.cached_convert(jpg_to_pgm_p2, "../data/chessboard_resized.jpg", "../data/chessboard_resized.pgm", {'format': 'P2'})
\ No newline at end of file
@@ -0,0 +1,269 @@
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+import pnm
+from fpga_image import BAYER_PATTERNS, BAYER_BIT_DEPTHS, MIPI_PACKINGS, YUV_LAYOUTS, YUV_MATRICES, parse_size, \
+    rgb_to_gray
+from raw_frame import detect_layout, plane_shapes
+
+# Rows generated at a time. Noise is drawn per band, seeded with (seed,
+# band), so the band height is fixed: a seed always gives the same frame.
+BAND_ROWS = 64
+
+# One period of the zone plate's cosine, as 8-bit levels indexed by phase.
+ZONE_STEPS = 256
+_ZONE_TABLE = np.rint(127.5 + 127.5 * np.cos(2 * np.pi * np.arange(ZONE_STEPS) / ZONE_STEPS)).astype(np.uint8)
+
+# White, yellow, cyan, green, magenta, red, blue, black.
+COLOR_BARS = np.array([(255, 255, 255), (255, 255, 0), (0, 255, 255), (0, 255, 0),
+                       (255, 0, 255), (255, 0, 0), (0, 0, 255), (0, 0, 0)], dtype=np.uint8)
+
+DEFAULT_OPTIONS = {'cell': 8, 'level': 128, 'invert': False, 'sigma': 0.0, 'density': 0.0}
+
+# Every pattern takes the row indices of a band as a column and the column
+# indices as a row, and returns 8-bit levels that broadcast to the band.
+# Anything computed per pixel stays uint8; the index arithmetic is only
+# done along the two edges.
+
+def flat(y, x, width, height, options):
+    return np.full((1, 1), options['level'], dtype=np.uint8)
+
+def hramp(y, x, width, height, options):
+    return (x * 256 // width).astype(np.uint8)
+
+def vramp(y, x, width, height, options):
+    return (y * 256 // height).astype(np.uint8)
+
+def dramp(y, x, width, height, options):
+    # Row y is the diagonal ramp from y on, so every band is a strided view.
+    ramp = (np.arange(width + height - 1) * 256 // (width + height - 1)).astype(np.uint8)
+    return np.lib.stride_tricks.sliding_window_view(ramp, width)[y[0, 0]:y[-1, 0] + 1]
+
+def checker(y, x, width, height, options):
+    cell = options['cell']
+    return (((x // cell) & 1) * 255).astype(np.uint8) ^ (((y // cell) & 1) * 255).astype(np.uint8)
+
+def impulse(y, x, width, height, options):
+    # One 255 pixel in the middle of every cell x cell block.
+    cell = options['cell']
+    return ((x % cell == cell // 2) * 255).astype(np.uint8) & ((y % cell == cell // 2) * 255).astype(np.uint8)
+
+def zoneplate(y, x, width, height, options):
+    # cos(pi r^2 / R) about the frame center with R the longer side: the
+    # frequency grows linearly out from DC to Nyquist at r = R / 2. The
+    # phase of x^2 and y^2 is quantized separately and summed modulo 256.
+    radius = max(width, height)
+    phase_x = ((x - width // 2) ** 2 * (ZONE_STEPS // 2) // radius % ZONE_STEPS).astype(np.uint8)
+    phase_y = ((y - height // 2) ** 2 * (ZONE_STEPS // 2) // radius % ZONE_STEPS).astype(np.uint8)
+    return cv2.LUT(phase_x + phase_y, _ZONE_TABLE)
+
+def bars(y, x, width, height, options):
+    return COLOR_BARS[x[0] * len(COLOR_BARS) // width][None]
+
+PATTERNS = {
+    'flat': flat,
+    'hramp': hramp,
+    'vramp': vramp,
+    'dramp': dramp,
+    'checker': checker,
+    'impulse': impulse,
+    'zoneplate': zoneplate,
+    'bars': bars,
+}
+
+# The stimulus that drives each module to the ends of its arithmetic.
+WORST_CASES = {
+    # Windows that are all 255 reach the largest sums, and the cell edges
+    # step from 0 to 255 inside the window.
+    'mean3x3': ('checker', {'cell': 16}),
+    'mean7x7': ('checker', {'cell': 16}),
+    'mean9x9': ('checker', {'cell': 16}),
+    'gauss5x5': ('checker', {'cell': 16}),
+    'gauss9x9': ('checker', {'cell': 16}),
+    # Every neighbour opposite the center, so both signs saturate.
+    'laplacian3x3': ('checker', {'cell': 1}),
+    # Edges in both directions at every corner; emboss saturates everywhere.
+    'emboss': ('checker', {'cell': 2}),
+    'sobel': ('checker', {'cell': 2}),
+    'sobel_basic': ('checker', {'cell': 2}),
+    # Both impulse polarities close to half the window each, so the median
+    # lands on 0, 255 or the background from one pixel to the next.
+    'median3x3': ('flat', {'density': 0.9}),
+    'median7x7': ('flat', {'density': 0.9}),
+    'median9x9': ('flat', {'density': 0.9}),
+    # Strong edges under noise spread the range weights over their table.
+    'bilateral3x3': ('checker', {'cell': 8, 'sigma': 24.0}),
+    'bilateral5x5': ('checker', {'cell': 8, 'sigma': 24.0}),
+    'bilateral9x9': ('checker', {'cell': 8, 'sigma': 24.0}),
+    # The foreground is dark: one pixel holes for erosion to remove and one
+    # pixel dots for dilation to grow.
+    'erosion': ('impulse', {'cell': 3}),
+    'dilation': ('impulse', {'cell': 3, 'invert': True}),
+    # Neighbours within one level of the center, so most comparisons tie.
+    'census3x3': ('flat', {'sigma': 1.0}),
+    'census7x9': ('flat', {'sigma': 1.0}),
+    # Every level crosses the threshold once.
+    'threshold': ('hramp', {}),
+    'binarize': ('hramp', {}),
+    # Detail at every frequency up to Nyquist, where demosaicing aliases.
+    'bayer2rgb': ('zoneplate', {}),
+    'demosaic': ('zoneplate', {}),
+    # Saturated primaries and secondaries.
+    'rgb2gray': ('bars', {}),
+    'yuyv_to_rgb': ('bars', {}),
+    'yv12_to_rgb': ('bars', {}),
+    'yuv422p_to_rgb': ('bars', {}),
+}
+
+def _seed(seed, index):
+    return (seed * 1000003 + index) & 0x7FFFFFFF
+
+def add_noise(band, seed, index, sigma=0.0, density=0.0):
+    # Gaussian noise on every sample, then salt and pepper: each sample is
+    # set to 0 or 255 with probability density / 2. OpenCV's generator is
+    # reseeded for every band, so bands can be drawn in any order.
+    view = band.reshape(band.shape[0], -1)
+    cv2.setRNGSeed(_seed(seed, index))
+    if sigma:
+        noise = cv2.randn(np.empty(view.shape, dtype=np.int16), 0, sigma)
+        cv2.add(view, noise, dst=view, dtype=cv2.CV_8U)
+    if density:
+        draw = cv2.randu(np.empty(view.shape, dtype=np.uint16), 0, 65536)
+        edge = round(density * 32768)
+        cv2.min(view, cv2.compare(draw, edge, cv2.CMP_GE), dst=view)
+        cv2.max(view, cv2.compare(draw, 65536 - edge, cv2.CMP_GE), dst=view)
+
+def pattern_bands(name, width, height, rgb=False, seed=0, **options):
+    # Yields (first row, band) for the frame, BAND_ROWS rows at a time. The
+    # band is a buffer reused for the next one, so write it out before
+    # asking for more.
+    options = dict(DEFAULT_OPTIONS, **options)
+    if name not in PATTERNS:
+        raise ValueError(f"Unknown pattern: {name}, please choose from {', '.join(PATTERNS)}")
+    if options['cell'] < 1:
+        raise ValueError("The cell size must be at least 1")
+    if not 0 <= options['level'] <= 255:
+        raise ValueError("The flat level must be between 0 and 255")
+    if not 0 <= options['density'] <= 1:
+        raise ValueError("The salt-and-pepper density must be between 0 and 1")
+    generate = PATTERNS[name]
+    x = np.arange(width, dtype=np.int64)[None]
+    rows = min(BAND_ROWS, height)
+    buffer = np.empty((rows, width, 3) if rgb else (rows, width), dtype=np.uint8)
+    gray = np.empty((rows, width), dtype=np.uint8) if rgb else buffer
+    for index, start in enumerate(range(0, height, BAND_ROWS)):
+        band = buffer[:min(BAND_ROWS, height - start)]
+        y = np.arange(start, start + band.shape[0], dtype=np.int64)[:, None]
+        levels = generate(y, x, width, height, options)
+        if levels.ndim == 3:
+            np.copyto(band, levels if rgb else rgb_to_gray(levels))
+        elif rgb:
+            np.copyto(gray[:band.shape[0]], levels)
+            cv2.cvtColor(gray[:band.shape[0]], cv2.COLOR_GRAY2RGB, dst=band)
+        else:
+            np.copyto(band, levels)
+        if options['invert']:
+            np.invert(band, out=band)
+        if options['sigma'] or options['density']:
+            add_noise(band, seed, index, options['sigma'], options['density'])
+        yield start, band
+
+def output_format(path, layout=None):
+    # 'pgm', 'ppm', 'bayer' or a YUV layout, from --layout or the file name.
+    if layout:
+        return layout
+    ext = os.path.splitext(path)[1].lower()
+    if ext in ('.pgm', '.ppm'):
+        return ext[1:]
+    detected, _ = detect_layout(path)
+    if detected is None:
+        raise ValueError(f"Cannot tell the output format of {path}, use .pgm, .ppm, a raw name or --layout")
+    return detected
+
+def write_pattern(path, bands, fmt, width, height, ascii_pnm=False, pattern='BGGR', bit_depth=8, packing=None,
+                  matrix=None):
+    # Writes the bands as they come: PNM rasters and raw Bayer rows in order,
+    # planar YUV band by band into every plane of the frame.
+    with open(path, 'wb') as f:
+        if fmt in ('pgm', 'ppm'):
+            magic = ('P2' if ascii_pnm else 'P5') if fmt == 'pgm' else ('P3' if ascii_pnm else 'P6')
+            f.write(pnm.pnm_header(magic, width, height, 255))
+            for _, band in bands:
+                if not ascii_pnm:
+                    f.write(band)
+                else:
+                    f.write(pnm.format_ascii(band) if fmt == 'pgm' else pnm.format_ascii_rows(band))
+        elif fmt == 'bayer':
+            from jpg2bayer import encode_bayer, rgb_to_bayer
+            for _, band in bands:
+                f.write(encode_bayer(rgb_to_bayer(band, pattern), bit_depth, packing))
+        elif fmt in YUV_LAYOUTS:
+            import yuv
+            planes = plane_shapes(fmt, width, height)
+            f.truncate(sum(rows * cols for _, rows, cols in planes))
+            for start, band in bands:
+                data = yuv.encode_yuv(band[..., ::-1], fmt, matrix)
+                offset = used = 0
+                for (_, rows, cols), (_, band_rows, _) in zip(planes, plane_shapes(fmt, width, band.shape[0])):
+                    # Bands start on even rows, so subsampled planes take
+                    # their rows from start // 2.
+                    f.seek(offset + (start if rows == height else start // 2) * cols)
+                    f.write(data[used:used + band_rows * cols].tobytes())
+                    offset += rows * cols
+                    used += band_rows * cols
+        else:
+            raise ValueError(f"Unsupported output format: {fmt}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Write seeded synthetic test patterns at any size, band by band')
+    parser.add_argument('pattern', choices=list(PATTERNS) + ['worst'],
+                        help='Pattern to draw, or worst for the worst case of --module')
+    parser.add_argument('output', help='Output: .pgm, .ppm, raw Bayer (.raw, *_bggr) or YUV (.yuyv, *_yv12.yuv, ...)')
+    parser.add_argument('-s', '--size', type=parse_size, required=True, help='WIDTHxHEIGHT of the frame')
+    parser.add_argument('-m', '--module', choices=sorted(WORST_CASES), help='Module whose worst case to draw')
+    parser.add_argument('--cell', type=int, default=DEFAULT_OPTIONS['cell'],
+                        help=f"Checker and impulse grid cell in pixels (default: {DEFAULT_OPTIONS['cell']})")
+    parser.add_argument('--level', type=int, default=DEFAULT_OPTIONS['level'],
+                        help=f"Level of the flat pattern (default: {DEFAULT_OPTIONS['level']})")
+    parser.add_argument('--invert', action='store_true', help='Invert the pattern')
+    parser.add_argument('--sigma', type=float, default=0.0, help='Add Gaussian noise with this deviation')
+    parser.add_argument('--salt-pepper', type=float, default=0.0, dest='density',
+                        help='Set this fraction of the samples to 0 or 255')
+    parser.add_argument('--seed', type=int, default=0, help='Noise seed (default: 0)')
+    parser.add_argument('--ascii', action='store_true', help='Write P2/P3 instead of P5/P6, like the benches read')
+    parser.add_argument('--layout', choices=['bayer'] + YUV_LAYOUTS, help='Raw layout (default: from file name)')
+    parser.add_argument('-p', '--bayer-pattern', choices=BAYER_PATTERNS,
+                        help='Bayer pattern (default: from file name, else BGGR)')
+    parser.add_argument('--bit-depth', type=int, default=8, choices=BAYER_BIT_DEPTHS, help='Bayer sample depth')
+    parser.add_argument('--packing', choices=MIPI_PACKINGS, help='MIPI CSI-2 packing for Bayer output')
+    parser.add_argument('--matrix', choices=YUV_MATRICES, help='YUV conversion matrix (default: per layout)')
+    args = parser.parse_args()
+
+    name = args.pattern
+    options = {key: getattr(args, key) for key in DEFAULT_OPTIONS}
+    if name == 'worst':
+        if args.module is None:
+            parser.error('worst needs --module')
+        name, overrides = WORST_CASES[args.module]
+        options.update(overrides)
+    width, height = args.size
+
+    try:
+        fmt = output_format(args.output, args.layout)
+        bayer_pattern = args.bayer_pattern or detect_layout(args.output)[1] or 'BGGR'
+        start = time.perf_counter()
+        bands = pattern_bands(name, width, height, fmt != 'pgm', args.seed, **options)
+        write_pattern(args.output, bands, fmt, width, height, args.ascii, bayer_pattern, args.bit_depth,
+                      args.packing, args.matrix)
+        elapsed = time.perf_counter() - start
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    label = f"{name} (worst case for {args.module})" if args.pattern == 'worst' else name
+    print(f"{label} {width}x{height} {fmt} written to {args.output} in {elapsed * 1000:.1f} ms")
+
+if __name__ == "__main__":
+    main()
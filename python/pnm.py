@@ -0,0 +1,259 @@
+import os
+import numpy as np
+
+LINE_WIDTH = 70
+PARSE_CHUNK = 1 << 20
+
+PNM_MAGICS = ('P2', 'P3', 'P5', 'P6')
+
+# 0 = whitespace separator, 1 = decimal digit, 2 = anything else.
+_BYTE_KIND = np.full(256, 2, dtype=np.uint8)
+_BYTE_KIND[list(b' \t\n\v\f\r')] = 0
+_BYTE_KIND[list(b'0123456789')] = 1
+
+_token_tables = {}
+
+def _token_table(size):
+    # Row v holds the ASCII digits of v followed by a space; row `size` is a
+    # bare newline used as the end-of-row marker by format_ascii_rows. Rows
+    # are viewed as opaque void items so a gather copies whole tokens.
+    if size not in _token_tables:
+        values = np.arange(size, dtype=np.int64)
+        num_digits = len(str(size - 1))
+        lengths = np.ones(size, dtype=np.int64)
+        for d in range(1, num_digits):
+            lengths += values >= 10 ** d
+
+        row_bytes = -(-(num_digits + 1) // 4) * 4
+        table = np.full((size + 1, row_bytes), ord(' '), dtype=np.uint8)
+        rest = values.copy()
+        for col in range(num_digits - 1, -1, -1):
+            pos = lengths - (num_digits - col)
+            keep = pos >= 0
+            table[values[keep], pos[keep]] = ord('0') + rest[keep] % 10
+            rest //= 10
+        table[size, 0] = ord('\n')
+
+        token_lengths = np.append(lengths + 1, 1).astype(np.int32)
+        mask = np.arange(row_bytes) < token_lengths[:, None]
+        _token_tables[size] = (table.view(f'V{row_bytes}').ravel(),
+                               mask.view(f'V{row_bytes}').ravel(),
+                               token_lengths)
+    return _token_tables[size]
+
+def _table_for(values):
+    if values.size and values.min() < 0:
+        raise ValueError("PNM sample values must be non-negative")
+    max_val = int(values.max()) if values.size else 0
+    if max_val < 256:
+        return _token_table(256)
+    if max_val < 65536:
+        return _token_table(65536)
+    return _token_table(max_val + 1)
+
+def _gather_tokens(indices, tables):
+    tokens, masks, _ = tables
+    return tokens.take(indices).view(np.uint8)[masks.take(indices).view(np.bool_)]
+
+def format_ascii(values, line_width=LINE_WIDTH):
+    flat = np.asarray(values).ravel()
+    if flat.size == 0:
+        return b''
+    tables = _table_for(flat)
+    out = _gather_tokens(flat, tables)
+
+    # Greedy wrapping: a line holding tokens [i, j) is ends[j] - ends[i] - 1
+    # characters long, so each line ends at the last j that keeps it within
+    # line_width. Only the walk over line starts is done in Python.
+    ends = np.zeros(flat.size + 1, dtype=np.int64)
+    np.cumsum(tables[2].take(flat), out=ends[1:])
+    next_break = np.searchsorted(ends, ends[:-1] + line_width + 1, side='right') - 1
+    np.maximum(next_break, np.arange(1, flat.size + 1), out=next_break)
+
+    breaks = []
+    step = next_break.item
+    i = 0
+    while i < flat.size:
+        i = step(i)
+        breaks.append(i)
+    out[ends[breaks] - 1] = ord('\n')
+    return out.tobytes()
+
+def format_ascii_rows(rows):
+    rows = np.asarray(rows)
+    if rows.size == 0:
+        return b''
+    rows = rows.reshape(rows.shape[0], -1)
+    tables = _table_for(rows)
+    indices = np.empty((rows.shape[0], rows.shape[1] + 1), dtype=np.intp)
+    indices[:, :-1] = rows
+    indices[:, -1] = tables[0].size - 1
+    return _gather_tokens(indices.ravel(), tables).tobytes()
+
+def pnm_header(magic, width, height, max_val, comment=None):
+    lines = [magic]
+    if comment is not None:
+        lines.append(comment)
+    lines.append(f"{width} {height}")
+    lines.append(f"{max_val}")
+    return ("\n".join(lines) + "\n").encode('ascii')
+
+def encode_pgm(image, max_val=255, magic='P5', comment=None):
+    height, width = image.shape
+    header = pnm_header(magic, width, height, max_val, comment)
+    if magic == 'P2':
+        return header + format_ascii(image)
+    if magic == 'P5':
+        return header + image.astype(binary_dtype(max_val)).tobytes()
+    raise ValueError(f"Unsupported PGM format: {magic}")
+
+def encode_ppm(image, max_val=255, magic='P6', comment=None):
+    height, width, channels = image.shape
+    header = pnm_header(magic, width, height, max_val, comment)
+    if magic == 'P3':
+        return header + format_ascii_rows(image)
+    if magic == 'P6':
+        return header + image.astype(binary_dtype(max_val)).tobytes()
+    raise ValueError(f"Unsupported PPM format: {magic}")
+
+def write_pgm(file_path, image, max_val=255, magic='P5', comment=None):
+    with open(file_path, 'wb') as f:
+        f.write(encode_pgm(image, max_val, magic, comment))
+
+def write_ppm(file_path, image, max_val=255, magic='P6', comment=None):
+    with open(file_path, 'wb') as f:
+        f.write(encode_ppm(image, max_val, magic, comment))
+
+def parse_header(data):
+    # Returns (magic, width, height, max_val, data_offset). Comments may
+    # appear between any two header fields and run to the end of the line.
+    view = memoryview(data).cast('B')
+    fields = []
+    pos = 0
+    while len(fields) < 4:
+        while pos < len(view) and view[pos] in b' \t\r\n\v\f':
+            pos += 1
+        if pos >= len(view):
+            raise ValueError("Truncated PNM header")
+        if view[pos] == ord('#'):
+            while pos < len(view) and view[pos] != ord('\n'):
+                pos += 1
+            continue
+        start = pos
+        while pos < len(view) and view[pos] not in b' \t\r\n\v\f#':
+            pos += 1
+        fields.append(bytes(view[start:pos]).decode('ascii'))
+    view.release()
+
+    magic = fields[0]
+    if magic not in PNM_MAGICS:
+        raise ValueError(f"Unsupported PNM format: {magic}")
+    width, height, max_val = map(int, fields[1:])
+    # Exactly one whitespace byte separates the header from the raster.
+    return magic, width, height, max_val, pos + 1
+
+def _decode_digits(chunk):
+    kind = _BYTE_KIND.take(chunk)
+    if kind.max(initial=0) > 1:
+        bad = chunk[kind > 1][0]
+        raise ValueError(f"Invalid character in PNM raster: {chr(bad)!r}")
+
+    # flags[p + 1] tells whether chunk[p] is a digit; the separator padding
+    # on both sides keeps every digit run bounded. Each token is rebuilt from
+    # its last digit backwards, one decimal place per pass, so the loop runs
+    # once per digit of the widest sample.
+    flags = np.zeros(chunk.size + 2, dtype=np.bool_)
+    flags[1:-1] = kind.view(np.bool_)
+    ends = np.flatnonzero(flags[:-1] & ~flags[1:])
+
+    values = chunk.take(ends - 1).astype(np.int32)
+    values -= ord('0')
+    live = np.ones(ends.size, dtype=np.bool_)
+    scale = 10
+    before = ends - 1
+    while True:
+        live &= flags.take(before, mode='clip')
+        if not live.any():
+            return values
+        term = chunk.take(before - 1, mode='clip').astype(np.int32)
+        term -= ord('0')
+        term *= live
+        term *= scale
+        values += term
+        scale *= 10
+        before -= 1
+
+def parse_ascii(data, count=None, dtype=np.uint8, offset=0):
+    # Decodes whitespace separated decimal samples straight into a NumPy
+    # array. The input is processed in PARSE_CHUNK byte pieces cut at
+    # whitespace, so no per-sample Python objects are created and scratch
+    # memory is bounded by the chunk size rather than the raster size.
+    raw = np.frombuffer(data, dtype=np.uint8)[offset:]
+    capacity = count if count is not None else (raw.size + 1) // 2
+    out = np.empty(capacity, dtype=dtype)
+    extra = []
+    filled = 0
+
+    pos = 0
+    while pos < raw.size:
+        stop = min(pos + PARSE_CHUNK, raw.size)
+        if stop < raw.size:
+            # Never split a token: end the chunk on its last separator.
+            while stop > pos and ord('0') <= raw.item(stop - 1) <= ord('9'):
+                stop -= 1
+            if stop == pos:
+                stop = raw.size
+        values = _decode_digits(raw[pos:stop]).astype(dtype)
+        take = min(values.size, capacity - filled)
+        out[filled:filled + take] = values[:take]
+        filled += take
+        if take < values.size:
+            extra.append(values[take:])
+        pos = stop
+
+    if extra:
+        return np.concatenate([out] + extra)
+    return out[:filled]
+
+def _sample_dtype(max_val):
+    return np.uint16 if max_val > 255 else np.uint8
+
+def binary_dtype(max_val):
+    # P5/P6 rasters hold 16-bit samples most significant byte first.
+    return np.dtype('>u2') if max_val > 255 else np.dtype(np.uint8)
+
+def load_pnm(file_path):
+    # Returns (magic, width, height, max_val, samples) with samples as a flat
+    # array holding whatever the file contains, which may be short or long
+    # for partially written simulation dumps.
+    if os.path.getsize(file_path) == 0:
+        raise ValueError("Truncated PNM header")
+    return parse_pnm(np.memmap(file_path, dtype=np.uint8, mode='r'))
+
+def parse_pnm(data):
+    # load_pnm for bytes already in memory, e.g. read from a pipe.
+    raw = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray)) else data
+    if raw.size == 0:
+        raise ValueError("Truncated PNM header")
+    magic, width, height, max_val, offset = parse_header(raw)
+    channels = 3 if magic in ('P3', 'P6') else 1
+    dtype = _sample_dtype(max_val)
+    if magic in ('P2', 'P3'):
+        samples = parse_ascii(raw, width * height * channels, dtype, offset)
+    else:
+        body = raw[offset:]
+        usable = body.size - body.size % np.dtype(dtype).itemsize
+        samples = np.array(body[:usable]).view(binary_dtype(max_val)).astype(dtype, copy=False)
+    return magic, width, height, max_val, samples
+
+def read_pgm(file_path):
+    magic, width, height, max_val, samples = load_pnm(file_path)
+    if magic not in ('P2', 'P5'):
+        raise ValueError(f"Unsupported PGM format: {magic}")
+    return samples.reshape((height, width)), max_val, magic
+
+def read_ppm(file_path):
+    magic, width, height, max_val, samples = load_pnm(file_path)
+    if magic not in ('P3', 'P6'):
+        raise ValueError(f"Unsupported PPM format: {magic}")
+    return samples.reshape((height, width, 3)), max_val, magic
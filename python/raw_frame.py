@@ -0,0 +1,229 @@
+import argparse
+import os
+import re
+import numpy as np
+
+BAYER_PATTERNS = ['BGGR', 'GRBG', 'GBRG', 'RGGB']
+
+# Plane layout per format, as (name, rows, cols) in samples. 'h2'/'w2' are
+# the chroma dimensions rounded up, matching OpenCV's even-size requirement.
+RAW_LAYOUTS = {
+    'bayer':   [('raw', 'h', 'w')],
+    'yuyv':    [('packed', 'h', '2w')],
+    'uyvy':    [('packed', 'h', '2w')],
+    'yuv422p': [('y', 'h', 'w'), ('u', 'h', 'w2'), ('v', 'h', 'w2')],
+    'i422':    [('y', 'h', 'w'), ('u', 'h', 'w2'), ('v', 'h', 'w2')],
+    'yv12':    [('y', 'h', 'w'), ('v', 'h2', 'w2'), ('u', 'h2', 'w2')],
+    'i420':    [('y', 'h', 'w'), ('u', 'h2', 'w2'), ('v', 'h2', 'w2')],
+    'nv12':    [('y', 'h', 'w'), ('uv', 'h2', '2w2')],
+    'nv21':    [('y', 'h', 'w'), ('vu', 'h2', '2w2')],
+}
+
+_EXTENSION_LAYOUTS = {
+    '.yuyv': 'yuyv',
+    '.uyvy': 'uyvy',
+    '.yuv422p': 'yuv422p',
+    '.i422': 'i422',
+    '.yv12': 'yv12',
+    '.i420': 'i420',
+    '.nv12': 'nv12',
+    '.nv21': 'nv21',
+}
+
+def check_pattern(pattern):
+    pattern = pattern.upper()
+    if pattern not in BAYER_PATTERNS:
+        raise ValueError("Unsupported Bayer pattern, please choose 'BGGR', 'GRBG', 'GBRG' or 'RGGB'")
+    return pattern
+
+def sample_dtype(bit_depth):
+    if bit_depth <= 8:
+        return np.dtype(np.uint8)
+    if bit_depth <= 16:
+        return np.dtype('<u2')
+    raise ValueError(f"Unsupported bit depth: {bit_depth}")
+
+def parse_dimensions(file_path):
+    match = re.search(r'(\d+)x(\d+)', os.path.basename(file_path))
+    if match is None:
+        return None
+    return int(match.group(1)), int(match.group(2))
+
+def detect_layout(file_path):
+    name = os.path.basename(file_path).lower()
+    stem, ext = os.path.splitext(name)
+    if ext in _EXTENSION_LAYOUTS:
+        return _EXTENSION_LAYOUTS[ext], None
+    for layout in ['yv12', 'i420', 'nv12', 'nv21', 'yuv422p', 'i422', 'yuyv', 'uyvy']:
+        if re.search(rf'(^|_){layout}($|_)', stem):
+            return layout, None
+    for pattern in BAYER_PATTERNS:
+        if re.search(rf'(^|_){pattern.lower()}($|_)', stem):
+            return 'bayer', pattern
+    if ext == '.raw':
+        return 'bayer', None
+    return None, None
+
+def plane_shapes(layout, width, height):
+    if layout not in RAW_LAYOUTS:
+        raise ValueError(f"Unsupported raw layout: {layout}")
+    sizes = {
+        'h': height, 'w': width, '2w': 2 * width,
+        'h2': (height + 1) // 2, 'w2': (width + 1) // 2, '2w2': 2 * ((width + 1) // 2),
+    }
+    return [(name, sizes[rows], sizes[cols]) for name, rows, cols in RAW_LAYOUTS[layout]]
+
+def frame_samples(layout, width, height):
+    return sum(rows * cols for _, rows, cols in plane_shapes(layout, width, height))
+
+def plane_views(data, layout, width, height):
+    # Splits a flat frame buffer into its stored planes without copying.
+    planes = {}
+    start = 0
+    for name, rows, cols in plane_shapes(layout, width, height):
+        planes[name] = data[start:start + rows * cols].reshape(rows, cols)
+        start += rows * cols
+    return planes
+
+def yuv_views(planes, layout):
+    # Adds y/u/v views for the packed and semi-planar layouts.
+    planes = dict(planes)
+    if layout == 'yuyv':
+        packed = planes['packed']
+        planes.update(y=packed[:, 0::2], u=packed[:, 1::4], v=packed[:, 3::4])
+    elif layout == 'uyvy':
+        packed = planes['packed']
+        planes.update(y=packed[:, 1::2], u=packed[:, 0::4], v=packed[:, 2::4])
+    elif layout == 'nv12':
+        planes.update(u=planes['uv'][:, 0::2], v=planes['uv'][:, 1::2])
+    elif layout == 'nv21':
+        planes.update(v=planes['vu'][:, 0::2], u=planes['vu'][:, 1::2])
+    return planes
+
+class RawFrame:
+    def __init__(self, file_path, layout=None, width=None, height=None, pattern=None,
+                 bit_depth=8, frame=0):
+        detected_layout, detected_pattern = detect_layout(file_path)
+        self.layout = (layout or detected_layout or '').lower()
+        if self.layout not in RAW_LAYOUTS:
+            raise ValueError(f"Cannot determine raw layout for {file_path}, please specify one")
+
+        self.pattern = (pattern or detected_pattern or 'BGGR').upper()
+        if self.layout == 'bayer':
+            check_pattern(self.pattern)
+
+        self.bit_depth = bit_depth
+        self.dtype = sample_dtype(bit_depth)
+        file_size = os.path.getsize(file_path)
+
+        if width is None or height is None:
+            dims = parse_dimensions(file_path)
+            if dims is not None:
+                width = width or dims[0]
+                height = height or dims[1]
+        if width is not None and height is None:
+            # Only single-plane layouts can recover the height from the size.
+            row_bytes = frame_samples(self.layout, width, 1) * self.dtype.itemsize
+            if len(RAW_LAYOUTS[self.layout]) == 1 and file_size % row_bytes == 0:
+                height = file_size // row_bytes
+        if width is None or height is None:
+            raise ValueError(f"Cannot determine frame size for {file_path}, please specify width and height")
+
+        self.file_path = file_path
+        self.width = width
+        self.height = height
+        self.frame_bytes = frame_samples(self.layout, width, height) * self.dtype.itemsize
+        self.frame_count = file_size // self.frame_bytes
+        if not 0 <= frame < self.frame_count:
+            raise IndexError(f"Frame {frame} out of range, file holds {self.frame_count} frame(s)")
+        self.frame = frame
+
+        self.data = np.memmap(file_path, dtype=self.dtype, mode='r',
+                              offset=frame * self.frame_bytes,
+                              shape=(self.frame_bytes // self.dtype.itemsize,))
+        self._planes = plane_views(self.data, self.layout, width, height)
+
+    def __repr__(self):
+        return (f"RawFrame({self.file_path!r}, layout={self.layout!r}, {self.width}x{self.height}, "
+                f"bit_depth={self.bit_depth}, frame={self.frame}/{self.frame_count})")
+
+    def __getitem__(self, name):
+        return self.planes()[name]
+
+    def planes(self):
+        # Every entry is a strided view into the memory map; nothing is copied.
+        planes = dict(self._planes)
+        if self.layout == 'bayer':
+            raw = planes['raw']
+            offsets = {'R': None, 'B': None}
+            greens = []
+            for index, color in enumerate(self.pattern):
+                row, col = divmod(index, 2)
+                if color == 'G':
+                    greens.append((row, col))
+                else:
+                    offsets[color] = (row, col)
+            offsets['Gr'], offsets['Gb'] = (greens if greens[0][0] == offsets['R'][0]
+                                           else greens[::-1])
+            for color, (row, col) in offsets.items():
+                planes[color] = raw[row::2, col::2]
+        else:
+            planes = yuv_views(planes, self.layout)
+        return planes
+
+    def frames(self):
+        for index in range(self.frame_count):
+            yield RawFrame(self.file_path, self.layout, self.width, self.height,
+                           self.pattern, self.bit_depth, index)
+
+def compare_frames(frame_a, frame_b, rows_per_chunk=256):
+    # Walks the planes in row bands so only a band of each file is paged in
+    # at a time. Returns {plane: (max_abs_diff, mismatch_count)}.
+    planes_a = frame_a._planes
+    planes_b = frame_b._planes
+    if list(planes_a) != list(planes_b):
+        raise ValueError("Frames use different raw layouts")
+    results = {}
+    for name, plane_a in planes_a.items():
+        plane_b = planes_b[name]
+        if plane_a.shape != plane_b.shape:
+            raise ValueError(f"Plane {name} shape mismatch: {plane_a.shape} vs {plane_b.shape}")
+        max_diff = 0
+        mismatches = 0
+        for row in range(0, plane_a.shape[0], rows_per_chunk):
+            band_a = plane_a[row:row + rows_per_chunk].astype(np.int32)
+            band_b = plane_b[row:row + rows_per_chunk].astype(np.int32)
+            diff = np.abs(band_a - band_b)
+            if diff.size:
+                max_diff = max(max_diff, int(diff.max()))
+            mismatches += int(np.count_nonzero(diff))
+        results[name] = (max_diff, mismatches)
+    return results
+
+def main():
+    parser = argparse.ArgumentParser(description='Inspect or compare raw Bayer/YUV frame dumps')
+    parser.add_argument('input', help='Raw file (size inferred from a WxH pattern in the name)')
+    parser.add_argument('-c', '--compare', help='Second raw file to compare against')
+    parser.add_argument('-l', '--layout', choices=sorted(RAW_LAYOUTS), help='Raw layout (default: from file name)')
+    parser.add_argument('-W', '--width', type=int, help='Frame width')
+    parser.add_argument('-H', '--height', type=int, help='Frame height')
+    parser.add_argument('-p', '--pattern', choices=BAYER_PATTERNS, help='Bayer pattern (default: from file name)')
+    parser.add_argument('-b', '--bit-depth', type=int, default=8, help='Bits per sample (default: 8)')
+    args = parser.parse_args()
+
+    frame_a = RawFrame(args.input, args.layout, args.width, args.height, args.pattern, args.bit_depth)
+    print(frame_a)
+    for name, plane in frame_a.planes().items():
+        print(f"  {name}: {plane.shape[1]} x {plane.shape[0]}")
+
+    if args.compare:
+        frame_b = RawFrame(args.compare, frame_a.layout, frame_a.width, frame_a.height,
+                           frame_a.pattern, frame_a.bit_depth)
+        if frame_b.frame_count != frame_a.frame_count:
+            print(f"Warning: frame count mismatch ({frame_a.frame_count} vs {frame_b.frame_count})")
+        for index, (frame, other) in enumerate(zip(frame_a.frames(), frame_b.frames())):
+            for name, (max_diff, mismatches) in compare_frames(frame, other).items():
+                print(f"Frame {index} plane {name}: max abs diff {max_diff}, mismatches {mismatches}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,255 @@
+import argparse
+import os
+import sys
+import cv2
+import numpy as np
+import conversion_cache
+import hexmem
+import pnm
+from golden.remap import FRAC, MAP_BITS, remap
+from fpga_image import parse_size
+from raw_frame import parse_dimensions
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_INTRINSICS = os.path.join(ROOT, 'data', 'left_intrinsics.yml')
+DEFAULT_IMAGE = os.path.join(ROOT, 'data', 'left01.pgm')
+# tb_remap.v streams this map when it exists, and computes its own otherwise.
+BENCH_MAP = os.path.join(ROOT, 'output', 'remap_left01.hex')
+BENCH_OUTPUT = os.path.join(ROOT, 'output', 'out_remap_left01.pgm')
+
+# hex: one {map_y, map_x} word per output pixel for $readmemh.
+# bin: map_x, map_y as little-endian 32-bit words per output pixel.
+MAP_FORMATS = ['hex', 'bin']
+
+def load_intrinsics(yaml_path):
+    # OpenCV calibration output: camera_matrix, distortion_coefficients and
+    # the image size, plus rectification_matrix/projection_matrix when they
+    # are present (stereo calibration).
+    storage = cv2.FileStorage(yaml_path, cv2.FILE_STORAGE_READ)
+    if not storage.isOpened():
+        raise ValueError(f"Cannot read intrinsics {yaml_path}")
+    try:
+        camera_matrix = storage.getNode('camera_matrix').mat()
+        dist_coeffs = storage.getNode('distortion_coefficients').mat()
+        if camera_matrix is None or dist_coeffs is None:
+            raise ValueError(f"{yaml_path} has no camera_matrix/distortion_coefficients")
+        intrinsics = {
+            'camera_matrix': camera_matrix,
+            'dist_coeffs': dist_coeffs.ravel(),
+            'size': (int(storage.getNode('image_width').real()), int(storage.getNode('image_height').real())),
+        }
+        for key in ('rectification_matrix', 'projection_matrix'):
+            node = storage.getNode(key)
+            intrinsics[key] = None if node.empty() else node.mat()
+    finally:
+        storage.release()
+    return intrinsics
+
+def _distortion(dist_coeffs):
+    coeffs = np.ravel(dist_coeffs).astype(np.float64)
+    if coeffs.size not in (4, 5, 8):
+        raise ValueError(f"Expected 4, 5 or 8 distortion coefficients, got {coeffs.size}")
+    k = np.zeros(8)
+    k[:coeffs.size] = coeffs
+    return k
+
+def undistort_maps(camera_matrix, dist_coeffs, size, rectification=None, new_camera_matrix=None):
+    # Source coordinate of every output pixel, as cv2.initUndistortRectifyMap
+    # computes it: the pixel is back-projected through the new camera and
+    # the rectification, distorted and projected with the original camera.
+    # Rows and columns are separable up to the division, so the grid is
+    # built from one row and one column vector.
+    width, height = size
+    k1, k2, p1, p2, k3, k4, k5, k6 = _distortion(dist_coeffs)
+    camera_matrix = np.asarray(camera_matrix, dtype=np.float64)
+    new_camera_matrix = camera_matrix if new_camera_matrix is None else np.asarray(new_camera_matrix)[:, :3]
+    rectification = np.eye(3) if rectification is None else np.asarray(rectification, dtype=np.float64)
+    inverse = np.linalg.inv(new_camera_matrix @ rectification)
+
+    cols = np.arange(width, dtype=np.float64)
+    rows = np.arange(height, dtype=np.float64)[:, None]
+    w = inverse[2, 0] * cols + (inverse[2, 1] * rows + inverse[2, 2])
+    x = (inverse[0, 0] * cols + (inverse[0, 1] * rows + inverse[0, 2])) / w
+    y = (inverse[1, 0] * cols + (inverse[1, 1] * rows + inverse[1, 2])) / w
+
+    x2, y2, xy2 = x * x, y * y, 2 * x * y
+    r2 = x2 + y2
+    radial = (1 + r2 * (k1 + r2 * (k2 + r2 * k3))) / (1 + r2 * (k4 + r2 * (k5 + r2 * k6)))
+    xd = x * radial + p1 * xy2 + p2 * (r2 + 2 * x2)
+    yd = y * radial + p1 * (r2 + 2 * y2) + p2 * xy2
+
+    fx, fy = camera_matrix[0, 0], camera_matrix[1, 1]
+    cx, cy = camera_matrix[0, 2], camera_matrix[1, 2]
+    return fx * xd + cx, fy * yd + cy
+
+def bench_maps(camera_matrix, dist_coeffs, size, frac=FRAC, iterations=5):
+    # The words tb_remap.v computes itself when no map file is present: the
+    # output pixel is undistorted by fixed-point iteration and the result is
+    # rounded with $rtoi(u * 2**frac + 0.5), which truncates toward zero, and
+    # wrapped to the 24-bit port. Operations follow the bench's order so the
+    # doubles match.
+    width, height = size
+    k1, k2, p1, p2, k3 = _distortion(dist_coeffs)[:5]
+    fx, fy = camera_matrix[0, 0], camera_matrix[1, 1]
+    cx, cy = camera_matrix[0, 2], camera_matrix[1, 2]
+    x = np.broadcast_to((np.arange(width) - cx) / fx, (height, width))
+    y = np.broadcast_to(((np.arange(height) - cy) / fy)[:, None], (height, width))
+    x0, y0 = x, y
+    for _ in range(iterations):
+        r2 = x0 * x0 + y0 * y0
+        radial = 1.0 + k1 * r2 + k2 * r2 * r2 + k3 * r2 * r2 * r2
+        dx = 2.0 * p1 * x0 * y0 + p2 * (r2 + 2.0 * x0 * x0)
+        dy = p1 * (r2 + 2.0 * y0 * y0) + 2.0 * p2 * x0 * y0
+        x0 = (x - dx) / radial
+        y0 = (y - dy) / radial
+    mask = (1 << MAP_BITS) - 1
+    scale = float(1 << frac)
+    map_x = np.trunc((x0 * fx + cx) * scale + 0.5).astype(np.int64) & mask
+    map_y = np.trunc((y0 * fy + cy) * scale + 0.5).astype(np.int64) & mask
+    return map_x, map_y
+
+def quantize_map(coords, frac=FRAC, bits=MAP_BITS):
+    # Rounds to the nearest 1/2**frac. remap.v reads the words as unsigned,
+    # so coordinates left of or above the frame saturate to 0 instead of
+    # wrapping to the far edge.
+    scaled = np.floor(np.asarray(coords) * (1 << frac) + 0.5)
+    return np.clip(scaled, 0, (1 << bits) - 1).astype(np.uint32)
+
+def frame_maps(intrinsics, size=None, alpha=None, frac=FRAC):
+    # Quantized maps for the calibration, rescaled when size differs from
+    # the calibrated resolution.
+    camera_matrix = intrinsics['camera_matrix'].astype(np.float64)
+    calibrated = intrinsics['size']
+    size = size or calibrated
+    if size != calibrated:
+        scale = np.diag([size[0] / calibrated[0], size[1] / calibrated[1], 1.0])
+        camera_matrix = scale @ camera_matrix
+    new_camera_matrix = intrinsics.get('projection_matrix')
+    if alpha is not None:
+        new_camera_matrix, _ = cv2.getOptimalNewCameraMatrix(camera_matrix, intrinsics['dist_coeffs'], size, alpha)
+    elif new_camera_matrix is not None and size != calibrated:
+        new_camera_matrix = scale @ new_camera_matrix[:, :3]
+    map_x, map_y = undistort_maps(camera_matrix, intrinsics['dist_coeffs'], size,
+                                  intrinsics.get('rectification_matrix'), new_camera_matrix)
+    return quantize_map(map_x, frac), quantize_map(map_y, frac)
+
+def write_maps(path, map_x, map_y, map_format='hex', frac=FRAC):
+    height, width = map_x.shape
+    if map_format == 'hex':
+        words = (map_y.astype(np.uint64) << np.uint64(MAP_BITS)) | map_x.astype(np.uint64)
+        hexmem.write_memory(path, words, 2 * MAP_BITS, 16,
+                            {'format': 'remap', 'width': width, 'height': height, 'words': words.size,
+                             'word_bits': 2 * MAP_BITS, 'frac': frac})
+    elif map_format == 'bin':
+        pairs = np.empty((height, width, 2), dtype='<u4')
+        pairs[..., 0] = map_x
+        pairs[..., 1] = map_y
+        pairs.tofile(path)
+    else:
+        raise ValueError(f"Unsupported map format: {map_format}, please choose one of {MAP_FORMATS}")
+
+def read_maps(path, size=None):
+    # (map_x, map_y) from a hex or binary map stream. Hex files carry their
+    # size; binary ones need it given or as WxH in the file name.
+    if path.endswith('.hex'):
+        words, header, _ = hexmem.read_memory(path)
+        width, height = size or (header.get('width'), header.get('height'))
+        map_x, map_y = words & ((1 << MAP_BITS) - 1), words >> MAP_BITS
+    else:
+        width, height = size or parse_dimensions(path) or (None, None)
+        pairs = np.fromfile(path, dtype='<u4')
+        map_x, map_y = pairs[0::2].astype(np.int64), pairs[1::2].astype(np.int64)
+    if width is None or height is None:
+        raise ValueError(f"Cannot determine map size for {path}, please specify it")
+    if map_x.size != width * height:
+        raise ValueError(f"{path} holds {map_x.size} map words, expected {width * height}")
+    return map_x.reshape(height, width), map_y.reshape(height, width)
+
+def generate_maps(yaml_path, map_path, size=None, map_format='hex', alpha=None, frac=FRAC):
+    try:
+        map_x, map_y = frame_maps(load_intrinsics(yaml_path), size, alpha, frac)
+        write_maps(map_path, map_x, map_y, map_format, frac)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        return False
+    print(f"Remap LUT saved to {map_path} ({map_x.shape[1]}x{map_x.shape[0]}, {MAP_BITS}-bit words, FRAC={frac})")
+    return True
+
+def read_bench_image(path):
+    # 8-bit samples as tb_remap.v loads them.
+    image, max_val, _ = pnm.read_pgm(path)
+    if max_val != 255:
+        image = np.clip(image.astype(np.int64) * 255 // max_val, 0, 255).astype(np.uint8)
+    return image
+
+def bench_input_maps(map_path, yaml_path, size):
+    if map_path and os.path.exists(map_path):
+        return read_maps(map_path, size)
+    intrinsics = load_intrinsics(yaml_path)
+    return bench_maps(intrinsics['camera_matrix'], intrinsics['dist_coeffs'], size or intrinsics['size'])
+
+def main():
+    parser = argparse.ArgumentParser(description='Generate remap.v coordinate streams from camera intrinsics')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    generate = subparsers.add_parser('generate', help='Write undistortion/rectification maps')
+    generate.add_argument('output', nargs='?', default=BENCH_MAP,
+                          help='Map file (default: output/remap_left01.hex, which tb_remap.v loads)')
+    generate.add_argument('-i', '--intrinsics', default=DEFAULT_INTRINSICS,
+                          help='OpenCV calibration YAML (default: data/left_intrinsics.yml)')
+    generate.add_argument('-s', '--size', type=parse_size, help='Output WIDTHxHEIGHT (default: calibrated size)')
+    generate.add_argument('-f', '--format', choices=MAP_FORMATS, help='Map format (default: from extension, hex)')
+    generate.add_argument('--alpha', type=float,
+                          help='Rescale the output camera: 0 keeps only valid pixels, 1 keeps every source pixel')
+
+    for name, help_text in (('model', 'Write the remap.v output expected for an image and map'),
+                            ('check', 'Compare the tb_remap.v dump against the golden model')):
+        command = subparsers.add_parser(name, help=help_text)
+        command.add_argument('--image', default=DEFAULT_IMAGE, help='Source PGM (default: data/left01.pgm)')
+        command.add_argument('--map', default=BENCH_MAP,
+                             help="Map file; when missing, the bench's own computed map (default: output/remap_left01.hex)")
+        command.add_argument('-i', '--intrinsics', default=DEFAULT_INTRINSICS,
+                             help='Calibration for the computed bench map (default: data/left_intrinsics.yml)')
+        command.add_argument('-s', '--size', type=parse_size, help='WIDTHxHEIGHT of a binary map')
+    subparsers.choices['model'].add_argument('output', help='Expected output PGM (written as P2)')
+    subparsers.choices['check'].add_argument('--dump', default=BENCH_OUTPUT,
+                                             help='Bench output (default: output/out_remap_left01.pgm)')
+    args = parser.parse_args()
+
+    if args.command == 'generate':
+        map_format = args.format or ('bin' if args.output.endswith('.bin') else 'hex')
+        params = {'size': args.size, 'format': map_format, 'alpha': args.alpha, 'frac': FRAC}
+        if not conversion_cache.cached_convert(generate_maps, args.intrinsics, args.output, params, args.size,
+                                               map_format, args.alpha):
+            sys.exit(1)
+        return
+
+    try:
+        image = read_bench_image(args.image)
+        map_x, map_y = bench_input_maps(args.map, args.intrinsics, args.size)
+    except (OSError, ValueError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    source = args.map if os.path.exists(args.map) else 'the bench-computed map'
+    expected = remap(image, map_x, map_y)
+    if args.command == 'model':
+        pnm.write_pgm(args.output, expected, 255, 'P2')
+        print(f"Expected remap output for {source} saved to {args.output}")
+        return
+
+    if not os.path.exists(args.dump):
+        print(f"FAIL: no dump at {args.dump}")
+        sys.exit(1)
+    dump, _, _ = pnm.read_pgm(args.dump)
+    if dump.shape != expected.shape:
+        print(f"FAIL: dump is {dump.shape[1]}x{dump.shape[0]}, expected {expected.shape[1]}x{expected.shape[0]}")
+        sys.exit(1)
+    diff = np.abs(dump.astype(np.int32) - expected)
+    mismatches = int(np.count_nonzero(diff))
+    print(f"remap ({source}): {'PASS' if mismatches == 0 else 'FAIL'}, {mismatches}/{diff.size} pixels differ, "
+          f"max abs diff {int(diff.max())}")
+    if mismatches:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
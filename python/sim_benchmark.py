@@ -0,0 +1,357 @@
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import re
+import subprocess
+import sys
+import time
+import cv2
+import hexmem
+import pnm
+import tb_regression
+from conversion_cache import cached_convert
+from fpga_image import parse_size
+from image_resize import resize_image, resize_params
+
+ROOT = tb_regression.ROOT
+DEFAULT_INPUT = os.path.join(ROOT, 'data', 'gray1.pgm')
+DEFAULT_HISTORY = os.path.join(ROOT, 'output', 'benchmark_history.json')
+DEFAULT_WORK = os.path.join(ROOT, '.sim_cache', 'benchmark')
+DEFAULT_SIZES = ['160x120', '320x240', '640x480']
+HISTORY_VERSION = 1
+
+# Port names of each streaming module. The generated harness feeds one pixel
+# per valid cycle and times the output valid; every other port is left open.
+BENCHMARKS = {
+    'mean9x9': {'valid_in': 'gray_valid', 'data_in': 'gray', 'valid_out': 'mean_valid',
+                'reset': 'rst', 'params': 'IMAGE_WIDTH={width}'},
+    'census7x9': {'valid_in': 'gray_valid', 'data_in': 'gray', 'valid_out': 'census_valid',
+                  'reset': 'rst', 'params': 'IMAGE_WIDTH={width}'},
+    'bilateral9x9': {'valid_in': 'gray_valid', 'data_in': 'gray', 'valid_out': 'bilat_valid',
+                     'reset': 'rst', 'params': 'IMAGE_WIDTH={width}'},
+    'harris_corner_fixed': {'valid_in': 'data_valid', 'data_in': 'pixel_in', 'valid_out': 'data_out_valid',
+                            'reset': 'rst_n', 'active_low': True,
+                            'params': 'IMAGE_WIDTH={width},IMAGE_HEIGHT={height}'},
+}
+
+# Metrics compared against the previous run. The cycle counts come from the
+# RTL and should not move at all; wall time gets its own tolerance.
+CYCLE_METRICS = ('cycles_per_pixel', 'latency_cycles')
+TIME_METRICS = ('wall_time',)
+# Wall-time changes smaller than this are timer noise on small frames.
+TIME_FLOOR = 0.1
+
+HARNESS = """`timescale 1ns / 1ps
+// Generated by sim_benchmark.py
+module {top};
+    localparam PIXELS = {pixels};
+    localparam GAP = {gap};
+    localparam DRAIN = {drain};
+
+    reg clk = 0;
+    reg rst = 1;
+    reg valid_in = 0;
+    reg [7:0] data_in = 0;
+    wire valid_out;
+    reg [7:0] image [0:PIXELS-1];
+
+    {module} #({params}) dut (
+        .clk(clk),
+        .{reset}({reset_value}),
+        .{valid_in}(valid_in),
+        .{data_in}(data_in),
+        .{valid_out}(valid_out)
+    );
+
+    always #5 clk = ~clk;
+
+    integer cycle = 0;
+    integer first_in = -1;
+    integer last_in = -1;
+    integer first_out = -1;
+    integer last_out = -1;
+    integer outputs = 0;
+    integer i;
+    reg input_done = 0;
+
+    // The window filters hold their valid high once the input stops, so
+    // outputs only count until the last pixel has had the first pixel's
+    // latency to come out.
+    wire counting = !input_done || first_out < 0 || cycle <= last_in + first_out - first_in;
+
+    always @(posedge clk) begin
+        cycle <= cycle + 1;
+        if (valid_in && first_in < 0) first_in <= cycle;
+        if (valid_in) last_in <= cycle;
+        if (valid_out && counting) begin
+            if (first_out < 0) first_out <= cycle;
+            last_out <= cycle;
+            outputs <= outputs + 1;
+        end
+    end
+
+    initial begin
+        $readmemh("{stimulus}", image);
+        repeat (10) @(posedge clk);
+        rst <= 0;
+        @(posedge clk);
+        for (i = 0; i < PIXELS; i = i + 1) begin
+            valid_in <= 1;
+            data_in <= image[i];
+            @(posedge clk);
+            if (GAP > 0) begin
+                valid_in <= 0;
+                repeat (GAP) @(posedge clk);
+            end
+        end
+        valid_in <= 0;
+        input_done <= 1;
+        i = 0;
+        while ((first_out < 0 || counting) && i < DRAIN) begin
+            @(posedge clk);
+            i = i + 1;
+        end
+        $display("BENCH pixels=%0d outputs=%0d first_in=%0d last_in=%0d first_out=%0d last_out=%0d cycles=%0d",
+                 PIXELS, outputs, first_in, last_in, first_out, last_out, cycle);
+        $finish;
+    end
+endmodule
+"""
+
+_result = re.compile(r'^BENCH (.*)$', re.M)
+
+def prepare_stimulus(input_path, work_dir, width, height):
+    # Resizes the source through image_resize (and the conversion cache),
+    # then writes it as a $readmemh image.
+    os.makedirs(work_dir, exist_ok=True)
+    pgm_path = os.path.join(work_dir, f"input_{width}x{height}.pgm")
+    hex_path = os.path.join(work_dir, f"input_{width}x{height}.hex")
+    log = io.StringIO()
+    with contextlib.redirect_stdout(log):
+        ok = cached_convert(resize_image, input_path, pgm_path,
+                            resize_params(width, height, 1.0, cv2.INTER_LINEAR),
+                            width, height, 1.0, cv2.INTER_LINEAR)
+    if ok is False or not os.path.exists(pgm_path):
+        print(log.getvalue(), end='')
+        return None
+    image = pnm.read_pgm(pgm_path)[0]
+    hexmem.write_memory(hex_path, image, 8, fields={'format': 'gray', 'width': width, 'height': height})
+    return hex_path
+
+def write_harness(path, module, spec, width, height, stimulus, gap):
+    top = 'bench_' + module
+    text = HARNESS.format(
+        top=top, module=module, pixels=width * height, gap=gap,
+        # Give up on the first output after another frame's worth of cycles.
+        drain=(gap + 1) * width * height + 1000,
+        params=', '.join(f".{name}({value})" for name, value in
+                         (item.split('=') for item in spec['params'].format(width=width, height=height).split(','))),
+        reset=spec['reset'], reset_value='~rst' if spec.get('active_low') else 'rst',
+        valid_in=spec['valid_in'], data_in=spec['data_in'], valid_out=spec['valid_out'],
+        stimulus=stimulus.replace('\\', '/'))
+    with open(path, 'w') as f:
+        f.write(text)
+    return top
+
+def benchmark_module(module, width, height, stimulus, work_dir, simulator='iverilog', gap=0, repeat=1,
+                     timeout=3600, compile_cmd=None, run_cmd=None):
+    spec = BENCHMARKS[module]
+    default_compile, default_run = tb_regression.SIMULATORS[simulator]
+    compile_cmd = compile_cmd or default_compile
+    run_cmd = run_cmd or default_run
+    modules, _ = tb_regression.scan_sources(ROOT)
+    record = {'module': module, 'width': width, 'height': height, 'gap': gap}
+    if module not in modules:
+        record['error'] = f"module {module} not found"
+        return record
+
+    build_dir = os.path.join(work_dir, f"{module}_{width}x{height}_gap{gap}_{simulator}")
+    os.makedirs(build_dir, exist_ok=True)
+    harness = os.path.join(build_dir, 'bench.v')
+    top = write_harness(harness, module, spec, width, height, stimulus, gap)
+    sources = tb_regression.dependencies(harness, modules)
+    output = os.path.join(build_dir, top)
+    fields = {'top': top, 'output': output, 'build_dir': build_dir}
+
+    # Rebuild only when the harness, the RTL or the command changed.
+    key = tb_regression.build_key(compile_cmd, sources)
+    key_path = os.path.join(build_dir, 'build.key')
+    cached = False
+    if os.path.exists(output) and os.path.exists(key_path):
+        with open(key_path) as f:
+            cached = f.read() == key
+    record['compile_time'] = 0.0
+    if not cached:
+        returncode, text, elapsed, timed_out = tb_regression.execute(
+            tb_regression.expand(compile_cmd, sources, **fields), ROOT, timeout)
+        record['compile_time'] = elapsed
+        if returncode != 0 or not os.path.exists(output):
+            record['error'] = 'compile timeout' if timed_out else 'compile error: ' + tb_regression.log_tail(text)
+            return record
+        with open(key_path, 'w') as f:
+            f.write(key)
+
+    times = []
+    for _ in range(max(1, repeat)):
+        returncode, text, elapsed, timed_out = tb_regression.execute(
+            tb_regression.expand(run_cmd, sources, **fields), ROOT, timeout)
+        match = _result.search(text)
+        if timed_out or returncode != 0 or match is None:
+            record['error'] = 'run timeout' if timed_out else 'run failed: ' + tb_regression.log_tail(text)
+            return record
+        times.append(elapsed)
+
+    counts = {key: int(value) for key, value in re.findall(r'(\w+)=(-?\d+)', match.group(1))}
+    record.update(counts)
+    record['wall_time'] = min(times)
+    if counts['outputs'] > 0:
+        record['cycles_per_pixel'] = (counts['last_out'] - counts['first_in'] + 1) / counts['outputs']
+        record['latency_cycles'] = counts['first_out'] - counts['first_in']
+        record['pixels_per_second'] = width * height / record['wall_time']
+    else:
+        record['cycles_per_pixel'] = record['latency_cycles'] = None
+    return record
+
+def git_revision(root=ROOT):
+    try:
+        result = subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=root, capture_output=True,
+                                text=True, timeout=10)
+    except (OSError, subprocess.TimeoutExpired):
+        return None
+    if result.returncode != 0:
+        return None
+    revision = result.stdout.strip()
+    dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=root,
+                           capture_output=True, text=True).stdout.strip()
+    return revision + ('-dirty' if dirty else '')
+
+def load_history(path):
+    if not os.path.exists(path):
+        return {'version': HISTORY_VERSION, 'runs': []}
+    with open(path) as f:
+        history = json.load(f)
+    if history.get('version') != HISTORY_VERSION:
+        raise ValueError(f"Unsupported benchmark history version {history.get('version')} in {path}")
+    return history
+
+def save_history(path, history):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp_path = path + '.tmp'
+    with open(tmp_path, 'w') as f:
+        json.dump(history, f, indent=2)
+    os.replace(tmp_path, path)
+
+def _result_key(result):
+    return result['module'], result['width'], result['height'], result.get('gap', 0)
+
+def find_regressions(run, history, tolerance=0.0, time_tolerance=0.25):
+    # Compares every result with the latest earlier run on the same simulator
+    # that measured the same module, size and gap.
+    regressions = []
+    for result in run['results']:
+        if 'error' in result:
+            continue
+        for previous_run in reversed(history['runs']):
+            if previous_run['simulator'] != run['simulator']:
+                continue
+            previous = next((item for item in previous_run['results']
+                             if _result_key(item) == _result_key(result) and 'error' not in item), None)
+            if previous is None:
+                continue
+            for metric in CYCLE_METRICS + TIME_METRICS:
+                old, new = previous.get(metric), result.get(metric)
+                if old is None or new is None:
+                    continue
+                limit = time_tolerance if metric in TIME_METRICS else tolerance
+                if new > old * (1 + limit) and (metric not in TIME_METRICS or new - old > TIME_FLOOR):
+                    regressions.append({'module': result['module'], 'width': result['width'],
+                                        'height': result['height'], 'metric': metric, 'previous': old,
+                                        'current': new, 'baseline': previous_run.get('revision')})
+            break
+    return regressions
+
+def run_benchmarks(modules, sizes, input_path=DEFAULT_INPUT, simulator='iverilog', gap=0, repeat=1,
+                   history_path=DEFAULT_HISTORY, work_dir=DEFAULT_WORK, tolerance=0.0, time_tolerance=0.25,
+                   timeout=3600, label=None, compile_cmd=None, run_cmd=None):
+    history = load_history(history_path) if history_path else {'version': HISTORY_VERSION, 'runs': []}
+    run = {
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'label': label,
+        'simulator': simulator,
+        'compile_cmd': compile_cmd or tb_regression.SIMULATORS[simulator][0],
+        'run_cmd': run_cmd or tb_regression.SIMULATORS[simulator][1],
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'input': os.path.relpath(input_path, ROOT),
+        'results': [],
+    }
+    for width, height in sizes:
+        stimulus = prepare_stimulus(input_path, os.path.join(work_dir, 'stimulus'), width, height)
+        if stimulus is None:
+            print(f"Error: Cannot prepare a {width}x{height} input from {input_path}")
+            return None
+        for module in modules:
+            result = benchmark_module(module, width, height, stimulus, work_dir, simulator, gap, repeat, timeout,
+                                      compile_cmd, run_cmd)
+            run['results'].append(result)
+            if 'error' in result:
+                print(f"{module} {width}x{height}: {result['error']}")
+            elif result['cycles_per_pixel'] is None:
+                print(f"{module} {width}x{height}: no output valid in {result['cycles']} cycles, "
+                      f"{result['wall_time']:.2f} s")
+            else:
+                print(f"{module} {width}x{height}: {result['cycles_per_pixel']:.3f} cycles/pixel, "
+                      f"latency {result['latency_cycles']} cycles, {result['wall_time']:.2f} s "
+                      f"({result['pixels_per_second']:.0f} pixels/s)")
+
+    regressions = find_regressions(run, history, tolerance, time_tolerance)
+    run['regressions'] = regressions
+    for item in regressions:
+        print(f"REGRESSION: {item['module']} {item['width']}x{item['height']} {item['metric']} "
+              f"{item['previous']:.4g} -> {item['current']:.4g} (baseline {item['baseline']})")
+    if history_path:
+        history['runs'].append(run)
+        save_history(history_path, history)
+        print(f"History saved to {history_path} ({len(history['runs'])} run(s))")
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure simulation throughput of the streaming modules')
+    parser.add_argument('modules', nargs='*', help=f"Modules to benchmark (default: {', '.join(BENCHMARKS)})")
+    parser.add_argument('-s', '--sizes', nargs='+', type=parse_size, default=[parse_size(s) for s in DEFAULT_SIZES],
+                        help=f"Resolutions to sweep (default: {' '.join(DEFAULT_SIZES)})")
+    parser.add_argument('-i', '--input', default=DEFAULT_INPUT, help='Source image resized for every run (default: data/gray1.pgm)')
+    parser.add_argument('--simulator', default='iverilog', choices=sorted(tb_regression.SIMULATORS),
+                        help='Command preset to use (default: iverilog)')
+    parser.add_argument('--compile-cmd', help='Compile command template, overriding the preset')
+    parser.add_argument('--run-cmd', help='Run command template, overriding the preset')
+    parser.add_argument('--gap', type=int, default=0, help='Idle cycles between input pixels (default: 0)')
+    parser.add_argument('-r', '--repeat', type=int, default=1, help='Runs per measurement; the fastest wall time is kept')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON history file (default: output/benchmark_history.json)')
+    parser.add_argument('--no-history', action='store_true', help='Do not read or record the history')
+    parser.add_argument('--label', help='Free-form note stored with the run')
+    parser.add_argument('--tolerance', type=float, default=0.0,
+                        help='Allowed relative increase in cycles per pixel and latency (default: 0)')
+    parser.add_argument('--time-tolerance', type=float, default=0.25,
+                        help='Allowed relative increase in simulator wall time (default: 0.25)')
+    parser.add_argument('--timeout', type=float, default=3600, help='Seconds allowed per compile and per run (default: 3600)')
+    parser.add_argument('--work-dir', default=DEFAULT_WORK, help='Build and stimulus directory (default: .sim_cache/benchmark)')
+    args = parser.parse_args()
+
+    modules = args.modules or list(BENCHMARKS)
+    unknown = [module for module in modules if module not in BENCHMARKS]
+    if unknown:
+        parser.error(f"Unknown module(s): {', '.join(unknown)}; choose from {', '.join(BENCHMARKS)}")
+    run = run_benchmarks(modules, args.sizes, os.path.abspath(args.input), args.simulator, args.gap, args.repeat,
+                         None if args.no_history else args.history, os.path.abspath(args.work_dir),
+                         args.tolerance, args.time_tolerance, args.timeout, args.label, args.compile_cmd,
+                         args.run_cmd)
+    if run is None or run['regressions'] or any('error' in result for result in run['results']):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
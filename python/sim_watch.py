@@ -0,0 +1,296 @@
+import argparse
+import os
+import sys
+import time
+import cv2
+import numpy as np
+import pnm
+from fpga_image import PNM_EXTENSIONS, load_image
+from golden import STAGES, parse_stages, run_pipeline
+from golden.pipeline import RGB_STAGES
+from image_compare import pixel_errors, psnr
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_PREVIEW_DIR = os.path.join(ROOT, 'output', 'preview')
+
+POLL_SECONDS = 0.5
+# Bytes decoded per pass, so catching up on a large dump stays bounded.
+READ_CHUNK = 1 << 24
+# The header is re-read from the start until it is complete.
+HEADER_BYTES = 1 << 12
+PREVIEW_WIDTH = 1024
+
+_WHITESPACE = b' \t\n\v\f\r'
+
+class WatchedFile:
+    # One PNM a simulation is still writing. The byte offset of the decoded
+    # part is kept, so each poll reads and parses only what was appended:
+    # samples fill a frame allocated from the header, and only the rows
+    # completed since the last poll are compared and drawn into the preview.
+    def __init__(self, path, reference=None, tolerance=0, preview_width=PREVIEW_WIDTH):
+        self.path = path
+        self.name = os.path.basename(path)
+        self.expected = reference
+        self.tolerance = tolerance
+        self.preview_width = preview_width
+        self.identity = None
+        self.reset()
+
+    def reset(self):
+        # A rewritten file is compared again even if its last header did
+        # not match the reference.
+        self.reference = self.expected
+        self.header = None
+        self.offset = 0
+        self.carry = b''
+        self.filled = 0
+        self.overrun = 0
+        self.rows = 0
+        self.frame = None
+        self.preview = None
+        self.step = 1
+        self.stats = {'mismatches': 0, 'max_abs': 0, 'sse': 0, 'samples': 0, 'first_row': None}
+
+    @property
+    def complete(self):
+        return self.header is not None and self.rows == self.header[2]
+
+    def poll(self):
+        # Returns the number of rows completed by this poll.
+        try:
+            st = os.stat(self.path)
+        except FileNotFoundError:
+            return 0
+        identity = (st.st_dev, st.st_ino)
+        if identity != self.identity or st.st_size < self.offset:
+            # Reopened with "w": the simulation started over.
+            if self.identity is not None:
+                print(f"{self.name}: rewritten, starting over")
+            self.identity = identity
+            self.reset()
+        if st.st_size == self.offset:
+            self._flush_last()
+        else:
+            with open(self.path, 'rb') as f:
+                if self.header is None and not self._read_header(f):
+                    return 0
+                f.seek(self.offset)
+                while self.offset < st.st_size:
+                    data = f.read(min(st.st_size - self.offset, READ_CHUNK))
+                    if not data:
+                        break
+                    self.offset += len(data)
+                    self._decode(data)
+        before = self.rows
+        if self.header is not None:
+            self._rows_done(self.filled // self.row_samples)
+        return self.rows - before
+
+    def _read_header(self, f):
+        head = f.read(HEADER_BYTES)
+        try:
+            magic, width, height, max_val, offset = pnm.parse_header(head)
+        except ValueError as e:
+            if 'Truncated' in str(e):
+                return False
+            raise
+        # The last field is only known to be whole once its separator is in.
+        if offset > len(head):
+            return False
+        self.header = (magic, width, height, max_val)
+        self.ascii = magic in ('P2', 'P3')
+        self.channels = 3 if magic in ('P3', 'P6') else 1
+        self.dtype = np.uint16 if max_val > 255 else np.uint8
+        self.row_samples = width * self.channels
+        shape = (height, width, 3) if self.channels == 3 else (height, width)
+        self.frame = np.zeros(shape, dtype=self.dtype)
+        self.step = max(1, -(-width // self.preview_width)) if self.preview_width else 1
+        self.preview = np.zeros((-(-height // self.step), -(-width // self.step)) + shape[2:], dtype=np.uint8)
+        self.offset = offset
+        if self.reference is not None and self.reference.shape != shape:
+            print(f"Warning: {self.name} is {width}x{height}, reference {self.reference.shape[1]}x"
+                  f"{self.reference.shape[0]}, not comparing")
+            self.reference = None
+        return True
+
+    def _decode(self, data):
+        data = self.carry + data if self.carry else data
+        if self.ascii:
+            # A token cut by the end of the data waits for the next poll.
+            cut = len(data)
+            while cut and data[cut - 1] not in _WHITESPACE:
+                cut -= 1
+            self.carry = data[cut:]
+            samples = pnm.parse_ascii(data[:cut], dtype=self.dtype) if cut else None
+        else:
+            itemsize = np.dtype(self.dtype).itemsize
+            usable = len(data) - len(data) % itemsize
+            self.carry = data[usable:]
+            samples = np.frombuffer(data, dtype=pnm.binary_dtype(self.header[3]), count=usable // itemsize)
+        if samples is not None:
+            self._store(samples)
+
+    def _flush_last(self):
+        # An ASCII file may end on its last sample without a separator; once
+        # the file stops growing that sample is taken as it is.
+        if self.header is not None and self.ascii and self.carry and \
+                self.filled + 1 == self.frame.size and self.carry.isdigit():
+            self._store(np.array([int(self.carry)], dtype=self.dtype))
+            self.carry = b''
+
+    def _store(self, samples):
+        flat = self.frame.reshape(-1)
+        take = min(samples.size, flat.size - self.filled)
+        flat[self.filled:self.filled + take] = samples[:take]
+        self.filled += take
+        self.overrun += samples.size - take
+
+    def _rows_done(self, rows):
+        if rows <= self.rows:
+            return
+        start = self.rows
+        band = self.frame[start:rows]
+        if self.reference is not None:
+            reference = self.reference[start:rows]
+            errors = pixel_errors(band, reference)
+            bad = np.count_nonzero(errors > self.tolerance, axis=1)
+            stats = self.stats
+            if stats['first_row'] is None and bad.any():
+                stats['first_row'] = start + int(np.argmax(bad > 0))
+            stats['mismatches'] += int(bad.sum())
+            stats['max_abs'] = max(stats['max_abs'], int(errors.max()))
+            diff = band.astype(np.int64) - reference
+            stats['sse'] += int(np.dot(diff.ravel(), diff.ravel()))
+            stats['samples'] += diff.size
+        # Preview rows are every step-th frame row, scaled to 8 bits.
+        first = -(-start // self.step)
+        last = -(-rows // self.step)
+        if last > first:
+            rows_in = band[first * self.step - start::self.step, ::self.step]
+            max_val = self.header[3]
+            if max_val != 255:
+                rows_in = (rows_in.astype(np.uint32) * 255 // max(max_val, 1)).astype(np.uint8)
+            self.preview[first:last] = rows_in
+        self.rows = rows
+
+    def write_preview(self, preview_dir):
+        path = os.path.join(preview_dir, os.path.splitext(self.name)[0] + '.jpg')
+        # Written aside and renamed, so a viewer never opens half a JPG.
+        part = path[:-len('.jpg')] + '.part.jpg'
+        image = cv2.cvtColor(self.preview, cv2.COLOR_RGB2BGR) if self.preview.ndim == 3 else self.preview
+        cv2.imwrite(part, image)
+        os.replace(part, path)
+        return path
+
+    def summary(self):
+        _, width, height, _ = self.header
+        text = f"{self.name}: {self.rows}/{height} rows ({self.rows * 100 / height:.1f}%) of {width}x{height}"
+        if self.reference is not None:
+            stats = self.stats
+            mse = stats['sse'] / stats['samples'] if stats['samples'] else 0
+            text += f", {stats['mismatches']}/{self.rows * width} pixels differ, max abs {stats['max_abs']}, " \
+                    f"PSNR {psnr(mse, self.header[3]):.2f} dB"
+            if stats['first_row'] is not None:
+                text += f", first at row {stats['first_row']}"
+        if self.overrun:
+            text += f", {self.overrun} samples past the end"
+        return text
+
+def load_reference(args):
+    # One reference frame for every watched file, from an image or from the
+    # golden pipeline run over --input.
+    if args.stages:
+        stages = parse_stages(args.stages)
+        mode = 'rgb' if stages[0][0] in RGB_STAGES else 'gray'
+        image, max_val = load_image(args.input, mode)
+        if max_val != 255:
+            image = np.clip(image.astype(np.int64) * 255 // max_val, 0, 255).astype(np.uint8)
+        return run_pipeline(image, stages)
+    if args.reference and os.path.isfile(args.reference):
+        return load_image(args.reference)[0]
+    return None
+
+def reference_for(args, path, shared):
+    if shared is not None:
+        return shared
+    if args.reference and os.path.isdir(args.reference):
+        candidate = os.path.join(args.reference, os.path.basename(path))
+        if os.path.exists(candidate):
+            return load_image(candidate)[0]
+    return None
+
+def watched_paths(paths):
+    found = []
+    for path in paths:
+        if os.path.isdir(path):
+            found.extend(os.path.join(path, name) for name in sorted(os.listdir(path))
+                         if os.path.splitext(name)[1].lower() in PNM_EXTENSIONS)
+        elif os.path.exists(path):
+            found.append(path)
+    return found
+
+def main():
+    parser = argparse.ArgumentParser(description='Follow PGM/PPM files while a simulation writes them, decoding '
+                                                 'only the appended rows')
+    parser.add_argument('paths', nargs='*', help='Files or directories to watch (default: output/)')
+    parser.add_argument('-r', '--reference', help='Reference image, or directory of references with the same names')
+    parser.add_argument('-S', '--stages', help=f"Compute the reference with this stage chain ({', '.join(STAGES)})")
+    parser.add_argument('-i', '--input', help='Input image for --stages')
+    parser.add_argument('--tolerance', type=int, default=0, help='Allowed absolute error per sample (default: 0)')
+    parser.add_argument('--preview-dir', default=DEFAULT_PREVIEW_DIR,
+                        help='Where the preview JPGs go (default: output/preview)')
+    parser.add_argument('--preview-width', type=int, default=PREVIEW_WIDTH,
+                        help=f"Decimate previews to at most this width, 0 for full size (default: {PREVIEW_WIDTH})")
+    parser.add_argument('--no-preview', action='store_true', help='Only print progress and statistics')
+    parser.add_argument('--interval', type=float, default=POLL_SECONDS,
+                        help=f"Seconds between polls (default: {POLL_SECONDS})")
+    parser.add_argument('--once', action='store_true', help='Poll once and exit')
+    parser.add_argument('--until-done', action='store_true',
+                        help='Exit once every watched file is complete, with 1 if any pixel differs')
+    args = parser.parse_args()
+    if args.stages and not args.input:
+        parser.error('--stages needs --input')
+
+    try:
+        shared = load_reference(args)
+    except (OSError, ValueError, IndexError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    paths = args.paths or [os.path.join(ROOT, 'output')]
+    if not args.no_preview:
+        os.makedirs(args.preview_dir, exist_ok=True)
+
+    files = {}
+    try:
+        while True:
+            for path in watched_paths(paths):
+                if path not in files:
+                    files[path] = WatchedFile(path, reference_for(args, path, shared), args.tolerance,
+                                              args.preview_width)
+            for watched in files.values():
+                was_complete = watched.complete
+                try:
+                    rows = watched.poll()
+                except (OSError, ValueError) as e:
+                    print(f"Error: {watched.name}: {e}")
+                    continue
+                if rows and not args.no_preview:
+                    watched.write_preview(args.preview_dir)
+                if rows or (args.once and watched.header is not None):
+                    print(watched.summary() + (', complete' if watched.complete and not was_complete else ''))
+            if args.once:
+                break
+            if args.until_done and files and all(watched.complete for watched in files.values()):
+                break
+            time.sleep(args.interval)
+    except KeyboardInterrupt:
+        pass
+
+    if any(watched.stats['mismatches'] for watched in files.values()):
+        sys.exit(1)
+    if args.until_done and not files:
+        print("Error: nothing to watch")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+import argparse
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import numpy as np
+import pnm
+from conversion_cache import CACHE_ENV
+from sim_benchmark import HISTORY_VERSION, ROOT, git_revision, load_history, save_history
+
+FPGA_IMAGE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fpga_image.py')
+LEGACY_BAYER = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'jpg2bayer.py')
+DEFAULT_HISTORY = os.path.join(ROOT, 'output', 'startup_history.json')
+DEFAULT_WORK = os.path.join(ROOT, '.sim_cache', 'startup')
+# Small enough that the timings are the interpreter and import cost.
+FRAME_WIDTH, FRAME_HEIGHT = 64, 48
+# Wall-time changes smaller than this are scheduler noise.
+TIME_FLOOR = 0.02
+
+# Name -> (argv after the interpreter, whether OpenCV may be imported).
+# {work} is the stimulus directory; 'python' is the bare interpreter that
+# every other case is measured against.
+CASES = {
+    'python': (['-c', 'pass'], False),
+    'help': ([FPGA_IMAGE, '--help'], False),
+    'pgm-to-ppm': ([FPGA_IMAGE, 'to-ppm', '{work}/frame.pgm', '{work}/out.ppm', '-f', 'P6'], False),
+    'ppm-to-pgm': ([FPGA_IMAGE, 'to-pgm', '{work}/frame.ppm', '{work}/out.pgm', '-f', 'P5'], False),
+    'raw-to-pgm': ([FPGA_IMAGE, 'to-pgm', '{work}/frame_64x48_rggb.raw', '{work}/raw.pgm'], False),
+    'raw-to-ppm': ([FPGA_IMAGE, 'to-ppm', '{work}/frame_64x48_rggb.raw', '{work}/raw.ppm', '-f', 'P6'], False),
+    'ppm-to-bayer': ([FPGA_IMAGE, 'to-bayer', '{work}/frame.ppm', '{work}/out.raw'], False),
+    'ppm-to-yuv': ([FPGA_IMAGE, 'to-yuv', '{work}/frame.ppm', '{work}/out.nv12'], True),
+    'resize': ([FPGA_IMAGE, 'resize', '{work}/frame.pgm', '{work}/resized.pgm', '-s', '0.5'], True),
+    'legacy-jpg2bayer': ([LEGACY_BAYER, '{work}/frame.ppm', '{work}/legacy.raw'], True),
+}
+
+def prepare_inputs(work_dir, seed=0):
+    os.makedirs(work_dir, exist_ok=True)
+    rng = np.random.default_rng(seed)
+    rgb = rng.integers(0, 256, size=(FRAME_HEIGHT, FRAME_WIDTH, 3), dtype=np.uint8)
+    pnm.write_ppm(os.path.join(work_dir, 'frame.ppm'), rgb)
+    pnm.write_pgm(os.path.join(work_dir, 'frame.pgm'), rgb[..., 1])
+    rgb[..., 1].tofile(os.path.join(work_dir, f'frame_{FRAME_WIDTH}x{FRAME_HEIGHT}_rggb.raw'))
+
+def case_command(name, work_dir):
+    argv, _ = CASES[name]
+    return [sys.executable] + [arg.format(work=work_dir) for arg in argv]
+
+def child_env():
+    # A configured conversion cache would turn the conversions into copies.
+    env = dict(os.environ)
+    env.pop(CACHE_ENV, None)
+    return env
+
+def imported_modules(command, env):
+    # Top-level packages the command imports, from -X importtime.
+    result = subprocess.run(command[:1] + ['-X', 'importtime'] + command[1:], capture_output=True,
+                            text=True, env=env)
+    if result.returncode != 0:
+        raise RuntimeError(f"{' '.join(command)} failed:\n{result.stdout}{result.stderr}")
+    modules = set()
+    for line in result.stderr.splitlines():
+        if line.startswith('import time:') and line.count('|') == 2:
+            modules.add(line.rsplit('|', 1)[1].strip().split('.')[0])
+    return modules
+
+def time_case(name, work_dir, repeat=5):
+    env = child_env()
+    command = case_command(name, work_dir)
+    modules = imported_modules(command, env)
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run(command, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL, env=env, check=True)
+        times.append(time.perf_counter() - start)
+    return {'case': name, 'best': min(times), 'median': statistics.median(times),
+            'cv2': 'cv2' in modules, 'numpy': 'numpy' in modules}
+
+def find_regressions(run, history, time_tolerance=0.25):
+    # OpenCV showing up in a case that should not need it is always a
+    # regression; times are only compared with the latest earlier run on
+    # the same host and Python.
+    regressions = []
+    for result in run['results']:
+        if result['cv2'] and not CASES[result['case']][1]:
+            regressions.append({'case': result['case'], 'metric': 'cv2', 'previous': False, 'current': True,
+                                'baseline': None})
+    for previous_run in reversed(history['runs']):
+        if (previous_run['host'], previous_run['python']) != (run['host'], run['python']):
+            continue
+        previous = {item['case']: item for item in previous_run['results']}
+        for result in run['results']:
+            old = previous.get(result['case'], {}).get('best')
+            new = result['best']
+            if old is not None and new > old * (1 + time_tolerance) and new - old > TIME_FLOOR:
+                regressions.append({'case': result['case'], 'metric': 'best', 'previous': old, 'current': new,
+                                    'baseline': previous_run.get('revision')})
+        break
+    return regressions
+
+def run_benchmarks(cases, repeat=5, history_path=DEFAULT_HISTORY, work_dir=DEFAULT_WORK, time_tolerance=0.25,
+                   label=None):
+    history = load_history(history_path) if history_path else {'version': HISTORY_VERSION, 'runs': []}
+    prepare_inputs(work_dir)
+    run = {
+        'started': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'revision': git_revision(),
+        'label': label,
+        'host': platform.node(),
+        'python': platform.python_version(),
+        'repeat': repeat,
+        'results': [],
+    }
+    baseline = None
+    for name in cases:
+        result = time_case(name, work_dir, repeat)
+        run['results'].append(result)
+        if name == 'python':
+            baseline = result['best']
+        overhead = f", +{(result['best'] - baseline) * 1000:6.1f} ms over python" if baseline is not None else ''
+        print(f"{name:18s} best {result['best'] * 1000:7.1f} ms, median {result['median'] * 1000:7.1f} ms"
+              f"{overhead}, numpy {'yes' if result['numpy'] else 'no'}, cv2 {'yes' if result['cv2'] else 'no'}")
+
+    regressions = find_regressions(run, history, time_tolerance)
+    run['regressions'] = regressions
+    for item in regressions:
+        if item['metric'] == 'cv2':
+            print(f"REGRESSION: {item['case']} imports cv2")
+        else:
+            print(f"REGRESSION: {item['case']} best {item['previous'] * 1000:.1f} -> {item['current'] * 1000:.1f} ms "
+                  f"(baseline {item['baseline']})")
+    if history_path:
+        history['runs'].append(run)
+        save_history(history_path, history)
+        print(f"History saved to {history_path} ({len(history['runs'])} run(s))")
+    return run
+
+def main():
+    parser = argparse.ArgumentParser(description='Measure cold-start time of the fpga-image CLI')
+    parser.add_argument('cases', nargs='*', help=f"Cases to run (default: {', '.join(CASES)})")
+    parser.add_argument('-r', '--repeat', type=int, default=5, help='Runs per case; best and median are kept (default: 5)')
+    parser.add_argument('--history', default=DEFAULT_HISTORY, help='JSON history file (default: output/startup_history.json)')
+    parser.add_argument('--no-history', action='store_true', help='Do not read or record the history')
+    parser.add_argument('--label', help='Free-form note stored with the run')
+    parser.add_argument('--time-tolerance', type=float, default=0.25,
+                        help='Allowed relative increase in best wall time (default: 0.25)')
+    parser.add_argument('--work-dir', default=DEFAULT_WORK, help='Stimulus directory (default: .sim_cache/startup)')
+    args = parser.parse_args()
+
+    cases = args.cases or list(CASES)
+    unknown = [name for name in cases if name not in CASES]
+    if unknown:
+        parser.error(f"Unknown case(s): {', '.join(unknown)}; choose from {', '.join(CASES)}")
+    if 'python' not in cases:
+        cases = ['python'] + cases
+    run = run_benchmarks(cases, args.repeat, None if args.no_history else args.history,
+                         os.path.abspath(args.work_dir), args.time_tolerance, args.label)
+    if run['regressions']:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
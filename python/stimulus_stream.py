@@ -0,0 +1,126 @@
+import argparse
+import json
+import os
+import cv2
+import pnm
+from jpg2bayer import rgb_to_bayer
+from yuv import YUV_LAYOUTS, encode_yuv
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.tif', '.tiff', '.pgm', '.ppm')
+
+STREAM_FORMATS = ['pgm', 'ppm', 'bayer'] + YUV_LAYOUTS
+
+def iter_source_frames(source):
+    # Yields (name, bgr_image) one frame at a time from a directory of images
+    # or a video file, so only the current frame is ever decoded in memory.
+    if os.path.isdir(source):
+        names = sorted(f for f in os.listdir(source) if f.lower().endswith(IMAGE_EXTENSIONS))
+        for name in names:
+            img = cv2.imread(os.path.join(source, name), cv2.IMREAD_COLOR)
+            if img is None:
+                print(f"Warning: Cannot read image {name}, skipping")
+                continue
+            yield name, img
+    else:
+        capture = cv2.VideoCapture(source)
+        if not capture.isOpened():
+            raise ValueError(f"Cannot open video file: {source}")
+        try:
+            index = 0
+            while True:
+                ok, img = capture.read()
+                if not ok:
+                    break
+                yield f"{os.path.basename(source)}#{index}", img
+                index += 1
+        finally:
+            capture.release()
+
+def convert_frame(img, output_format, pattern='BGGR', ascii_pnm=False):
+    if output_format == 'pgm':
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        return pnm.encode_pgm(gray, 255, 'P2' if ascii_pnm else 'P5')
+    if output_format == 'ppm':
+        rgb = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
+        return pnm.encode_ppm(rgb, 255, 'P3' if ascii_pnm else 'P6')
+    if output_format == 'bayer':
+        return rgb_to_bayer(cv2.cvtColor(img, cv2.COLOR_BGR2RGB), pattern).tobytes()
+    if output_format in YUV_LAYOUTS:
+        return encode_yuv(img, output_format).tobytes()
+    raise ValueError(f"Unsupported output format: {output_format}")
+
+def iter_converted_frames(frames, output_format, width=None, height=None, pattern='BGGR',
+                          ascii_pnm=False, interpolation=cv2.INTER_LINEAR):
+    # Every frame in a raw stream must share one size: either the requested
+    # width/height, or the size of the first frame.
+    frame_size = (width, height) if width and height else None
+    for name, img in frames:
+        if frame_size is None:
+            frame_size = (img.shape[1], img.shape[0])
+        if (img.shape[1], img.shape[0]) != frame_size:
+            if not (width and height):
+                raise ValueError(f"Frame {name} is {img.shape[1]}x{img.shape[0]}, expected "
+                                 f"{frame_size[0]}x{frame_size[1]}; pass a width and height to resize")
+            img = cv2.resize(img, frame_size, interpolation=interpolation)
+        yield name, frame_size, convert_frame(img, output_format, pattern, ascii_pnm)
+
+def write_stream(source, output_path, output_format, width=None, height=None, pattern='BGGR',
+                 ascii_pnm=False, max_frames=None, index_path=None):
+    index_path = index_path or output_path + '.index.jsonl'
+    frames = iter_source_frames(source)
+    converted = iter_converted_frames(frames, output_format, width, height, pattern, ascii_pnm)
+
+    # The index is JSON Lines: a header record followed by one record per
+    # frame, written as frames are appended so nothing accumulates in memory.
+    count = 0
+    offset = 0
+    with open(output_path, 'wb') as out, open(index_path, 'w') as index:
+        for name, (frame_width, frame_height), data in converted:
+            if count == 0:
+                header = {'format': output_format, 'width': frame_width, 'height': frame_height,
+                          'pattern': pattern if output_format == 'bayer' else None,
+                          'source': source}
+                index.write(json.dumps(header) + "\n")
+            index.write(json.dumps({'frame': count, 'offset': offset, 'size': len(data),
+                                    'source': name}) + "\n")
+            out.write(data)
+            offset += len(data)
+            count += 1
+            if count % 100 == 0:
+                print(f"  {count} frames written ({offset} bytes)")
+            if max_frames is not None and count >= max_frames:
+                break
+
+    print(f"Stream complete! {count} frames, {offset} bytes written to {output_path}")
+    print(f"Frame index saved to {index_path}")
+    return count
+
+def read_stream_index(index_path):
+    with open(index_path) as f:
+        lines = [json.loads(line) for line in f if line.strip()]
+    if not lines:
+        return None, []
+    return lines[0], lines[1:]
+
+def main():
+    parser = argparse.ArgumentParser(description='Convert an image directory or video into a concatenated stimulus stream')
+    parser.add_argument('source', help='Directory of images or a video file')
+    parser.add_argument('output', help='Output stream file')
+    parser.add_argument('-f', '--format', required=True, choices=STREAM_FORMATS, help='Per-frame output format')
+    parser.add_argument('-W', '--width', type=int, help='Resize every frame to this width')
+    parser.add_argument('-H', '--height', type=int, help='Resize every frame to this height')
+    parser.add_argument('-p', '--pattern', default='BGGR', choices=['BGGR', 'GRBG', 'GBRG', 'RGGB'],
+                        help='Bayer pattern (default: BGGR)')
+    parser.add_argument('-a', '--ascii', action='store_true', help='Write PGM/PPM frames as P2/P3 instead of P5/P6')
+    parser.add_argument('-n', '--max-frames', type=int, help='Stop after this many frames')
+    parser.add_argument('--index', help='Index file path (default: <output>.index.jsonl)')
+    args = parser.parse_args()
+
+    if (args.width is None) != (args.height is None):
+        parser.error("--width and --height must be given together")
+
+    write_stream(args.source, args.output, args.format, args.width, args.height, args.pattern,
+                 args.ascii, args.max_frames, args.index)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,311 @@
+import argparse
+import fnmatch
+import hashlib
+import json
+import os
+import re
+import shlex
+import shutil
+import subprocess
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from batch import default_jobs
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_CACHE = os.path.join(ROOT, '.sim_cache')
+DEFAULT_REPORT = os.path.join(ROOT, 'output', 'regression.json')
+
+# Compile and run command templates. {sources} expands to the testbench
+# followed by every module file it needs; {output} is the compiled
+# simulation inside the cache and {build_dir} the directory holding it.
+SIMULATORS = {
+    'iverilog': ('iverilog -s {top} -o {output} {sources}', 'vvp -n {output}'),
+    'verilator': ('verilator --binary --timing -Wno-fatal -Wno-lint -Wno-style --top-module {top} '
+                  '--Mdir {build_dir} -o {output} {sources}', '{output}'),
+}
+
+# The benches report problems with $display and still $finish normally.
+DEFAULT_FAIL_PATTERN = r'^\s*%?(?:ERROR|Error|FAIL|FAILED)\b\s*:'
+
+LOG_TAIL_LINES = 20
+
+_comment = re.compile(r'//[^\n]*|/\*.*?\*/', re.S)
+# Comments and string literals, so a module named in a $display or a
+# comment does not count as an instantiation.
+_non_code = re.compile(r'"(?:\\.|[^"\\\n])*"|//[^\n]*|/\*.*?\*/', re.S)
+_module = re.compile(r'^\s*module\s+(\w+)', re.M)
+_file_name = re.compile(r'"([\w./-]+\.\w+)"')
+
+def scan_sources(root):
+    # Maps every module name to the file defining it. When two files define
+    # the same module (linebuffer.v also declares mean9x9), the file named
+    # after the module wins.
+    modules = {}
+    testbenches = []
+    for name in sorted(os.listdir(root)):
+        if not name.endswith('.v'):
+            continue
+        path = os.path.join(root, name)
+        with open(path, errors='replace') as f:
+            text = _comment.sub('', f.read())
+        for module in _module.findall(text):
+            if module not in modules or name == module + '.v':
+                modules[module] = path
+        if name.startswith('tb_'):
+            testbenches.append(path)
+    return modules, testbenches
+
+def dependencies(tb_path, modules):
+    # The testbench followed by every module file it instantiates, directly
+    # or through other modules.
+    sources = [tb_path]
+    pending = [tb_path]
+    while pending:
+        with open(pending.pop(), errors='replace') as f:
+            text = _non_code.sub(' ', f.read())
+        defined = set(_module.findall(text))
+        for module, path in modules.items():
+            if module in defined or path in sources:
+                continue
+            if re.search(r'\b' + re.escape(module) + r'\b\s*(?:#|\w+\s*\()', text):
+                sources.append(path)
+                pending.append(path)
+    return sources
+
+def discover(root, patterns=None):
+    modules, testbenches = scan_sources(root)
+    found = []
+    for tb_path in testbenches:
+        top = os.path.splitext(os.path.basename(tb_path))[0]
+        if patterns and not any(fnmatch.fnmatch(top, pattern) for pattern in patterns):
+            continue
+        found.append((top, dependencies(tb_path, modules)))
+    return found
+
+def shared_files(sources):
+    # Every file name a testbench or its modules spell out, outside data/
+    # which the benches only read. Benches naming the same file may write it.
+    names = set()
+    for path in sources:
+        with open(path, errors='replace') as f:
+            text = _comment.sub('', f.read())
+        names.update(name for name in _file_name.findall(text) if not name.startswith('data/'))
+    return names
+
+def conflict_groups(found):
+    # Indices into found, grouped so that benches sharing a file land in one
+    # group and run one after another in discovery order. The benches all
+    # run in the same directory, so running those at once would interleave
+    # their writes; this way the files end up as after a serial run.
+    groups = []
+    for index, (_, sources) in enumerate(found):
+        names, members = shared_files(sources), [index]
+        kept = []
+        for group_names, group_members in groups:
+            if group_names & names:
+                names |= group_names
+                members = group_members + members
+            else:
+                kept.append((group_names, group_members))
+        groups = kept + [(names, sorted(members))]
+    return sorted((members for _, members in groups), key=lambda members: members[0])
+
+def build_key(compile_cmd, sources):
+    # Hash of the compile command and of every source file, so editing the
+    # testbench or any module it pulls in forces a rebuild.
+    digest = hashlib.sha256(compile_cmd.encode('utf-8'))
+    for path in sources:
+        digest.update(os.path.basename(path).encode('utf-8') + b'\0')
+        with open(path, 'rb') as f:
+            digest.update(hashlib.sha256(f.read()).digest())
+    return digest.hexdigest()
+
+def expand(template, sources, **fields):
+    args = []
+    for token in shlex.split(template):
+        if token == '{sources}':
+            args += sources
+        else:
+            args.append(token.format(**fields))
+    return args
+
+def log_tail(text):
+    return "\n".join(text.splitlines()[-LOG_TAIL_LINES:])
+
+def execute(args, cwd, timeout):
+    # Returns (returncode, stdout + stderr, seconds, timed out); returncode
+    # is None when the command timed out or could not be started.
+    start = time.perf_counter()
+    try:
+        result = subprocess.run(args, cwd=cwd, capture_output=True, text=True, errors='replace',
+                                timeout=timeout)
+        return result.returncode, result.stdout + result.stderr, time.perf_counter() - start, False
+    except subprocess.TimeoutExpired as e:
+        output = ''.join(part.decode('utf-8', 'replace') if isinstance(part, bytes) else part or ''
+                         for part in (e.stdout, e.stderr))
+        return None, output, time.perf_counter() - start, True
+    except OSError as e:
+        return None, str(e), time.perf_counter() - start, False
+
+def build_testbench(top, sources, root, cache_dir, compile_cmd, timeout):
+    # Compiles the testbench into the cache unless an up-to-date build is
+    # there. Returns (template fields, compile record, compiler output); the
+    # record has a status only when the build failed.
+    key = build_key(compile_cmd, sources)
+    tb_cache = os.path.join(cache_dir, top)
+    build_dir = os.path.join(tb_cache, key[:16])
+    output = os.path.join(build_dir, top)
+    fields = {'top': top, 'output': output, 'build_dir': build_dir}
+    record = {'cached': os.path.exists(output), 'compile_time': 0.0, 'returncode': None}
+    if record['cached']:
+        return fields, record, ''
+
+    # Other builds of this testbench are stale once the sources change.
+    shutil.rmtree(tb_cache, ignore_errors=True)
+    os.makedirs(build_dir)
+    returncode, text, elapsed, timed_out = execute(expand(compile_cmd, sources, **fields), root, timeout)
+    record['compile_time'] = elapsed
+    if returncode != 0 or not os.path.exists(output):
+        shutil.rmtree(build_dir, ignore_errors=True)
+        record['status'] = 'timeout' if timed_out else 'compile_error'
+        record['returncode'] = returncode
+    return fields, record, text
+
+def run_testbench(top, sources, root, cache_dir, compile_cmd, run_cmd, timeout, fail_pattern):
+    log_path = os.path.join(cache_dir, 'logs', top + '.log')
+    os.makedirs(os.path.dirname(log_path), exist_ok=True)
+    record = {
+        'testbench': top,
+        'sources': [os.path.relpath(path, root) for path in sources],
+        'run_time': 0.0,
+        'log': log_path,
+    }
+    fields, built, text = build_testbench(top, sources, root, cache_dir, compile_cmd, timeout)
+    record.update(built)
+    log = [text]
+    if 'status' in record:
+        record['log_tail'] = log_tail(text)
+        with open(log_path, 'w') as f:
+            f.write(''.join(log))
+        return record
+
+    returncode, text, elapsed, timed_out = execute(expand(run_cmd, sources, **fields), root, timeout)
+    record['run_time'] = elapsed
+    record['returncode'] = returncode
+    log.append(text)
+    if timed_out:
+        record['status'] = 'timeout'
+    elif returncode != 0 or re.search(fail_pattern, text, re.M):
+        record['status'] = 'fail'
+    else:
+        record['status'] = 'pass'
+    record['log_tail'] = log_tail(text)
+    with open(log_path, 'w') as f:
+        f.write(''.join(log))
+    return record
+
+def _run_job(args):
+    try:
+        return run_testbench(*args)
+    except Exception as e:
+        return {'testbench': args[0], 'status': 'error', 'error': f"{type(e).__name__}: {e}"}
+
+def _run_group(group):
+    return [_run_job(task) for task in group]
+
+def run_regression(root=ROOT, patterns=None, jobs=1, cache_dir=DEFAULT_CACHE, simulator='iverilog',
+                   compile_cmd=None, run_cmd=None, timeout=600, fail_pattern=DEFAULT_FAIL_PATTERN,
+                   report_path=DEFAULT_REPORT):
+    default_compile, default_run = SIMULATORS[simulator]
+    compile_cmd = compile_cmd or default_compile
+    run_cmd = run_cmd or default_run
+    found = discover(root, patterns)
+    if not found:
+        print("No testbenches matched")
+        return None
+    # The benches read data/ and write output/ relative to the RTL directory.
+    os.makedirs(os.path.join(root, 'output'), exist_ok=True)
+
+    tasks = [(top, sources, root, cache_dir, compile_cmd, run_cmd, timeout, fail_pattern)
+             for top, sources in found]
+    groups = conflict_groups(found)
+    jobs = max(1, min(jobs, len(groups)))
+    started = time.strftime('%Y-%m-%dT%H:%M:%S')
+    start = time.perf_counter()
+    results = []
+
+    def report(result):
+        results.append(result)
+        detail = result.get('error') or f"{result['run_time']:.2f} s" + \
+            (", cached" if result.get('cached') else f", compiled in {result['compile_time']:.2f} s")
+        print(f"[{len(results)}/{len(tasks)}] {result['testbench']}: {result['status']} ({detail})")
+
+    if jobs == 1:
+        for task in tasks:
+            report(_run_job(task))
+    else:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            futures = [pool.submit(_run_group, [tasks[index] for index in members]) for members in groups]
+            for future in futures:
+                for result in future.result():
+                    report(result)
+        order = {top: index for index, (top, _) in enumerate(found)}
+        results.sort(key=lambda result: order[result['testbench']])
+
+    counts = {}
+    for result in results:
+        counts[result['status']] = counts.get(result['status'], 0) + 1
+    summary = {
+        'started': started,
+        'wall_time': time.perf_counter() - start,
+        'jobs': jobs,
+        'compile_cmd': compile_cmd,
+        'run_cmd': run_cmd,
+        'counts': counts,
+        'results': results,
+    }
+    if report_path:
+        os.makedirs(os.path.dirname(os.path.abspath(report_path)), exist_ok=True)
+        with open(report_path, 'w') as f:
+            json.dump(summary, f, indent=2)
+        print(f"Report saved to {report_path}")
+
+    failed = [result for result in results if result['status'] != 'pass']
+    print(f"\nRegression completed in {summary['wall_time']:.1f} s: "
+          f"{len(results) - len(failed)}/{len(results)} testbenches passed")
+    for result in failed:
+        print(f"  - {result['testbench']}: {result['status']}")
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description='Compile and run the tb_*.v testbenches in parallel')
+    parser.add_argument('patterns', nargs='*', help='Testbench name patterns, e.g. tb_mean* (default: all)')
+    parser.add_argument('-j', '--jobs', type=int, default=default_jobs(),
+                        help='Number of simulations to run at once (default: CPU count)')
+    parser.add_argument('--root', default=ROOT, help='Directory holding the .v files (default: repository root)')
+    parser.add_argument('--simulator', default='iverilog', choices=sorted(SIMULATORS),
+                        help='Command preset to use (default: iverilog)')
+    parser.add_argument('--compile-cmd', help='Compile command template, overriding the preset')
+    parser.add_argument('--run-cmd', help='Run command template, overriding the preset')
+    parser.add_argument('--timeout', type=float, default=600, help='Seconds allowed per compile and per run (default: 600)')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE, help='Compiled simulation cache (default: .sim_cache)')
+    parser.add_argument('--report', default=DEFAULT_REPORT, help='JSON report path (default: output/regression.json)')
+    parser.add_argument('--fail-pattern', default=DEFAULT_FAIL_PATTERN,
+                        help='Regex marking a failed run when it matches a line of the simulation output')
+    parser.add_argument('--list', action='store_true', help='Only print the testbenches and their sources')
+    args = parser.parse_args()
+
+    root = os.path.abspath(args.root)
+    if args.list:
+        for top, sources in discover(root, args.patterns):
+            print(f"{top}: {' '.join(os.path.relpath(path, root) for path in sources[1:])}")
+        return
+
+    summary = run_regression(root, args.patterns, args.jobs, os.path.abspath(args.cache_dir), args.simulator,
+                             args.compile_cmd, args.run_cmd, args.timeout, args.fail_pattern, args.report)
+    if summary is None or any(result['status'] != 'pass' for result in summary['results']):
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,440 @@
+import argparse
+import json
+import os
+import sys
+import numpy as np
+import hexmem
+import pnm
+from fpga_image import parse_size
+
+# Bytes read per pass; a change line never spans more than the carry-over.
+READ_CHUNK = 1 << 22
+
+# Port names the RTL modules use, in order of preference.
+IN_VALID_NAMES = ('gray_valid', 'pixel_in_valid', 'pixel_valid', 'data_valid')
+CLOCK_NAMES = ('clk', 'clock')
+ROW_PREFIX = 'center_row'
+COL_PREFIX = 'center_col'
+
+# Digit values for binary and decimal spans; x, z and anything else is -1.
+_DIGIT_VALUE = np.full(256, -1, dtype=np.int8)
+_DIGIT_VALUE[list(b'0123456789')] = range(10)
+
+def read_header(path):
+    # Returns ({dotted path: (id code, bits)}, timescale, byte offset of the
+    # value changes). Only the declarations are held, never the changes.
+    signals = {}
+    scope = []
+    timescale = None
+    with open(path, 'rb') as f:
+        tokens = []
+        offset = 0
+        for line in f:
+            offset += len(line)
+            tokens.extend(line.split())
+            while b'$end' in tokens:
+                end = tokens.index(b'$end')
+                command, tokens = tokens[:end], tokens[end + 1:]
+                if not command:
+                    continue
+                keyword = command[0]
+                if keyword == b'$scope':
+                    scope.append(command[2].decode())
+                elif keyword == b'$upscope':
+                    scope.pop()
+                elif keyword == b'$var':
+                    name = '.'.join(scope + [command[4].decode()])
+                    signals.setdefault(name, (command[3].decode(), int(command[2])))
+                elif keyword == b'$timescale':
+                    timescale = b''.join(command[1:]).decode()
+                elif keyword == b'$enddefinitions':
+                    return signals, timescale, offset
+    raise ValueError(f"{path} has no $enddefinitions, not a VCD file")
+
+def find_signal(signals, name, scope=None):
+    # A dotted path, or a name looked up in scope (and then anywhere, the
+    # shallowest declaration first).
+    if name in signals:
+        return name
+    if scope and f"{scope}.{name}" in signals:
+        return f"{scope}.{name}"
+    matches = sorted((path for path in signals if path.endswith('.' + name)), key=lambda path: path.count('.'))
+    if not matches:
+        raise ValueError(f"No signal named {name} in the VCD")
+    return matches[0]
+
+def detect_signals(signals, scope=None):
+    # The DUT is the deepest scope with one of the input valid ports; its
+    # output is the first other *_valid port, the bus next to it and the
+    # center_row*/center_col* counters when it reports them.
+    leaves = {}
+    for path in signals:
+        parent, _, leaf = path.rpartition('.')
+        leaves.setdefault(parent, []).append(leaf)
+    if scope is None:
+        duts = [parent for parent, names in leaves.items() if any(name in IN_VALID_NAMES for name in names)]
+        if not duts:
+            raise ValueError(f"No scope with an input valid ({', '.join(IN_VALID_NAMES)}), use --scope")
+        scope = max(duts, key=lambda parent: parent.count('.'))
+    names = leaves.get(scope)
+    if names is None:
+        raise ValueError(f"No scope {scope} in the VCD")
+    detected = {'scope': scope, 'clock': next((f"{scope}.{name}" for name in CLOCK_NAMES if name in names), None)}
+    detected['in_valid'] = next((name for name in IN_VALID_NAMES if name in names), None)
+    out_valid = next((name for name in names if name.endswith('_valid') and name not in IN_VALID_NAMES
+                      and not name.endswith('_d')), None)
+    detected['out_valid'] = out_valid
+    pixel = None
+    if out_valid:
+        stem = out_valid[:-len('_valid')]
+        pixel = next((name for name in (stem + '_out', stem + '_data', stem, 'pixel_out', 'data_out')
+                      if name in names and name != out_valid), None)
+    detected['pixel'] = pixel
+    detected['row'] = next((name for name in names if name.startswith(ROW_PREFIX)), None)
+    detected['col'] = next((name for name in names if name.startswith(COL_PREFIX)), None)
+    return detected
+
+def _numbers(data, begin, end, base):
+    # Values of the digit spans data[begin:end] (one per line) in one pass
+    # over their characters, and whether every digit was known (x and z
+    # are not). Buses over 64 bits keep their low 64 bits.
+    lengths = end - begin
+    values = np.zeros(lengths.size, dtype=np.uint64)
+    known = np.ones(lengths.size, dtype=bool)
+    if lengths.size == 0:
+        return values, known
+    digits = _DIGIT_VALUE[data[np.repeat(begin, lengths) + _ragged_index(lengths)]]
+    bad = digits < 0
+    if bad.any():
+        known = np.logical_or.reduceat(bad, _offsets(lengths)) == 0
+    digits = np.where(bad, 0, digits).astype(np.uint64)
+    power = np.uint64(base) ** (np.repeat(lengths, lengths) - 1 - _ragged_index(lengths)).astype(np.uint64)
+    values = np.add.reduceat(digits * power, _offsets(lengths))
+    return values, known
+
+def _offsets(lengths):
+    offsets = np.zeros(lengths.size, dtype=np.int64)
+    np.cumsum(lengths[:-1], out=offsets[1:])
+    return offsets
+
+def _ragged_index(lengths):
+    # 0..length-1 for every span, back to back.
+    return np.arange(int(lengths.sum()), dtype=np.int64) - np.repeat(_offsets(lengths), lengths)
+
+def _scan(block, codes):
+    # Classifies every line of a block of whole time steps at once: the
+    # time step each line belongs to, the timestamps, and for every code
+    # the lines that change it with their values.
+    data = np.frombuffer(block, dtype=np.uint8)
+    ends = np.flatnonzero(data == ord('\n'))
+    starts = np.zeros(ends.size, dtype=np.int64)
+    starts[1:] = ends[:-1] + 1
+    ends = ends - ((ends > starts) & (data[np.maximum(ends - 1, 0)] == ord('\r')))
+    keep = ends > starts
+    starts, ends = starts[keep], ends[keep]
+    first = data[starts]
+    stamp = first == ord('#')
+    step = np.cumsum(stamp) - 1
+    times, _ = _numbers(data, starts[stamp] + 1, ends[stamp], 10)
+
+    scalar = np.isin(first, np.frombuffer(b'01xzXZ', dtype=np.uint8))
+    vector = (first == ord('b')) | (first == ord('B'))
+    id_start = starts + 1
+    spaces = np.flatnonzero(data == ord(' '))
+    if vector.any():
+        id_start[vector] = spaces[np.searchsorted(spaces, starts[vector])] + 1
+    id_length = ends - id_start
+    changes = {}
+    for code in codes:
+        raw = code.encode()
+        match = (scalar | vector) & (id_length == len(raw))
+        for offset, char in enumerate(raw):
+            candidates = np.flatnonzero(match)
+            match[candidates] = data[id_start[candidates] + offset] == char
+        lines = np.flatnonzero(match)
+        is_vector = vector[lines]
+        values = np.zeros(lines.size, dtype=np.uint64)
+        known = np.ones(lines.size, dtype=bool)
+        bits = first[lines[~is_vector]]
+        values[~is_vector] = bits == ord('1')
+        known[~is_vector] = (bits == ord('0')) | (bits == ord('1'))
+        if is_vector.any():
+            rows = lines[is_vector]
+            values[is_vector], known[is_vector] = _numbers(data, starts[rows] + 1, id_start[rows] - 1, 2)
+        changes[code] = (step[lines], values, known)
+    return times, changes
+
+def iter_cycle_blocks(path, clock, watched, offset=0, chunk=READ_CHUNK):
+    # Yields (times, values, known) for the rising clock edges of every
+    # chunk: values[i, j] is watched[j] once the time step of edge i has
+    # settled, i.e. what the registers hold for the cycle after the edge.
+    # Chunks end on a timestamp, so time steps are never split, and only
+    # the last value of each signal carries over: memory stays at one
+    # chunk however long the dump is.
+    codes = list(dict.fromkeys([clock] + list(watched)))
+    state = {code: (np.uint64(0), False) for code in codes}
+    with open(path, 'rb') as f:
+        f.seek(offset)
+        carry = b''
+        while True:
+            data = f.read(chunk)
+            block = carry + data
+            if data:
+                cut = block.rfind(b'\n#') + 1
+                if cut <= 0:
+                    carry = block
+                    continue
+                block, carry = block[:cut], block[cut:]
+            if not block.startswith(b'#'):
+                # Declarations before the first timestamp belong to step 0.
+                block = b'#0\n' + block
+            times, changes = _scan(block, codes)
+
+            clock_steps, clock_values, clock_known = changes[clock]
+            level = np.where(clock_known, clock_values, 2).astype(np.int64)
+            previous = np.concatenate([[int(state[clock][0]) if state[clock][1] else 2], level[:-1]])
+            edges = np.unique(clock_steps[(level == 1) & (previous == 0)])
+
+            values = np.zeros((edges.size, len(watched)), dtype=np.uint64)
+            known = np.zeros((edges.size, len(watched)), dtype=bool)
+            for column, code in enumerate(watched):
+                steps, code_values, code_known = changes[code]
+                latest = np.searchsorted(steps, edges, side='right') - 1
+                values[:, column], known[:, column] = state[code]
+                later = latest >= 0
+                values[later, column] = code_values[latest[later]]
+                known[later, column] = code_known[latest[later]]
+            for code in codes:
+                steps, code_values, code_known = changes[code]
+                if steps.size:
+                    state[code] = (code_values[-1], bool(code_known[-1]))
+            if edges.size:
+                yield times[edges], values, known
+            if not data:
+                break
+
+def role_blocks(blocks, columns, width, height):
+    # (in_valid, out_valid, pixel, row, col) arrays from the columns of the
+    # sampled signals. Unknown strobes count as low, unknown pixels as 0
+    # and unknown centers as out of the frame.
+    for _, values, known in blocks:
+        def column(role, fill):
+            index = columns[role]
+            if index is None:
+                return None
+            return np.where(known[:, index], values[:, index], np.uint64(fill))
+        in_valid, out_valid = column(0, 0) == 1, column(1, 0) == 1
+        yield in_valid, out_valid, column(2, 0), column(3, height), column(4, width)
+
+def _frame_stats(index, stats, latencies):
+    first_out, last_out = stats['first_out'], stats['last_out']
+    result = dict(frame=index, inputs=stats['inputs'], outputs=stats['outputs'], pixels=stats['pixels'],
+                  first_in_cycle=stats['first_in'], first_out_cycle=first_out, last_out_cycle=last_out)
+    if first_out is not None:
+        span = last_out - first_out + 1
+        result['output_bubbles'] = span - stats['outputs']
+        result['outputs_per_cycle'] = stats['outputs'] / span
+        if stats['first_in'] is not None:
+            result['first_latency'] = first_out - stats['first_in']
+            result['pixels_per_cycle'] = stats['pixels'] / (last_out - stats['first_in'] + 1)
+    if stats['first_in'] is not None:
+        result['input_bubbles'] = stats['last_in'] - stats['first_in'] + 1 - stats['inputs']
+    if latencies:
+        values = np.concatenate(latencies)
+        if values.size:
+            result.update(latency_min=int(values.min()), latency_mean=float(values.mean()),
+                          latency_max=int(values.max()))
+    return result
+
+def _new_stats():
+    return dict(inputs=0, outputs=0, pixels=0, first_in=None, last_in=None, first_out=None, last_out=None)
+
+def _count(stats, key_first, key_last, cycles):
+    if cycles.size:
+        if stats[key_first] is None:
+            stats[key_first] = int(cycles[0])
+        stats[key_last] = int(cycles[-1])
+
+def rebuild_frames(blocks, width, height, keep='first', coordinates=True):
+    # Consumes blocks of (in_valid, out_valid, pixel, row, col) arrays, one
+    # entry per cycle (row and col None without coordinates), and yields
+    # (frame, stats) per output frame. With coordinates outputs go to
+    # center (row, col) and a frame ends when the row count goes back;
+    # without, they fill the frame in raster order. keep is 'first' (the
+    # benches' got[] flag) or 'last'. Latency pairs the first output for a
+    # position with the input pixel at that position. At most two frames of
+    # input cycles are kept.
+    count = width * height
+    in_cycles = {}
+    in_stats = {}
+    inputs = outputs = 0
+    cycle = 0
+    current = None
+    frame_index = 0
+    last_row = -1
+
+    def start(index):
+        for old in [key for key in in_cycles if key < index - 1]:
+            del in_cycles[old]
+        return dict(frame=np.zeros(count, dtype=np.uint64), got=np.zeros(count, dtype=bool),
+                    stats=in_stats.pop(index, _new_stats()), latencies=[])
+
+    def finish(index, current):
+        current['stats']['pixels'] = int(np.count_nonzero(current['got']))
+        return current['frame'].reshape(height, width), _frame_stats(index, current['stats'], current['latencies'])
+
+    for in_valid, out_valid, pixel, row, col in blocks:
+        cycles = cycle + np.arange(in_valid.size, dtype=np.int64)
+        cycle += in_valid.size
+
+        accepted = cycles[in_valid]
+        ordinal = inputs + np.arange(accepted.size)
+        inputs += accepted.size
+        for frame_in in np.unique(ordinal // count):
+            mine = ordinal // count == frame_in
+            frame_in = int(frame_in)
+            in_cycles.setdefault(frame_in, np.full(count, -1, dtype=np.int64))[ordinal[mine] % count] = accepted[mine]
+            stats = current['stats'] if current and frame_in == frame_index else \
+                in_stats.setdefault(frame_in, _new_stats())
+            stats['inputs'] += int(np.count_nonzero(mine))
+            _count(stats, 'first_in', 'last_in', accepted[mine])
+
+        if coordinates:
+            ok = out_valid & (row < height) & (col < width)
+            rows = row[ok].astype(np.int64)
+            position = rows * width + col[ok].astype(np.int64)
+            back = rows < np.concatenate([[last_row], rows[:-1]])
+            if current is None and back.size:
+                back[0] = False
+            frames = frame_index + np.cumsum(back)
+            if rows.size:
+                last_row = int(rows[-1])
+        else:
+            ok = out_valid
+            ordinal = outputs + np.arange(int(np.count_nonzero(ok)))
+            outputs += ordinal.size
+            position = ordinal % count
+            frames = ordinal // count
+        out_cycles = cycles[ok]
+        values = pixel[ok]
+
+        for frame_out in np.unique(frames):
+            mine = frames == frame_out
+            frame_out = int(frame_out)
+            if current is None or frame_out != frame_index:
+                if current is not None:
+                    yield finish(frame_index, current)
+                frame_index = frame_out
+                current = start(frame_index)
+            stats = current['stats']
+            stats['outputs'] += int(np.count_nonzero(mine))
+            _count(stats, 'first_out', 'last_out', out_cycles[mine])
+            spot, spot_cycles, spot_values = position[mine], out_cycles[mine], values[mine]
+            unique, first = np.unique(spot, return_index=True)
+            new = ~current['got'][unique]
+            started = in_cycles.get(frame_index)
+            if started is not None:
+                fresh, fresh_first = unique[new], first[new]
+                began = started[fresh]
+                current['latencies'].append((spot_cycles[fresh_first] - began)[began >= 0])
+            if keep == 'first':
+                current['frame'][unique[new]] = spot_values[first[new]]
+            else:
+                last = spot.size - 1 - np.unique(spot[::-1], return_index=True)[1]
+                current['frame'][unique] = spot_values[last]
+            current['got'][unique] = True
+    if current is not None:
+        yield finish(frame_index, current)
+
+def write_frame(path, frame, bits):
+    # Frames up to 16 bits as PGM, wider buses as a hex memory file.
+    if bits <= 16:
+        max_val = (1 << bits) - 1 if bits > 8 else 255
+        pnm.write_pgm(path, frame.astype(np.uint16 if bits > 8 else np.uint8), max_val, 'P5')
+    else:
+        height, width = frame.shape
+        hexmem.write_memory(path, frame, bits, 16, {'width': width, 'height': height, 'word_bits': bits})
+
+def main():
+    parser = argparse.ArgumentParser(description='Rebuild output frames and latency statistics from a VCD, streamed')
+    parser.add_argument('vcd', help='VCD file written by $dumpfile/$dumpvars')
+    parser.add_argument('-s', '--size', type=parse_size, help='WIDTHxHEIGHT of the frames')
+    parser.add_argument('--list', action='store_true', help='List the signals in the VCD and the ones detected')
+    parser.add_argument('--scope', help='Scope of the DUT (default: deepest scope with an input valid)')
+    parser.add_argument('--clock', help='Clock signal (default: clk in the DUT scope)')
+    parser.add_argument('--in-valid', help='Input valid signal')
+    parser.add_argument('--out-valid', help='Output valid signal')
+    parser.add_argument('--pixel', help='Output pixel bus')
+    parser.add_argument('--row', help='Output center row signal')
+    parser.add_argument('--col', help='Output center column signal')
+    parser.add_argument('--raster', action='store_true', help='Ignore the center signals, fill frames in raster order')
+    parser.add_argument('--keep', choices=['first', 'last'], default='first',
+                        help='Output kept when a center repeats (default: first, like the benches)')
+    parser.add_argument('-o', '--output-dir', help='Write the rebuilt frames here')
+    parser.add_argument('--report', help='JSON report with the statistics of every frame')
+    args = parser.parse_args()
+
+    try:
+        signals, timescale, offset = read_header(args.vcd)
+        detected = detect_signals(signals, args.scope)
+        scope = detected['scope']
+        chosen = {}
+        for role in ('clock', 'in_valid', 'out_valid', 'pixel', 'row', 'col'):
+            name = getattr(args, role) or detected[role]
+            if role in ('row', 'col') and args.raster:
+                name = None
+            if role == 'clock' and name is None:
+                name = 'clk'
+            chosen[role] = find_signal(signals, name, scope) if name else None
+        if args.list:
+            for path, (code, bits) in signals.items():
+                print(f"{path} [{bits}] {code}")
+            print(f"Timescale: {timescale}")
+            for role, path in chosen.items():
+                print(f"{role}: {path}")
+            return
+        for role in ('in_valid', 'out_valid', 'pixel'):
+            if chosen[role] is None:
+                raise ValueError(f"No {role.replace('_', ' ')} signal found, use --{role.replace('_', '-')}")
+        if args.size is None:
+            parser.error('--size is required to rebuild frames')
+        width, height = args.size
+        coordinates = chosen['row'] is not None and chosen['col'] is not None
+
+        # Signals that share an id code are read once.
+        roles = ('in_valid', 'out_valid', 'pixel', 'row', 'col')
+        codes = [signals[chosen[role]][0] if chosen[role] else None for role in roles]
+        watched = list(dict.fromkeys(code for code in codes if code))
+        index = [watched.index(code) if code else None for code in codes]
+        blocks = iter_cycle_blocks(args.vcd, signals[chosen['clock']][0], watched, offset)
+        cycles = role_blocks(blocks, index, width, height)
+        bits = signals[chosen['pixel']][1]
+        print(f"Rebuilding {width}x{height} frames from {chosen['out_valid']} / {chosen['pixel']}"
+              f"{' at ' + chosen['row'] + ', ' + chosen['col'] if coordinates else ' in raster order'}")
+        if args.output_dir:
+            os.makedirs(args.output_dir, exist_ok=True)
+        results = []
+        for frame, stats in rebuild_frames(cycles, width, height, args.keep, coordinates):
+            if args.output_dir:
+                ext = '.pgm' if bits <= 16 else '.hex'
+                path = os.path.join(args.output_dir, f"frame_{stats['frame']:05d}{ext}")
+                write_frame(path, frame, bits)
+                stats['path'] = path
+            results.append(stats)
+            latency = (f", latency {stats['latency_min']}/{stats['latency_mean']:.1f}/{stats['latency_max']} cycles"
+                       if 'latency_min' in stats else '')
+            throughput = f", {stats['outputs_per_cycle']:.3f} outputs/cycle" if 'outputs_per_cycle' in stats else ''
+            print(f"Frame {stats['frame']}: {stats['pixels']}/{width * height} pixels from {stats['outputs']} outputs, "
+                  f"{stats.get('output_bubbles', 0)} bubbles{throughput}{latency}")
+    except (OSError, ValueError, IndexError) as e:
+        print(f"Error: {e}")
+        sys.exit(1)
+    if not results:
+        print("Warning: no output valid strobes found")
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump({'vcd': args.vcd, 'timescale': timescale, 'signals': chosen, 'frames': results}, f, indent=1)
+        print(f"Report saved to {args.report}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,284 @@
+import argparse
+import os
+import cv2
+import numpy as np
+import pnm
+from raw_frame import RawFrame, detect_layout, frame_samples, plane_views, yuv_views
+
+# Chroma subsampling (rows, cols) per layout.
+CHROMA_SUBSAMPLING = {
+    'yuyv': (1, 2),
+    'uyvy': (1, 2),
+    'yuv422p': (1, 2),
+    'i422': (1, 2),
+    'yv12': (2, 2),
+    'i420': (2, 2),
+    'nv12': (2, 2),
+    'nv21': (2, 2),
+}
+YUV_LAYOUTS = list(CHROMA_SUBSAMPLING)
+
+# bt601 is limited-range BT.601 from OpenCV's YUYV conversion, which
+# averages horizontal pairs in fixed point, and for 4:2:0 from its I420
+# conversion, which takes the top-left pixel of each block as the YV12
+# stimulus always has; chroma is rounded once either way. The full-range
+# matrices come from OpenCV's 4:4:4 conversions, as the conversion code
+# and the (Y, U, V) channels of its result.
+OPENCV_MATRICES = {
+    'yuv': (cv2.COLOR_BGR2YUV, (0, 1, 2)),
+    'ycbcr': (cv2.COLOR_BGR2YCrCb, (0, 2, 1)),
+}
+YUV_MATRICES = ['bt601'] + list(OPENCV_MATRICES)
+# yuv422p has always been written with OpenCV's full-range YUV.
+LAYOUT_MATRICES = {'yuv422p': 'yuv'}
+
+# (Cb, Cr) weights of R, G and B in yuyv_to_rgb.v, yv12_to_rgb.v and
+# yuv422p_to_rgb.v, with 8 fraction bits; Y is weighted 256.
+YCBCR_TO_RGB = ((0, 359), (-88, -183), (454, 0))
+
+# RTL decoders as (layout, bench input, bench dump), paths from the repo root.
+RTL_DECODERS = {
+    'yuyv_to_rgb': ('yuyv', 'data/color2_320x466.yuyv', 'output/color2_320x466_yuyv.ppm'),
+    'yv12_to_rgb': ('yv12', 'data/color2_320x466_yv12.yuv', 'output/color2_320x466_yv12.ppm'),
+    'yuv422p_to_rgb': ('yuv422p', 'data/color2_320x466.yuv422p', 'output/color2_320x466_yuv422p.ppm'),
+}
+
+def _check_layout(layout, width):
+    if layout not in CHROMA_SUBSAMPLING:
+        raise ValueError(f"Unsupported YUV layout: {layout}, please choose one of {YUV_LAYOUTS}")
+    if layout in ('yuyv', 'uyvy') and width % 2:
+        raise ValueError(f"{layout.upper()} needs an even width")
+    return CHROMA_SUBSAMPLING[layout]
+
+def _block_mean(plane, rows, cols, half_even=False):
+    # Rounded mean of every rows x cols block as strided adds; odd edges are
+    # replicated so the last block is full. half_even rounds ties to even,
+    # as cv2.resize with INTER_AREA does, instead of up.
+    pad = (-plane.shape[0] % rows, -plane.shape[1] % cols)
+    if any(pad):
+        plane = np.pad(plane, ((0, pad[0]), (0, pad[1])), mode='edge')
+    total = plane[::rows, ::cols].astype(np.uint16)
+    for index in range(1, rows * cols):
+        row, col = divmod(index, cols)
+        total += plane[row::rows, col::cols]
+    bits = (rows * cols).bit_length() - 1
+    total += ((1 << bits) >> 1) - half_even
+    if half_even:
+        total += (total >> bits) & 1
+    total >>= bits
+    return total
+
+def encode_yuv(img, layout, matrix=None):
+    # Converts a BGR image into one frame of the layout. Luma and the
+    # subsampled chroma are written straight into the views of a single
+    # frame buffer, which is returned flat.
+    height, width = img.shape[:2]
+    rows, cols = _check_layout(layout, width)
+    matrix = matrix or LAYOUT_MATRICES.get(layout, 'bt601')
+    frame = np.empty(frame_samples(layout, width, height), dtype=np.uint8)
+    planes = yuv_views(plane_views(frame, layout, width, height), layout)
+
+    if matrix == 'bt601' and rows == 2:
+        padded = cv2.copyMakeBorder(img, 0, height % 2, 0, width % 2, cv2.BORDER_REPLICATE)
+        # Y rows followed by the U and then the V plane.
+        packed = cv2.cvtColor(padded, cv2.COLOR_BGR2YUV_I420)
+        luma_rows = padded.shape[0]
+        planes['y'][...] = packed[:height, :width]
+        chroma = packed[luma_rows:].reshape(2, luma_rows // 2, -1)
+        planes['u'][...] = chroma[0]
+        planes['v'][...] = chroma[1]
+    elif matrix == 'bt601':
+        padded = cv2.copyMakeBorder(img, 0, 0, 0, 1, cv2.BORDER_REPLICATE) if width % 2 else img
+        # Y in channel 0, U and V alternating in channel 1.
+        packed = cv2.cvtColor(padded, cv2.COLOR_BGR2YUV_YUYV)
+        planes['y'][...] = packed[:, :width, 0]
+        for name, start in (('u', 0), ('v', 1)):
+            chroma = packed[:, start::2, 1]
+            planes[name][...] = chroma if rows == 1 else _block_mean(chroma, rows, 1)
+    elif matrix in OPENCV_MATRICES:
+        code, channels = OPENCV_MATRICES[matrix]
+        full = cv2.cvtColor(img, code)
+        planes['y'][...] = full[..., channels[0]]
+        for name, channel in zip(('u', 'v'), channels[1:]):
+            planes[name][...] = _block_mean(full[..., channel], rows, cols, half_even=True)
+    else:
+        raise ValueError(f"Unsupported YUV matrix: {matrix}, please choose one of {YUV_MATRICES}")
+    return frame
+
+def _upsample(plane, rows, cols, height, width):
+    size = (plane.shape[1] * cols, plane.shape[0] * rows)
+    return cv2.resize(plane, size, interpolation=cv2.INTER_NEAREST)[:height, :width]
+
+def _offset_tables():
+    # Per channel, the chroma the RTL offset of Y depends on ('u', 'v' or
+    # both, indexed U * 256 + V) and how far it moves Y up and down.
+    cb = np.arange(256, dtype=np.int32)[:, None] - 128
+    cr = np.arange(256, dtype=np.int32)[None, :] - 128
+    tables = []
+    for cb_weight, cr_weight in YCBCR_TO_RGB:
+        offset = (cb * cb_weight + cr * cr_weight) >> 8
+        if not cr_weight:
+            source, offset = 'u', offset[:, 0]
+        elif not cb_weight:
+            source, offset = 'v', offset[0]
+        else:
+            source, offset = 'uv', offset.ravel()
+        tables.append((source, np.clip(offset, 0, 255).astype(np.uint8),
+                       np.clip(-offset, 0, 255).astype(np.uint8)))
+    return tables
+
+_OFFSET_TABLES = _offset_tables()
+
+def ycbcr_to_rgb(y, u, v, rows=1, cols=1):
+    # The fixed-point conversion of the RTL decoders: chroma is repeated over
+    # its block and each channel is (256*Y + weighted Cb/Cr) >> 8, clamped.
+    # 256*Y drops out of the shift, so that is Y plus an offset that only
+    # depends on the chroma; it is looked up per block and applied as a
+    # saturating add and subtract at 8 bits.
+    height, width = y.shape
+    y = np.ascontiguousarray(y)
+    chroma = {'u': np.ascontiguousarray(u), 'v': np.ascontiguousarray(v)}
+    channels = []
+    for source, raise_table, lower_table in _OFFSET_TABLES:
+        if source == 'uv':
+            index = np.left_shift(chroma['u'], 8, dtype=np.intp)
+            index |= chroma['v']
+            raise_by, lower_by = raise_table.take(index), lower_table.take(index)
+        else:
+            raise_by, lower_by = cv2.LUT(chroma[source], raise_table), cv2.LUT(chroma[source], lower_table)
+        channel = cv2.add(y, _upsample(raise_by, rows, cols, height, width))
+        channels.append(cv2.subtract(channel, _upsample(lower_by, rows, cols, height, width)))
+    return cv2.merge(channels)
+
+def decode_yuv(data, layout, width, height):
+    rows, cols = _check_layout(layout, width)
+    data = np.frombuffer(data, dtype=np.uint8) if isinstance(data, (bytes, bytearray)) else data
+    planes = yuv_views(plane_views(data, layout, width, height), layout)
+    return ycbcr_to_rgb(planes['y'], planes['u'], planes['v'], rows, cols)
+
+def read_yuv(yuv_path, layout=None, width=None, height=None, frame=0):
+    raw = RawFrame(yuv_path, layout, width, height, frame=frame)
+    rows, cols = _check_layout(raw.layout, raw.width)
+    planes = raw.planes()
+    return ycbcr_to_rgb(planes['y'], planes['u'], planes['v'], rows, cols)
+
+def jpg_to_yuv(jpg_path, yuv_path, layout, matrix=None):
+    img = cv2.imread(jpg_path)
+    if img is None:
+        print(f"Error: Cannot read image {jpg_path}")
+        return False
+
+    try:
+        frame = encode_yuv(img, layout, matrix)
+    except ValueError as e:
+        print(f"Error: {e}")
+        return False
+    frame.tofile(yuv_path)
+    print(f"Conversion successful! {layout.upper()} file saved to {yuv_path}")
+    return True
+
+def rtl_stream(planes, module):
+    # Pixels in the order the RTL decoder emits them for one frame, as an
+    # (N, 3) array, from the y/u/v planes of its input.
+    layout = RTL_DECODERS[module][0]
+    y, u, v = planes['y'], planes['u'], planes['v']
+    rows, cols = _check_layout(layout, y.shape[1])
+    if module == 'yuyv_to_rgb':
+        # valid_p1 samples data_valid on the edge that registers yuyv_data,
+        # so each valid pair is the previous word's, the first being the
+        # reset value (Y = U = V = 0).
+        zero = np.zeros((1, 1), dtype=np.uint8)
+        first = ycbcr_to_rgb(np.zeros((1, 2), dtype=np.uint8), zero, zero, 1, 2)
+        return np.concatenate([first.reshape(-1, 3), ycbcr_to_rgb(y, u, v, rows, cols).reshape(-1, 3)])
+    if module == 'yuv422p_to_rgb':
+        # u_cache/v_cache load on the edge that multiplies the even pixel, so
+        # even pixels take the previous pair's chroma (zero before the first).
+        # uv_valid rises on that same edge, so pixel 0 never raises valid.
+        full = {}
+        for name, plane in (('u', u), ('v', v)):
+            previous = np.zeros(plane.size, dtype=np.uint8)
+            previous[1:] = np.asarray(plane).reshape(-1)[:-1]
+            chroma = np.empty(y.shape, dtype=np.uint8)
+            chroma[:, 0::2] = previous.reshape(plane.shape)
+            chroma[:, 1::2] = plane
+            full[name] = chroma
+        return ycbcr_to_rgb(y, full['u'], full['v']).reshape(-1, 3)[1:]
+    return ycbcr_to_rgb(y, u, v, rows, cols).reshape(-1, 3)
+
+def check_output(module, yuv_path, ppm_path, width=None, height=None):
+    # Compares a testbench PPM dump against rtl_stream of its input. Benches
+    # may stop writing early or keep clocking out pixels after the frame, so
+    # only the overlap is compared and the rest counted.
+    # Returns (pixels, mismatching pixels, max abs diff, missing, extra).
+    layout = RTL_DECODERS[module][0]
+    _, ppm_width, ppm_height, _, samples = pnm.load_pnm(ppm_path)
+    raw = RawFrame(yuv_path, layout, width or ppm_width, height or ppm_height)
+    expected = rtl_stream(raw.planes(), module)
+    dumped = samples[:samples.size // 3 * 3].reshape(-1, 3)
+    count = min(len(dumped), len(expected))
+    diff = np.abs(dumped[:count].astype(np.int16) - expected[:count])
+    mismatches = int(np.count_nonzero(diff.any(axis=1)))
+    return len(expected), mismatches, int(diff.max(initial=0)), len(expected) - count, len(dumped) - count
+
+def main():
+    parser = argparse.ArgumentParser(description='Encode, decode and check YUV frames')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    encode = subparsers.add_parser('encode', help='Convert an image into a YUV frame')
+    encode.add_argument('input', help='Input image')
+    encode.add_argument('output', help='Output YUV file')
+    encode.add_argument('-l', '--layout', choices=YUV_LAYOUTS, help='YUV layout (default: from output name)')
+    encode.add_argument('-m', '--matrix', choices=YUV_MATRICES,
+                        help='Color matrix (default: yuv for yuv422p, bt601 otherwise)')
+
+    decode = subparsers.add_parser('decode', help='Decode a YUV frame to PPM as the RTL decoders compute it')
+    decode.add_argument('input', help='Input YUV file (size inferred from a WxH pattern in the name)')
+    decode.add_argument('output', help='Output PPM file')
+    decode.add_argument('-l', '--layout', choices=YUV_LAYOUTS, help='YUV layout (default: from file name)')
+    decode.add_argument('-W', '--width', type=int, help='Frame width')
+    decode.add_argument('-H', '--height', type=int, help='Frame height')
+    decode.add_argument('--frame', type=int, default=0, help='Frame index in a multi-frame file (default: 0)')
+
+    check = subparsers.add_parser('check', help='Check RTL decoder testbench dumps against the Python model')
+    check.add_argument('modules', nargs='*', help=f"Decoders to check: {', '.join(RTL_DECODERS)} (default: all)")
+    check.add_argument('--input', help='YUV input of a single decoder (default: its bench input)')
+    check.add_argument('--dump', help='PPM dump of a single decoder (default: its bench output)')
+    args = parser.parse_args()
+
+    if args.command == 'encode':
+        layout = args.layout or detect_layout(args.output)[0]
+        if layout not in CHROMA_SUBSAMPLING:
+            parser.error(f"Cannot determine YUV layout for {args.output}, please specify one")
+        if not jpg_to_yuv(args.input, args.output, layout, args.matrix):
+            raise SystemExit(1)
+    elif args.command == 'decode':
+        rgb = read_yuv(args.input, args.layout, args.width, args.height, args.frame)
+        pnm.write_ppm(args.output, rgb)
+        print(f"Decoded {rgb.shape[1]}x{rgb.shape[0]} frame saved to {args.output}")
+    else:
+        modules = args.modules or list(RTL_DECODERS)
+        unknown = [module for module in modules if module not in RTL_DECODERS]
+        if unknown:
+            parser.error(f"Unknown decoder(s): {', '.join(unknown)}")
+        if (args.input or args.dump) and len(modules) != 1:
+            parser.error("--input and --dump need exactly one decoder")
+        root = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+        failed = False
+        for module in modules:
+            _, yuv_path, ppm_path = RTL_DECODERS[module]
+            yuv_path = args.input or os.path.join(root, yuv_path)
+            ppm_path = args.dump or os.path.join(root, ppm_path)
+            if not os.path.exists(ppm_path):
+                print(f"{module}: FAIL, no dump at {ppm_path}")
+                failed = True
+                continue
+            pixels, mismatches, max_diff, missing, extra = check_output(module, yuv_path, ppm_path)
+            status = 'PASS' if mismatches == 0 else 'FAIL'
+            print(f"{module}: {status}, {mismatches}/{pixels} pixels differ, max abs diff {max_diff}, "
+                  f"{missing} missing, {extra} extra")
+            failed |= status == 'FAIL'
+        if failed:
+            raise SystemExit(1)
+
+if __name__ == "__main__":
+    main()
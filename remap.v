@@ -29,7 +29,7 @@ module remap #(
     reg [19:0] ix_comb, iy_comb;
     reg [11:0] fx_comb, fy_comb;
     reg [31:0] addr0_comb, addr1_comb, addr2_comb, addr3_comb;
-    reg [4:0] denom_comb;
+    reg [FRAC:0] denom_comb;
 
     always @(*) begin
         if ((map_x >> FRAC) >= IMAGE_WIDTH)
@@ -80,7 +80,7 @@ module remap #(
     reg [2:0] state;
     reg [7:0] p00, p01, p10, p11;
     reg [11:0] lat_fx, lat_fy;
-    reg [4:0] lat_denom;
+    reg [FRAC:0] lat_denom;
     reg [31:0] lat_addr1, lat_addr2, lat_addr3;
     integer wx, wy, wxi, wyi;
     integer s00, s01, s10, s11;
@@ -146,8 +146,8 @@ module remap #(
                     
                     wx = lat_fx;
                     wy = lat_fy;
-                    wxi = (lat_denom << FRAC) - wx;
-                    wyi = (lat_denom << FRAC) - wy;
+                    wxi = lat_denom - wx;
+                    wyi = lat_denom - wy;
                     
                     s00 = p00 * wxi * wyi;
                     s01 = p01 * wx  * wyi;
@@ -43,6 +43,7 @@ module tb_remap;
     integer width, height, maxv;
     integer i, idx;
     integer pix;
+    integer tmp;
     integer OUT_MAX;
     reg [8*16-1:0] magic;
     reg [7:0] srcbuf [0:IMAGE_WIDTH*IMAGE_HEIGHT-1];
@@ -63,6 +64,12 @@ module tb_remap;
     integer ix_test, iy_test, exp_idx;
     reg [7:0] read_val;
 
+    // Coordinate stream from python/remap_lut.py, one {map_y, map_x} word
+    // per output pixel. Without it the bench computes its own map below.
+    reg [47:0] map_mem [0:IMAGE_WIDTH*IMAGE_HEIGHT-1];
+    integer f_map;
+    reg use_map;
+
     initial begin
         f_in = $fopen("data/left01.pgm","r");
         if (f_in == 0) begin
@@ -74,7 +81,15 @@ module tb_remap;
             end
         end else begin
             scanned = $fscanf(f_in, "%s", magic);
-            scanned = $fscanf(f_in, "%d %d", width, height);
+            // GIMP writes a comment line between the magic and the size.
+            scanned = 0;
+            while (scanned != 2 && !$feof(f_in)) begin
+                scanned = $fscanf(f_in, "%d %d", width, height);
+                if (scanned != 2) begin
+                    tmp = $fgetc(f_in);
+                    if (tmp == "#") begin tmp = $fgetc(f_in); while (tmp != 10 && tmp != -1) tmp = $fgetc(f_in); end
+                end
+            end
             scanned = $fscanf(f_in, "%d", maxv);
             if (scanned < 1 || width != IMAGE_WIDTH || height != IMAGE_HEIGHT) begin
                 $display("TB: bad PGM or size mismatch (%dx%d vs %dx%d), using synthetic", width, height, IMAGE_WIDTH, IMAGE_HEIGHT);
@@ -149,6 +164,14 @@ module tb_remap;
         end
         $display("TB: all verification tests PASSED!");
 
+        f_map = $fopen("output/remap_left01.hex", "r");
+        use_map = (f_map != 0);
+        if (use_map) begin
+            $fclose(f_map);
+            $readmemh("output/remap_left01.hex", map_mem);
+            $display("TB: using map output/remap_left01.hex");
+        end
+
         DEBUG_PIXELS = IMAGE_WIDTH * IMAGE_HEIGHT;
         total_map = (DEBUG_PIXELS > OUT_MAX) ? OUT_MAX : DEBUG_PIXELS;
         mapped_count = 0;
@@ -157,22 +180,27 @@ module tb_remap;
             r = src_idx / IMAGE_WIDTH;
             c = src_idx % IMAGE_WIDTH;
 
-            x = (c - cx) / fx;
-            y = (r - cy) / fy;
-            x0 = x; y0 = y;
-            for (iter=0; iter<5; iter=iter+1) begin
-                r2 = x0*x0 + y0*y0;
-                radial = 1.0 + k1*r2 + k2*r2*r2 + k3*r2*r2*r2;
-                dx = 2.0*p1*x0*y0 + p2*(r2 + 2.0*x0*x0);
-                dy = p1*(r2 + 2.0*y0*y0) + 2.0*p2*x0*y0;
-                x0 = (x - dx) / radial;
-                y0 = (y - dy) / radial;
-            end
-            ux = x0*fx + cx;
-            uy = y0*fy + cy;
+            if (use_map) begin
+                sx = map_mem[src_idx][23:0];
+                sy = map_mem[src_idx][47:24];
+            end else begin
+                x = (c - cx) / fx;
+                y = (r - cy) / fy;
+                x0 = x; y0 = y;
+                for (iter=0; iter<5; iter=iter+1) begin
+                    r2 = x0*x0 + y0*y0;
+                    radial = 1.0 + k1*r2 + k2*r2*r2 + k3*r2*r2*r2;
+                    dx = 2.0*p1*x0*y0 + p2*(r2 + 2.0*x0*x0);
+                    dy = p1*(r2 + 2.0*y0*y0) + 2.0*p2*x0*y0;
+                    x0 = (x - dx) / radial;
+                    y0 = (y - dy) / radial;
+                end
+                ux = x0*fx + cx;
+                uy = y0*fy + cy;
 
-            sx = $rtoi(ux * (1<<FRAC) + 0.5);
-            sy = $rtoi(uy * (1<<FRAC) + 0.5);
+                sx = $rtoi(ux * (1<<FRAC) + 0.5);
+                sy = $rtoi(uy * (1<<FRAC) + 0.5);
+            end
 
             while (!map_ready) @(posedge clk);
             @(posedge clk);